@@ -4,21 +4,24 @@
 API Routes - Clean separation of concerns
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, current_app, request, jsonify, send_file
 from werkzeug.exceptions import RequestEntityTooLarge
-from pathlib import Path
+from contextlib import nullcontext
 import logging
 from typing import Dict, Any
 
+from ..config import Config
 from ..core.converter import DocumentProcessorFactory, DocumentFormat
+from ..core.exceptions import ServiceOverloadedError
 from ..core.security import FileSecurityValidator, InputSanitizer
+from ..core.workspace import Workspace
 from ..models.document import ConversionRequest, ConversionResponse
 
 # Create blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
 # Initialize components
-security_validator = FileSecurityValidator()
+security_validator = FileSecurityValidator(max_file_sizes=Config.MAX_FILE_SIZES)
 document_processor = DocumentProcessorFactory.create_default_processor()
 logger = logging.getLogger(__name__)
 
@@ -49,6 +52,18 @@ def handle_file_too_large(error):
         'details': {'max_size': '16MB'}
     }), 413
 
+@api_bp.errorhandler(ServiceOverloadedError)
+def handle_overloaded(error: ServiceOverloadedError):
+    """Handle requests shed by admission control"""
+    response = jsonify({
+        'success': False,
+        'error': 'Server busy',
+        'details': error.details
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.details['retry_after'])
+    return response
+
 @api_bp.errorhandler(Exception)
 def handle_generic_error(error):
     """Handle unexpected errors"""
@@ -118,36 +133,46 @@ def convert_document():
             file_data=file
         )
         
-        # Process conversion
-        result = process_conversion(conversion_request)
-        
-        # Return response
-        if result.success:
-            return send_file(
-                result.output_path,
-                as_attachment=True,
-                download_name=result.filename
-            )
-        else:
-            raise APIError(result.message, 500, result.details)
+        # Same admission control as the web form: under overload, shed (503)
+        # instead of letting every conversion compete for CPU and disk
+        admission = current_app.extensions.get('admission')
+        with admission.admit(target_format) if admission is not None else nullcontext():
+            # Process conversion in a directory of its own, removed once the
+            # response has been sent (or right away on failure)
+            with Workspace(current_app.config['UPLOAD_FOLDER'],
+                           janitor=current_app.extensions.get('storage_janitor')) as workspace:
+                result = process_conversion(conversion_request, workspace)
+                
+                # Return response
+                if result.success:
+                    response = send_file(
+                        result.output_path,
+                        as_attachment=True,
+                        download_name=result.filename
+                    )
+                    return workspace.bind_to_response(response)
+                else:
+                    raise APIError(result.message, 500, result.details)
             
-    except APIError:
+    except (APIError, ServiceOverloadedError):
         raise
     except Exception as e:
         logger.error(f"Conversion error: {str(e)}", exc_info=True)
         raise APIError('Conversion failed', 500, {'error': str(e)})
 
-def process_conversion(request: ConversionRequest) -> ConversionResponse:
-    """Process document conversion"""
+def process_conversion(request: ConversionRequest, workspace: Workspace) -> ConversionResponse:
+    """Process document conversion inside the request's workspace"""
     try:
-        # Save uploaded file temporarily
-        temp_input = Path(f"/tmp/{request.filename}")
+        # Save uploaded file into the workspace
+        temp_input = workspace.file(request.filename)
         request.file_data.save(str(temp_input))
+        output_name = f"{temp_input.stem}_converted.{request.target_format.value}"
         
         # Convert document
         result = document_processor.convert(
             input_path=temp_input,
-            output_format=request.target_format
+            output_format=request.target_format,
+            output_path=workspace.file(output_name)
         )
         
         if result.success:
@@ -155,7 +180,7 @@ def process_conversion(request: ConversionRequest) -> ConversionResponse:
                 success=True,
                 message="Conversion successful",
                 output_path=result.output_path,
-                filename=f"{temp_input.stem}_converted.{request.target_format.value}"
+                filename=output_name
             )
         else:
             return ConversionResponse(
@@ -171,7 +196,3 @@ def process_conversion(request: ConversionRequest) -> ConversionResponse:
             message="Processing failed",
             details=str(e)
         )
-    finally:
-        # Cleanup
-        if temp_input.exists():
-            temp_input.unlink(missing_ok=True)
\ No newline at end of file
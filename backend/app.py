@@ -12,20 +12,25 @@ Features:
 - Rate limiting and monitoring
 """
 
+import hashlib
+import hmac
 import os
+import random
 import re
-import shutil
-import tempfile
+import threading
+import time
+import uuid
 from pathlib import Path
-from flask import Flask, jsonify, request, send_file, render_template_string
+from flask import Flask, g, jsonify, request, send_file, render_template_string
 from flask_cors import CORS
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import ClientDisconnected
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import ClosingIterator
 
 # Importações comentadas temporariamente para execução direta
 # from .config import get_config
-# from .core.logging_config import setup_logging
 # from .api.routes import api_bp
-# from .core.rate_limiter import IPRateLimiter
 
 # Bibliotecas para conversão de documentos
 try:
@@ -65,6 +70,54 @@ try:
 except ImportError:
     magic = None
 
+# Módulos internos (pacote quando importado, caminho local quando executado direto)
+try:
+    from .config import Config
+    from .core.artifacts import ArtifactStore
+    from .core.blobstore import BlobStore
+    from .core.cache import FileCache
+    from .core.encoding import TextChunkReader, read_text
+    from .core.admission import AdmissionClassConfig, AdmissionController
+    from .core.exceptions import ConversionError, ProcessingTimeoutError, ServiceOverloadedError, ValidationError
+    from .core.html_reader import extract_html_blocks
+    from .core.janitor import StorageArea, StorageJanitor
+    from .core.logging_config import get_logging_stats, log_performance, log_request, setup_logging
+    from .core.metadata import FORMATS as FORMATOS_INSPECAO, MetadataError, inspect_document
+    from .core.metrics import CONTENT_TYPE, MetricsRegistry, StageTimer, observe_stages, stage_timer, timed_stage
+    from .core.profiling import MODES as MODOS_PERFIL, PROFILE_FILES, ProfileStore, profile_call, valid_request_id
+    from .core.rate_limiter import IPRateLimiter
+    from .core.container_inspection import ContainerBudget
+    from .core.compression import VariantStore
+    from .core.delivery import send_artifact
+    from .core.security import FileSecurityValidator
+    from .core.singleflight import SingleFlight
+    from .core.uploads import ChunkedUploadStore, SessionNotFoundError
+    from .core.worker_pool import ConversionWorkerPool, WorkerLimits
+    from .core.workspace import Workspace
+except ImportError:
+    from config import Config
+    from core.artifacts import ArtifactStore
+    from core.blobstore import BlobStore
+    from core.cache import FileCache
+    from core.encoding import TextChunkReader, read_text
+    from core.admission import AdmissionClassConfig, AdmissionController
+    from core.exceptions import ConversionError, ProcessingTimeoutError, ServiceOverloadedError, ValidationError
+    from core.html_reader import extract_html_blocks
+    from core.janitor import StorageArea, StorageJanitor
+    from core.logging_config import get_logging_stats, log_performance, log_request, setup_logging
+    from core.metadata import FORMATS as FORMATOS_INSPECAO, MetadataError, inspect_document
+    from core.metrics import CONTENT_TYPE, MetricsRegistry, StageTimer, observe_stages, stage_timer, timed_stage
+    from core.profiling import MODES as MODOS_PERFIL, PROFILE_FILES, ProfileStore, profile_call, valid_request_id
+    from core.rate_limiter import IPRateLimiter
+    from core.container_inspection import ContainerBudget
+    from core.compression import VariantStore
+    from core.delivery import send_artifact
+    from core.security import FileSecurityValidator
+    from core.singleflight import SingleFlight
+    from core.uploads import ChunkedUploadStore, SessionNotFoundError
+    from core.worker_pool import ConversionWorkerPool, WorkerLimits
+    from core.workspace import Workspace
+
 class ConversorUniversalMelhorado:
     """Classe principal para conversão de documentos com preservação de estrutura"""
     
@@ -77,7 +130,10 @@ class ConversorUniversalMelhorado:
             'md': ['.md', '.markdown']
         }
         
-        self.temp_dir = tempfile.mkdtemp()
+        # TXT/MD acima deste tamanho são lidos em partes mapeadas em memória,
+        # sem manter o documento decodificado inteiro (pico de memória ~ parte)
+        self.limiar_streaming = 2 * 1024 * 1024
+        self.tamanho_parte_streaming = 1024 * 1024
         
         # Padrões para detecção de estrutura acadêmica
         self.padroes_instituicao = [
@@ -95,11 +151,6 @@ class ConversorUniversalMelhorado:
             'BIBLIOGRAFIA', 'ANEXOS', 'APÊNDICES', 'CONCLUSÃO', 'CONSIDERAÇÕES FINAIS'
         }
 
-    def __del__(self):
-        """Limpa arquivos temporários"""
-        if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
     def detectar_formato(self, arquivo_path: str) -> str:
         """Detecta o formato do arquivo baseado na extensão e conteúdo"""
         extensao = Path(arquivo_path).suffix.lower()
@@ -168,42 +219,93 @@ class ConversorUniversalMelhorado:
         
         return self._validar_e_limpar_texto(texto.strip())
 
-    def ler_txt(self, arquivo_path: str) -> str:
+    def ler_txt(self, arquivo_path: str, metadados: dict = None) -> str:
         """Lê arquivo de texto simples"""
-        try:
-            with open(arquivo_path, 'r', encoding='utf-8') as arquivo:
-                texto = arquivo.read()
-        except UnicodeDecodeError:
-            # Fallback para outras codificações
-            with open(arquivo_path, 'r', encoding='latin-1') as arquivo:
-                texto = arquivo.read()
+        # Leitura única com detecção de BOM e fallback utf-8 → cp1252 → latin-1
+        documento = read_text(arquivo_path)
+        self._registrar_codificacao(documento, metadados)
         
-        return self._validar_e_limpar_texto(texto)
+        return self._validar_e_limpar_texto(documento.text)
 
-    def ler_html(self, arquivo_path: str) -> str:
+    def ler_html(self, arquivo_path: str, metadados: dict = None) -> str:
         """Extrai texto de arquivo HTML preservando estrutura"""
-        if not BeautifulSoup:
-            raise ImportError("beautifulsoup4 não está instalado")
+        documento = read_text(arquivo_path, html=True)
+        self._registrar_codificacao(documento, metadados)
         
-        with open(arquivo_path, 'r', encoding='utf-8') as arquivo:
-            soup = BeautifulSoup(arquivo.read(), 'html.parser')
-        
-        # Remove scripts e estilos
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Extrai texto preservando quebras de linha em elementos estruturais
-        texto = ""
-        for elemento in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'div']):
-            if elemento.get_text(strip=True):
-                texto += elemento.get_text() + "\n"
+        # Parser incremental (lxml, ou html.parser como fallback): cada bloco
+        # é emitido uma única vez, em ordem, ignorando script/style
+        texto = "\n".join(extract_html_blocks(documento.text))
         
         return self._validar_e_limpar_texto(texto)
 
-    def ler_md(self, arquivo_path: str) -> str:
+    def ler_md(self, arquivo_path: str, metadados: dict = None) -> str:
         """Lê arquivo Markdown"""
-        with open(arquivo_path, 'r', encoding='utf-8') as arquivo:
-            return arquivo.read()
+        documento = read_text(arquivo_path)
+        self._registrar_codificacao(documento, metadados)
+        
+        return documento.text
+    
+    def ler_txt_em_partes(self, arquivo_path: str, metadados: dict = None):
+        """Lê TXT grande em partes, gerando linhas já normalizadas"""
+        leitor = TextChunkReader(arquivo_path, self.tamanho_parte_streaming)
+        
+        vazio = True
+        for parte in self._normalizar_em_partes(leitor):
+            vazio = False
+            yield from self._linhas(parte)
+        
+        if vazio:
+            yield self._validar_e_limpar_texto("")
+        self._registrar_codificacao(leitor, metadados)
+    
+    def ler_md_em_partes(self, arquivo_path: str, metadados: dict = None):
+        """Lê Markdown grande em partes, gerando linhas"""
+        leitor = TextChunkReader(arquivo_path, self.tamanho_parte_streaming)
+        
+        for parte in leitor:
+            yield from self._linhas(parte)
+        self._registrar_codificacao(leitor, metadados)
+    
+    def _normalizar_em_partes(self, partes):
+        """Aplica _validar_e_limpar_texto a partes alinhadas por linha"""
+        pendente = ''
+        for parte in partes:
+            limite = len(parte)
+            parte = pendente + parte
+            
+            # Não corta logo após hífen: a junção de palavras quebradas
+            # ("pala-\nvra") precisa das duas linhas na mesma parte. Numa
+            # sequência de linhas hifenizadas mais longa que uma parte, corta
+            # na última quebra mesmo assim: o pendente nunca passa de uma parte
+            ultimo = parte.rfind('\n')
+            corte = ultimo
+            while corte > 0 and parte[corte - 1] == '-':
+                anterior = parte.rfind('\n', 0, corte)
+                if anterior < 0 or len(parte) - anterior > limite:
+                    corte = ultimo
+                    break
+                corte = anterior
+            corte += 1
+            
+            pendente, parte = parte[corte:], parte[:corte]
+            if parte.strip():
+                yield self._validar_e_limpar_texto(parte)
+        
+        if pendente.strip():
+            yield self._validar_e_limpar_texto(pendente)
+    
+    @staticmethod
+    def _linhas(parte: str) -> list:
+        """Divide uma parte em linhas sem gerar linha vazia extra no final"""
+        if parte.endswith('\n'):
+            parte = parte[:-1]
+        return parte.split('\n')
+    
+    def _registrar_codificacao(self, documento, metadados: dict = None):
+        """Registra nos metadados a codificação detectada na leitura"""
+        if metadados is not None:
+            metadados['codificacao'] = documento.encoding
+            metadados['codificacao_mista'] = documento.mixed
     
     def _corrigir_espacamento(self, texto: str) -> str:
         """Corrige problemas de espaçamento e formatação no texto extraído"""
@@ -232,6 +334,11 @@ class ConversorUniversalMelhorado:
     
     def _validar_e_limpar_texto(self, texto: str) -> str:
         """Valida e limpa o texto convertido para melhorar a qualidade"""
+        with timed_stage('normalize'):
+            return self._limpar_texto(texto)
+    
+    def _limpar_texto(self, texto: str) -> str:
+        """Implementação de _validar_e_limpar_texto (sem cronometragem)"""
         if not texto or not texto.strip():
             return "Documento vazio ou não foi possível extrair texto."
         
@@ -264,9 +371,17 @@ class ConversorUniversalMelhorado:
     
     def _detectar_estrutura_documento(self, texto: str) -> list:
         """Detecta a estrutura do documento (títulos, listas, parágrafos, etc.)"""
-        linhas = texto.split('\n')
-        estrutura = []
-        
+        with timed_stage('classify'):
+            return list(self._classificar_linhas(texto.split('\n')))
+    
+    def _estrutura(self, texto):
+        """Estrutura de `texto`, que pode ser uma string ou um iterável de linhas"""
+        if isinstance(texto, str):
+            return self._detectar_estrutura_documento(texto)
+        return self._classificar_linhas(texto)
+    
+    def _classificar_linhas(self, linhas):
+        """Classifica linhas uma a uma; aceita qualquer iterável (inclusive geradores)"""
         for i, linha in enumerate(linhas):
             linha_limpa = linha.strip()
             if not linha_limpa:
@@ -274,45 +389,43 @@ class ConversorUniversalMelhorado:
             
             # Detecta instituição (primeira linha em maiúsculas)
             if i < 5 and any(re.match(padrao, linha_limpa, re.IGNORECASE) for padrao in self.padroes_instituicao):
-                estrutura.append({'tipo': 'instituicao', 'texto': linha_limpa})
+                yield {'tipo': 'instituicao', 'texto': linha_limpa}
                 continue
             
             # Detecta título principal (linha centralizada ou em maiúsculas no início)
             if i < 10 and (linha_limpa.isupper() or len(linha_limpa) > 10) and not any(char.isdigit() for char in linha_limpa[:5]):
                 if linha_limpa.upper() in self.secoes_especiais:
-                    estrutura.append({'tipo': 'secao_especial', 'texto': linha_limpa})
+                    yield {'tipo': 'secao_especial', 'texto': linha_limpa}
                 elif self._eh_titulo_principal(linha_limpa):
-                    estrutura.append({'tipo': 'titulo_principal', 'texto': linha_limpa})
+                    yield {'tipo': 'titulo_principal', 'texto': linha_limpa}
                 else:
-                    estrutura.append({'tipo': 'titulo', 'texto': linha_limpa})
+                    yield {'tipo': 'titulo', 'texto': linha_limpa}
                 continue
             
             # Detecta seções especiais
             if linha_limpa.upper() in self.secoes_especiais:
-                estrutura.append({'tipo': 'secao_especial', 'texto': linha_limpa})
+                yield {'tipo': 'secao_especial', 'texto': linha_limpa}
                 continue
             
             # Detecta títulos e subtítulos
             if self._eh_titulo(linha_limpa):
-                estrutura.append({'tipo': 'titulo', 'texto': linha_limpa})
+                yield {'tipo': 'titulo', 'texto': linha_limpa}
             elif self._eh_subtitulo(linha_limpa):
-                estrutura.append({'tipo': 'subtitulo', 'texto': linha_limpa})
+                yield {'tipo': 'subtitulo', 'texto': linha_limpa}
             # Detecta listas numeradas
             elif re.match(r'^\d+[.)\s]', linha_limpa):
-                estrutura.append({'tipo': 'lista_numerada', 'texto': linha_limpa})
+                yield {'tipo': 'lista_numerada', 'texto': linha_limpa}
             # Detecta listas com marcadores
             elif re.match(r'^[•\-\*]\s', linha_limpa):
-                estrutura.append({'tipo': 'lista_marcador', 'texto': linha_limpa})
+                yield {'tipo': 'lista_marcador', 'texto': linha_limpa}
             # Detecta citações
             elif linha_limpa.startswith('"') or linha_limpa.startswith('"'):
-                estrutura.append({'tipo': 'citacao', 'texto': linha_limpa})
+                yield {'tipo': 'citacao', 'texto': linha_limpa}
             # Detecta referências bibliográficas
             elif re.match(r'^[A-Z][A-Z\s,]+\d{4}', linha_limpa):
-                estrutura.append({'tipo': 'referencia', 'texto': linha_limpa})
+                yield {'tipo': 'referencia', 'texto': linha_limpa}
             else:
-                estrutura.append({'tipo': 'paragrafo', 'texto': linha_limpa})
-        
-        return estrutura
+                yield {'tipo': 'paragrafo', 'texto': linha_limpa}
     
     def _eh_titulo_principal(self, linha: str) -> bool:
         """Verifica se a linha é um título principal"""
@@ -367,7 +480,7 @@ class ConversorUniversalMelhorado:
         if not canvas:
             raise ImportError("reportlab não está instalado")
         
-        estrutura = self._detectar_estrutura_documento(texto)
+        estrutura = self._estrutura(texto)
         
         doc = SimpleDocTemplate(arquivo_saida, pagesize=A4)
         styles = getSampleStyleSheet()
@@ -435,7 +548,7 @@ class ConversorUniversalMelhorado:
         
         from docx.enum.text import WD_ALIGN_PARAGRAPH
         
-        estrutura = self._detectar_estrutura_documento(texto)
+        estrutura = self._estrutura(texto)
         doc = Document()
         
         for item in estrutura:
@@ -468,7 +581,7 @@ class ConversorUniversalMelhorado:
     
     def escrever_txt(self, texto: str, arquivo_saida: str):
         """Escreve texto em formato TXT preservando estrutura"""
-        estrutura = self._detectar_estrutura_documento(texto)
+        estrutura = self._estrutura(texto)
         
         with open(arquivo_saida, 'w', encoding='utf-8') as arquivo:
             for item in estrutura:
@@ -487,9 +600,9 @@ class ConversorUniversalMelhorado:
     
     def escrever_html(self, texto: str, arquivo_saida: str):
         """Escreve texto em formato HTML com formatação baseada na estrutura"""
-        estrutura = self._detectar_estrutura_documento(texto)
+        estrutura = self._estrutura(texto)
         
-        html_content = """
+        cabecalho_html = """
 <!DOCTYPE html>
 <html lang="pt-BR">
 <head>
@@ -557,38 +670,40 @@ class ConversorUniversalMelhorado:
     <div class="container">
 """
         
+        with open(arquivo_saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(cabecalho_html)
+            self._escrever_itens_html(arquivo, estrutura)
+            arquivo.write("""
+    </div>
+</body>
+</html>
+""")
+    
+    def _escrever_itens_html(self, arquivo, estrutura):
+        """Escreve cada item da estrutura como HTML, sem acumular o documento"""
         for item in estrutura:
             if item['tipo'] == 'instituicao':
-                html_content += f'        <div class="instituicao">{item["texto"]}</div>\n'
+                arquivo.write(f'        <div class="instituicao">{item["texto"]}</div>\n')
             elif item['tipo'] == 'titulo_principal':
-                html_content += f'        <div class="titulo-principal">{item["texto"]}</div>\n'
+                arquivo.write(f'        <div class="titulo-principal">{item["texto"]}</div>\n')
             elif item['tipo'] == 'secao_especial':
-                html_content += f'        <div class="secao-especial">{item["texto"]}</div>\n'
+                arquivo.write(f'        <div class="secao-especial">{item["texto"]}</div>\n')
             elif item['tipo'] == 'titulo':
-                html_content += f'        <h1>{item["texto"]}</h1>\n'
+                arquivo.write(f'        <h1>{item["texto"]}</h1>\n')
             elif item['tipo'] == 'subtitulo':
-                html_content += f'        <h2>{item["texto"]}</h2>\n'
+                arquivo.write(f'        <h2>{item["texto"]}</h2>\n')
             elif item['tipo'] == 'lista_numerada':
-                html_content += f'        <ol><li>{item["texto"][item["texto"].find(" ")+1:]}</li></ol>\n'
+                arquivo.write(f'        <ol><li>{item["texto"][item["texto"].find(" ")+1:]}</li></ol>\n')
             elif item['tipo'] == 'lista_marcador':
-                html_content += f'        <ul><li>{item["texto"][2:]}</li></ul>\n'
+                arquivo.write(f'        <ul><li>{item["texto"][2:]}</li></ul>\n')
             elif item['tipo'] == 'citacao':
-                html_content += f'        <div class="citacao">{item["texto"]}</div>\n'
+                arquivo.write(f'        <div class="citacao">{item["texto"]}</div>\n')
             else:  # paragrafo
-                html_content += f'        <p>{item["texto"]}</p>\n'
-        
-        html_content += """
-    </div>
-</body>
-</html>
-"""
-        
-        with open(arquivo_saida, 'w', encoding='utf-8') as arquivo:
-            arquivo.write(html_content)
+                arquivo.write(f'        <p>{item["texto"]}</p>\n')
     
     def escrever_md(self, texto: str, arquivo_saida: str):
         """Escreve texto em formato Markdown com formatação baseada na estrutura"""
-        estrutura = self._detectar_estrutura_documento(texto)
+        estrutura = self._estrutura(texto)
         
         with open(arquivo_saida, 'w', encoding='utf-8') as arquivo:
             for item in estrutura:
@@ -611,9 +726,31 @@ class ConversorUniversalMelhorado:
                 else:  # paragrafo
                     arquivo.write(f"{item['texto']}\n\n")
     
-    def converter(self, arquivo_origem: str, arquivo_destino: str, formato_destino: str = None) -> bool:
-        """Converte um arquivo de um formato para outro"""
-        try:
+    def converter(self, arquivo_origem: str, arquivo_destino: str, formato_destino: str = None,
+                  metadados: dict = None) -> bool:
+        """
+        Converte um arquivo de um formato para outro.
+        
+        Se `metadados` for informado, é preenchido com informações da leitura
+        (por exemplo, a codificação detectada em TXT, HTML e MD) e com o tempo
+        gasto em cada etapa (`metadados['etapas']`, em segundos). Na leitura em
+        partes, leitura, normalização e classificação acontecem sob demanda
+        durante a escrita e são contabilizadas em 'write'.
+        """
+        with stage_timer() as cronometro:
+            try:
+                return self._converter(arquivo_origem, arquivo_destino, formato_destino, metadados)
+            except Exception as e:
+                print(f"Erro na conversão: {str(e)}")
+                return False
+            finally:
+                if metadados is not None:
+                    metadados['etapas'] = dict(cronometro.durations)
+    
+    def _converter(self, arquivo_origem: str, arquivo_destino: str, formato_destino: str,
+                   metadados: dict) -> bool:
+        """Detecção, leitura e escrita, cada uma cronometrada como uma etapa"""
+        with timed_stage('detect'):
             # Detecta formato de origem
             formato_origem = self.detectar_formato(arquivo_origem)
             
@@ -621,21 +758,35 @@ class ConversorUniversalMelhorado:
             if not formato_destino:
                 formato_destino = self.detectar_formato(arquivo_destino)
             
-            # Lê o arquivo de origem
+            # TXT/MD grandes seguem em partes até o escritor (gerador de linhas)
+            em_partes = (
+                formato_origem in ('txt', 'md') and
+                os.path.getsize(arquivo_origem) > self.limiar_streaming
+            )
+        
+        # Lê o arquivo de origem
+        with timed_stage('read'):
             if formato_origem == 'pdf':
                 texto = self.ler_pdf(arquivo_origem)
             elif formato_origem == 'docx':
                 texto = self.ler_docx(arquivo_origem)
             elif formato_origem == 'txt':
-                texto = self.ler_txt(arquivo_origem)
+                if em_partes:
+                    texto = self.ler_txt_em_partes(arquivo_origem, metadados)
+                else:
+                    texto = self.ler_txt(arquivo_origem, metadados)
             elif formato_origem == 'html':
-                texto = self.ler_html(arquivo_origem)
+                texto = self.ler_html(arquivo_origem, metadados)
             elif formato_origem == 'md':
-                texto = self.ler_md(arquivo_origem)
+                if em_partes:
+                    texto = self.ler_md_em_partes(arquivo_origem, metadados)
+                else:
+                    texto = self.ler_md(arquivo_origem, metadados)
             else:
                 raise ValueError(f"Formato de origem não suportado: {formato_origem}")
-            
-            # Escreve no formato de destino
+        
+        # Escreve no formato de destino
+        with timed_stage('write'):
             if formato_destino == 'pdf':
                 self.escrever_pdf(texto, arquivo_destino)
             elif formato_destino == 'docx':
@@ -648,24 +799,107 @@ class ConversorUniversalMelhorado:
                 self.escrever_md(texto, arquivo_destino)
             else:
                 raise ValueError(f"Formato de destino não suportado: {formato_destino}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"Erro na conversão: {str(e)}")
-            return False
+        
+        return True
 
 # Configuração da aplicação Flask
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
-# Diretório de uploads (caminho absoluto dentro da pasta do backend)
-uploads_dir = os.path.join(app.root_path, 'uploads')
+# Diretório de uploads (absoluto; dentro de STORAGE_DIR, padrão: a pasta do backend)
+uploads_dir = str(Config.UPLOAD_FOLDER)
 app.config['UPLOAD_FOLDER'] = uploads_dir
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'docx', 'doc', 'txt', 'html', 'htm', 'md', 'markdown'}
+# Tamanho máximo por extensão (além do limite global MAX_CONTENT_LENGTH)
+app.config['MAX_FILE_SIZES'] = dict(Config.MAX_FILE_SIZES)  # fonte única: config.py
+# Conversões rodam em processos isolados, com limites de tempo e memória
+app.config['USE_WORKER_POOL'] = True
+app.config['TIMEOUT'] = 300  # segundos por conversão
+app.config['WORKER_POOL_SIZE'] = 4
+app.config['WORKER_MAX_JOBS'] = 100  # recicla o processo após N conversões
+app.config['WORKER_MAX_RSS_MB'] = 512  # recicla o processo se crescer além disso
+app.config['WORKER_MEMORY_LIMIT_MB'] = 1024  # RLIMIT_AS por processo
+app.config['WORKER_CPU_LIMIT'] = 300  # RLIMIT_CPU por conversão
+# Admissão: vagas e fila limitadas por classe de formato de saída
+app.config['ADMISSION_CLASSES'] = {
+    'heavy': {'max_concurrent': 2, 'max_queue': 8, 'expected_seconds': 10.0},  # PDF, DOCX
+    'light': {'max_concurrent': 4, 'max_queue': 32, 'expected_seconds': 1.0},  # TXT, MD, HTML
+}
+app.config['ADMISSION_FORMAT_CLASSES'] = {'pdf': 'heavy', 'docx': 'heavy'}
+app.config['ADMISSION_MAX_WAIT'] = 30  # segundos que uma requisição pode esperar na fila
+# Uploads idênticos simultâneos (mesmo SHA-256 e formato de destino) compartilham uma conversão
+app.config['COALESCE_ENABLED'] = True
+app.config['COALESCE_WAIT_TIMEOUT'] = 330  # TIMEOUT + ADMISSION_MAX_WAIT
+# Limites de estrutura verificados antes dos leitores (zip bombs, PDFs com objetos demais)
+app.config['CONTAINER_MAX_ZIP_ENTRIES'] = 5000
+app.config['CONTAINER_MAX_UNCOMPRESSED'] = 512 * 1024 * 1024  # total descompactado de um DOCX
+app.config['CONTAINER_MAX_ENTRY_SIZE'] = 256 * 1024 * 1024  # maior entrada descompactada
+app.config['CONTAINER_MAX_RATIO'] = 200  # taxa de compressão máxima (entradas acima de 1 MB)
+app.config['CONTAINER_MAX_PDF_OBJECTS'] = 500000
+# Perfilamento sob demanda (desligado por padrão): cabeçalho X-Profile-Token com
+# o token abaixo, ou amostragem aleatória de uma fração das conversões
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true')
+app.config['PROFILING_TOKEN'] = os.environ.get('PROFILING_TOKEN')  # também protege /admin/perfis
+app.config['PROFILING_SAMPLE_RATE'] = 0.0  # fração das conversões perfiladas sem cabeçalho
+app.config['PROFILING_MODE'] = 'sampling'  # 'sampling' (leve) ou 'cprofile'
+app.config['PROFILING_INTERVAL'] = 0.005  # segundos entre amostras de pilha
+app.config['PROFILING_DIR'] = os.path.join(app.root_path, 'profiles')
+app.config['PROFILING_MAX_PROFILES'] = 50
+# Faxina em segundo plano: idade máxima e cota de bytes de uploads, temp e cache
+app.config['TEMP_FOLDER'] = str(Config.TEMP_FOLDER)
+app.config['CACHE_FOLDER'] = str(Config.CACHE_FOLDER)
+app.config['CACHE_TIMEOUT'] = 3600  # metadados de /inspecionar, por SHA-256 do conteúdo
+app.config['ARTIFACTS_FOLDER'] = str(Config.ARTIFACTS_FOLDER)  # saídas para /download/<id>
+# Conteúdo endereçado por SHA-256 (uploads e saídas guardados uma vez só; os
+# nomes legíveis são hard links); precisa estar no mesmo sistema de arquivos
+# que as pastas acima (todas em STORAGE_DIR), senão os vínculos viram cópias
+app.config['BLOBS_FOLDER'] = str(Config.BLOBS_FOLDER)
+# Entrega dos arquivos: 'send_file' (o Python envia) ou 'x-accel' (o nginx envia,
+# via X-Accel-Redirect para a location interna abaixo; ver docker/nginx.conf)
+app.config['DELIVERY_MODE'] = os.environ.get('DELIVERY_MODE', 'send_file')
+app.config['ACCEL_REDIRECT_PREFIX'] = '/_protected/artifacts'
+# Saídas de texto (HTML, TXT, MD) comprimidas conforme Accept-Encoding: gzip
+# sempre, brotli/zstd se instalados; cada variante é gerada uma vez por conteúdo
+# (SHA-256), enviada já no primeiro download enquanto é gravada
+app.config['VARIANTS_FOLDER'] = str(Config.VARIANTS_FOLDER)  # dentro de ARTIFACTS_FOLDER (nginx)
+app.config['COMPRESSION_ENABLED'] = True
+app.config['COMPRESSION_ENCODINGS'] = ('br', 'zstd', 'gzip')  # preferência do servidor
+app.config['COMPRESSION_MIN_SIZE'] = 1024  # bytes; arquivos menores vão sem compressão
+# Envios em partes (retomáveis) para arquivos acima de MAX_CONTENT_LENGTH: cada
+# parte (PUT) respeita MAX_CONTENT_LENGTH; o total, o limite da extensão
+app.config['CHUNKED_UPLOAD_MAX_SIZE'] = max(app.config['MAX_FILE_SIZES'].values())
+app.config['JANITOR_ENABLED'] = True
+app.config['JANITOR_INTERVAL'] = 60  # segundos entre passadas
+app.config['JANITOR_RESCAN_INTERVAL'] = 3600  # releitura completa dos diretórios
+app.config['JANITOR_GRACE'] = 300  # entradas mais novas não são removidas por cota
+app.config['JANITOR_AREAS'] = {
+    'uploads': {'max_age': 3600, 'max_bytes': 2 * 1024 * 1024 * 1024},
+    'temp': {'max_age': 3600, 'max_bytes': 1024 * 1024 * 1024},
+    'cache': {'max_age': 3600, 'max_bytes': 1024 * 1024 * 1024},
+    'artifacts': {'max_age': 3600, 'max_bytes': 2 * 1024 * 1024 * 1024},
+    'variants': {'max_age': 3600, 'max_bytes': 1024 * 1024 * 1024},
+}
+# Logs (core/logging_config.py): os handlers rodam numa thread de fundo, atrás
+# de uma fila limitada; opções em config.py
+app.config['LOG_LEVEL'] = Config.LOG_LEVEL
+app.config['LOG_DIR'] = os.environ.get('LOG_DIR') or str(Config.LOG_FILE.parent)
+app.config['ENABLE_JSON_LOGGING'] = Config.ENABLE_JSON_LOGGING
+app.config['LOG_ASYNC'] = Config.LOG_ASYNC
+app.config['LOG_QUEUE_SIZE'] = Config.LOG_QUEUE_SIZE
+app.config['LOG_QUEUE_POLICY'] = Config.LOG_QUEUE_POLICY
+app.config['LOG_QUEUE_BLOCK_TIMEOUT'] = Config.LOG_QUEUE_BLOCK_TIMEOUT
+app.config['LOG_REDACT_SPAN'] = Config.LOG_REDACT_SPAN
+app.config['LOG_BATCH_WRITES'] = Config.LOG_BATCH_WRITES
+app.config['LOG_BATCH_MAX_BYTES'] = Config.LOG_BATCH_MAX_BYTES
+app.config['LOG_BATCH_INTERVAL'] = Config.LOG_BATCH_INTERVAL
 app.secret_key = 'sua_chave_secreta_aqui'
 
 # Configuração de CORS para permitir acesso do frontend
-CORS(app, resources={r"/converter": {"origins": "http://localhost:3000"}})
+CORS(app, resources={r"/converter": {"origins": "http://localhost:3000"},
+                     r"/api/*": {"origins": "http://localhost:3000"},
+                     r"/download/*": {"origins": "http://localhost:3000"},
+                     r"/envios.*": {"origins": "http://localhost:3000"},
+                     r"/inspecionar": {"origins": "http://localhost:3000"}},
+     expose_headers=['X-Artifact-Id', 'X-Download-Url', 'ETag', 'Content-Disposition'])
 
 # Cria diretório de upload se não existir
 os.makedirs(uploads_dir, exist_ok=True)
@@ -673,45 +907,366 @@ os.makedirs(uploads_dir, exist_ok=True)
 # Instância global do conversor
 conversor = ConversorUniversalMelhorado()
 
-def allowed_file(file_storage):
-    """Verifica se a extensão e o tipo MIME do arquivo são permitidos."""
-    if not file_storage or not file_storage.filename:
-        return False
+# Validação de conteúdo dos uploads (tipo MIME, assinaturas perigosas e estrutura);
+# os planos por extensão são montados uma vez aqui, a partir da configuração
+validador_arquivos = FileSecurityValidator(
+    ContainerBudget(
+        max_zip_entries=app.config['CONTAINER_MAX_ZIP_ENTRIES'],
+        max_zip_uncompressed_bytes=app.config['CONTAINER_MAX_UNCOMPRESSED'],
+        max_zip_entry_bytes=app.config['CONTAINER_MAX_ENTRY_SIZE'],
+        max_zip_ratio=app.config['CONTAINER_MAX_RATIO'],
+        max_pdf_objects=app.config['CONTAINER_MAX_PDF_OBJECTS'],
+    ),
+    allowed_extensions=app.config['ALLOWED_EXTENSIONS'],
+    max_file_sizes=app.config['MAX_FILE_SIZES'],
+)
 
-    filename = file_storage.filename
-    allowed_ext = '.' in filename and \
-                  filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+# Pool de processos para conversões (os processos só sobem na primeira conversão)
+pool_conversao = ConversionWorkerPool(
+    size=app.config['WORKER_POOL_SIZE'],
+    timeout=app.config['TIMEOUT'],
+    max_jobs_per_worker=app.config['WORKER_MAX_JOBS'],
+    max_rss_mb=app.config['WORKER_MAX_RSS_MB'],
+    limits=WorkerLimits(
+        memory_mb=app.config['WORKER_MEMORY_LIMIT_MB'],
+        cpu_seconds=app.config['WORKER_CPU_LIMIT']
+    )
+)
 
-    if not allowed_ext:
-        return False
+admissao = AdmissionController(
+    classes={
+        nome: AdmissionClassConfig(**limites)
+        for nome, limites in app.config['ADMISSION_CLASSES'].items()
+    },
+    format_classes=app.config['ADMISSION_FORMAT_CLASSES'],
+    default_class='light',
+    max_wait=app.config['ADMISSION_MAX_WAIT']
+)
+
+# Métricas expostas em /metrics (formato texto do Prometheus)
+metricas = MetricsRegistry()
+metrica_etapas = metricas.histogram(
+    'conversion_stage_seconds',
+    'Tempo gasto em cada etapa da conversão',
+    ('stage', 'source', 'target')
+)
+metrica_duracao = metricas.histogram(
+    'conversion_duration_seconds',
+    'Tempo total da conversão, do upload ao envio',
+    ('source', 'target', 'status')
+)
+metrica_conversoes = metricas.counter(
+    'conversions_total',
+    'Conversões por par de formatos e resultado',
+    ('source', 'target', 'status')
+)
+metricas.register_stats('conversion_pool', pool_conversao.stats)
+metricas.register_stats('admission', admissao.stats, label='format_class')
+# Também vale para /api/v1/convert (blueprint da API, registrado abaixo)
+app.extensions['admission'] = admissao
+
+# API REST (/api/v1: convert, formats, health) no mesmo app; as rotas usam
+# imports relativos ao pacote, então só existem com o backend importado como
+# pacote (gunicorn backend.app:app), não com `python app.py`
+if __package__:
+    from .api.routes import api_bp
+    app.register_blueprint(api_bp)
+
+# Conversões idênticas em andamento (conteúdo + formato de destino)
+conversoes_em_voo = SingleFlight()
+metricas.register_stats('coalescing', conversoes_em_voo.stats)
+
+# Faxineiro de armazenamento: a thread só sobe na primeira requisição (não nos
+# processos do pool, que também importam este módulo)
+zelador = StorageJanitor(
+    [
+        StorageArea(nome, app.config[pasta], **app.config['JANITOR_AREAS'][nome])
+        for nome, pasta in (('uploads', 'UPLOAD_FOLDER'), ('temp', 'TEMP_FOLDER'), ('cache', 'CACHE_FOLDER'),
+                            ('artifacts', 'ARTIFACTS_FOLDER'), ('variants', 'VARIANTS_FOLDER'))
+    ],
+    interval=app.config['JANITOR_INTERVAL'],
+    rescan_interval=app.config['JANITOR_RESCAN_INTERVAL'],
+    grace=app.config['JANITOR_GRACE']
+)
+app.extensions['storage_janitor'] = zelador
+metricas.register_stats('storage', zelador.stats, label='area')
+
+# Blobs sem nenhum vínculo (workspace e artefatos já removidos) são recolhidos
+# pelo faxineiro a cada releitura completa
+blobs = BlobStore(app.config['BLOBS_FOLDER'])
+zelador.add_task(lambda: blobs.collect(app.config['JANITOR_GRACE']))
+metricas.register_stats('blobs', blobs.stats)
+
+# Saídas convertidas disponíveis em /download/<id> até o faxineiro expirá-las
+artefatos = ArtifactStore(app.config['ARTIFACTS_FOLDER'], janitor=zelador, blobs=blobs)
+# Variantes comprimidas por SHA-256: seguidores e reenvios do mesmo conteúdo
+# reaproveitam a mesma variante
+variantes = VariantStore(app.config['VARIANTS_FOLDER'], janitor=zelador)
+metricas.register_stats('compression_variants', variantes.stats)
+
+# Envios em partes: sessões em TEMP_FOLDER (abandonadas expiram com a área 'temp')
+envios = ChunkedUploadStore(app.config['TEMP_FOLDER'], app.config['CHUNKED_UPLOAD_MAX_SIZE'], janitor=zelador)
+metricas.register_stats('chunked_upload', envios.stats)
+
+# Metadados de /inspecionar: o cache (em disco, compartilhado entre os processos)
+# só é aberto no primeiro uso, não nos processos do pool
+_cache_inspecao = None
+
+def cache_de_inspecao() -> FileCache:
+    global _cache_inspecao
+    if _cache_inspecao is None:
+        _cache_inspecao = FileCache(Path(app.config['CACHE_FOLDER']), app.config['CACHE_TIMEOUT'], janitor=zelador)
+    return _cache_inspecao
+
+# Antes do primeiro uso os contadores aparecem zerados (a série existe desde o início)
+metricas.register_stats('inspection_cache', lambda: _cache_inspecao.stats() if _cache_inspecao is not None
+                        else dict.fromkeys(FileCache.STAT_NAMES, 0))
+
+# Limitador por IP compartilhado: rotas com @rate_limit usam app.rate_limiter
+limitador = IPRateLimiter()
+app.rate_limiter = limitador
+metricas.register_stats('rate_limit', limitador.stats, label='endpoint')
+
+# Pipeline de logs: sobe uma vez por processo, na primeira requisição (a thread
+# do QueueListener não sobrevive ao fork do gunicorn, e os processos do pool
+# também importam este módulo)
+_logs_pid = None
+_logs_lock = threading.Lock()
+
+def iniciar_logs():
+    global _logs_pid
+    if _logs_pid == os.getpid():
+        return
+    with _logs_lock:
+        if _logs_pid == os.getpid():
+            return
+        setup_logging(
+            log_level=app.config['LOG_LEVEL'],
+            log_dir=Path(app.config['LOG_DIR']),
+            app_name='conversor',
+            enable_json=app.config['ENABLE_JSON_LOGGING'],
+            async_logging=app.config['LOG_ASYNC'],
+            queue_size=app.config['LOG_QUEUE_SIZE'],
+            queue_policy=app.config['LOG_QUEUE_POLICY'],
+            queue_block_timeout=app.config['LOG_QUEUE_BLOCK_TIMEOUT'],
+            redact_span=app.config['LOG_REDACT_SPAN'],
+            batch_writes=app.config['LOG_BATCH_WRITES'],
+            batch_max_bytes=app.config['LOG_BATCH_MAX_BYTES'],
+            batch_interval=app.config['LOG_BATCH_INTERVAL']
+        )
+        _logs_pid = os.getpid()
+
+metricas.register_stats('logging', get_logging_stats, label='logger')
+
+def registrar_metricas(cronometro: StageTimer, formato_origem: str, formato_destino: str, status: str):
+    """Registra as etapas de uma conversão nos histogramas e no log de desempenho"""
+    observe_stages(metrica_etapas, cronometro.durations, source=formato_origem, target=formato_destino)
+    metrica_duracao.observe(cronometro.total, source=formato_origem, target=formato_destino, status=status)
+    metrica_conversoes.inc(source=formato_origem, target=formato_destino, status=status)
+    log_performance('conversao', cronometro.total, {
+        'origem': formato_origem,
+        'destino': formato_destino,
+        'status': status,
+        'etapas_ms': {nome: round(segundos * 1000, 3) for nome, segundos in cronometro.durations.items()}
+    })
+
+def resposta_sobrecarga(erro):
+    """Resposta 503 com Retry-After para requisições rejeitadas na admissão"""
+    resposta = jsonify({
+        'erro': 'Servidor sobrecarregado, tente novamente em instantes',
+        'detalhes': erro.details
+    })
+    resposta.status_code = 503
+    resposta.headers['Retry-After'] = str(erro.details['retry_after'])
+    return resposta
+
+def executar_conversao(arquivo_origem: str, arquivo_destino: str, formato_destino: str,
+                       perfil: dict = None):
+    """
+    Executa uma conversão e devolve (sucesso, metadados); roda dentro do pool.
+    
+    Com `perfil` (modo, id, request_id, intervalo, diretório e limite de perfis),
+    a conversão roda sob o perfilador e o resultado é gravado no diretório de
+    perfis; `metadados['perfil']` lista os arquivos gerados.
+    """
+    metadados = {}
+    if not perfil:
+        sucesso = conversor.converter(arquivo_origem, arquivo_destino, formato_destino, metadados)
+        return sucesso, metadados
+    
+    sucesso, resultado = profile_call(
+        conversor.converter, arquivo_origem, arquivo_destino, formato_destino, metadados,
+        mode=perfil['modo'], interval=perfil['intervalo']
+    )
+    armazem = ProfileStore(perfil['diretorio'], perfil['max_perfis'])
+    info = armazem.save(perfil['id'], resultado, details={
+        'request_id': perfil['request_id'],
+        'origem': os.path.basename(arquivo_origem),
+        'formato_destino': formato_destino,
+        'sucesso': sucesso,
+        'etapas': metadados.get('etapas', {}),
+    })
+    metadados['perfil'] = info.files
+    return sucesso, metadados
 
-    # Verifica o tipo MIME real do arquivo (se magic estiver disponível)
-    if magic:
-        file_storage.seek(0)
-        mime_type = magic.from_buffer(file_storage.read(2048), mime=True)
-        file_storage.seek(0) # Reseta o ponteiro novamente para o uso posterior
+def converter_com_limites(arquivo_origem: str, arquivo_destino: str, formato_destino: str,
+                          cronometro: StageTimer = None, perfil: dict = None):
+    """
+    Converte no pool de processos (ou inline, se desativado).
+    
+    Com `cronometro`, as etapas medidas no processo da conversão são somadas a
+    ele; o restante do tempo da chamada (fila e IPC do pool) entra em 'dispatch'.
+    """
+    inicio = time.perf_counter()
+    if not app.config['USE_WORKER_POOL']:
+        sucesso, metadados = executar_conversao(arquivo_origem, arquivo_destino, formato_destino, perfil)
     else:
-        # Se magic não estiver disponível, usa apenas verificação de extensão
-        return True
+        sucesso, metadados = pool_conversao.run(
+            executar_conversao, arquivo_origem, arquivo_destino, formato_destino, perfil
+        )
+    
+    if cronometro is not None:
+        etapas = metadados.get('etapas', {})
+        cronometro.update(etapas)
+        cronometro.record('dispatch', max(0.0, time.perf_counter() - inicio - sum(etapas.values())))
+    return sucesso, metadados
 
-    expected_mimes = {
-        'pdf': 'application/pdf',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'doc': 'application/msword',
-        'txt': 'text/plain',
-        'html': 'text/html',
-        'htm': 'text/html',
-        'md': 'text/markdown',
-        'markdown': 'text/markdown'
-    }
+def formato_do_arquivo(nome_arquivo: str) -> str:
+    """Formato de origem para rótulos de métricas ('desconhecido' se não suportado)"""
+    try:
+        return conversor.detectar_formato(nome_arquivo)
+    except ValueError:
+        return 'desconhecido'
+
+def hash_conteudo(stream, tamanho_bloco: int = 1024 * 1024) -> str:
+    """SHA-256 do upload, lido em blocos; a posição do stream é restaurada"""
+    posicao = stream.tell()
+    stream.seek(0)
+    resumo = hashlib.sha256()
+    for bloco in iter(lambda: stream.read(tamanho_bloco), b''):
+        resumo.update(bloco)
+    stream.seek(posicao)
+    return resumo.hexdigest()
 
-    if magic:
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        expected_mime = expected_mimes.get(file_ext)
-        return mime_type == expected_mime
+def guardar_upload(arquivo, destino: str, conteudo_hash: str = None):
+    """
+    Guarda o upload no armazenamento de blobs e o vincula em `destino`; com o
+    hash de um conteúdo já guardado, nada é lido nem gravado
+    """
+    resumo, _ = blobs.put_stream(arquivo.stream, conteudo_hash)
+    blobs.link(resumo, destino)
+
+def entregar_artefato(artefato):
+    """
+    Resposta de download de um artefato, conforme DELIVERY_MODE; saídas de
+    texto vão comprimidas quando o cliente aceita (variante guardada em disco)
+    """
+    return send_artifact(
+        artefato, app.config['DELIVERY_MODE'], app.config['ACCEL_REDIRECT_PREFIX'],
+        encodings=app.config['COMPRESSION_ENCODINGS'] if app.config['COMPRESSION_ENABLED'] else (),
+        min_compress_size=app.config['COMPRESSION_MIN_SIZE'],
+        variants=variantes
+    )
+
+def perfil_solicitado():
+    """Parâmetros de perfilamento desta requisição, ou None (caso comum, sem custo)"""
+    if not app.config['PROFILING_ENABLED']:
+        return None
+    
+    token = app.config['PROFILING_TOKEN']
+    fornecido = request.headers.get('X-Profile-Token')
+    if token and fornecido and hmac.compare_digest(fornecido, token):
+        modo = request.headers.get('X-Profile-Mode', app.config['PROFILING_MODE'])
+    elif app.config['PROFILING_SAMPLE_RATE'] and random.random() < app.config['PROFILING_SAMPLE_RATE']:
+        modo = app.config['PROFILING_MODE']
     else:
-        # Se magic não estiver disponível, retorna True (já verificou extensão)
-        return True
+        return None
+    
+    return {
+        'modo': modo if modo in MODOS_PERFIL else app.config['PROFILING_MODE'],
+        # O X-Request-ID vem do cliente: o sufixo aleatório impede que um
+        # perfil sobrescreva (ou colida com) o de outra requisição
+        'id': f'{g.request_id[:31]}-{uuid.uuid4().hex}',
+        'request_id': g.request_id,
+        'intervalo': app.config['PROFILING_INTERVAL'],
+        'diretorio': app.config['PROFILING_DIR'],
+        'max_perfis': app.config['PROFILING_MAX_PROFILES'],
+    }
+
+def exigir_token_admin():
+    """Resposta de erro se a requisição não traz o token de administração, senão None"""
+    token = app.config['PROFILING_TOKEN']
+    if not token:
+        return jsonify({'erro': 'Não encontrado'}), 404
+    fornecido = request.headers.get('X-Profile-Token', '')
+    if not hmac.compare_digest(fornecido, token):
+        return jsonify({'erro': 'Acesso negado'}), 403
+    return None
+
+@app.before_request
+def identificar_requisicao():
+    """Atribui um id à requisição (ou aceita um X-Request-ID válido) e registra a chegada"""
+    recebido = request.headers.get('X-Request-ID', '')
+    g.request_id = recebido if valid_request_id(recebido) else uuid.uuid4().hex
+    iniciar_logs()
+    if app.config['JANITOR_ENABLED']:
+        zelador.ensure_started()
+    log_request(g.request_id, request.method, request.path, request.remote_addr,
+                request.headers.get('User-Agent'))
+
+@app.after_request
+def devolver_id_requisicao(resposta):
+    if 'request_id' in g:
+        resposta.headers['X-Request-ID'] = g.request_id
+    return resposta
+
+@app.route('/admin/perfis')
+def listar_perfis():
+    """Perfis gravados, do mais recente ao mais antigo"""
+    erro = exigir_token_admin()
+    if erro:
+        return erro
+    armazem = ProfileStore(app.config['PROFILING_DIR'], app.config['PROFILING_MAX_PROFILES'])
+    return jsonify({'perfis': [vars(info) for info in armazem.list()]})
+
+@app.route('/admin/perfis/<perfil_id>/<tipo>')
+def baixar_perfil(perfil_id, tipo):
+    """Baixa um arquivo de perfil: collapsed (flamegraph), pstats ou txt"""
+    erro = exigir_token_admin()
+    if erro:
+        return erro
+    armazem = ProfileStore(app.config['PROFILING_DIR'], app.config['PROFILING_MAX_PROFILES'])
+    caminho = armazem.file_path(perfil_id, tipo) if tipo in PROFILE_FILES else None
+    if caminho is None:
+        return jsonify({'erro': 'Perfil não encontrado'}), 404
+    return send_file(caminho, mimetype=PROFILE_FILES[tipo], as_attachment=True,
+                     download_name=caminho.name)
+
+@app.route('/metrics')
+def exportar_metricas():
+    """Métricas no formato texto do Prometheus"""
+    return metricas.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+def allowed_file(file_storage):
+    """
+    Verifica se a extensão e o conteúdo do arquivo são permitidos.
+    
+    O cabeçalho do upload é lido uma única vez e conferido contra o plano de
+    validação da extensão: tamanho máximo, assinaturas perigosas (executáveis
+    disfarçados), assinatura esperada do formato e tipo MIME real.
+    """
+    if not file_storage or not file_storage.filename:
+        return False
+
+    filename = file_storage.filename
+    if '.' not in filename:
+        return False
+    extensao = '.' + filename.rsplit('.', 1)[1].lower()
+    if validador_arquivos.plan_for(extensao) is None:
+        return False
+
+    inspecao = validador_arquivos.inspect_stream(file_storage.stream)
+    return validador_arquivos.validate_inspection(inspecao, extensao).is_valid
 
 @app.route('/')
 def index():
@@ -719,61 +1274,181 @@ def index():
 
 @app.route('/converter', methods=['POST'])
 def converter_arquivo():
-    try:
-        print("[DEBUG] Iniciando conversão...")
-        
-        if 'arquivo' not in request.files:
-            print("[DEBUG] Erro: Nenhum arquivo enviado")
-            return jsonify({'erro': 'Nenhum arquivo enviado'}), 400
-        
-        arquivo = request.files['arquivo']
-        formato_destino = request.form.get('formato_destino')
-        
-        print(f"[DEBUG] Arquivo recebido: {arquivo.filename}")
-        print(f"[DEBUG] Formato destino: {formato_destino}")
-        
-        if arquivo.filename == '':
-            print("[DEBUG] Erro: Nenhum arquivo selecionado")
-            return jsonify({'erro': 'Nenhum arquivo selecionado'}), 400
+    print("[DEBUG] Iniciando conversão...")
+    
+    if 'arquivo' not in request.files:
+        print("[DEBUG] Erro: Nenhum arquivo enviado")
+        return jsonify({'erro': 'Nenhum arquivo enviado'}), 400
+    
+    arquivo = request.files['arquivo']
+    formato_destino = request.form.get('formato_destino')
+    
+    print(f"[DEBUG] Arquivo recebido: {arquivo.filename}")
+    print(f"[DEBUG] Formato destino: {formato_destino}")
+    
+    if arquivo.filename == '':
+        print("[DEBUG] Erro: Nenhum arquivo selecionado")
+        return jsonify({'erro': 'Nenhum arquivo selecionado'}), 400
 
-        if not formato_destino:
-            print("[DEBUG] Erro: Formato de destino não especificado")
-            return jsonify({'erro': 'Formato de destino não especificado'}), 400
+    if not formato_destino:
+        print("[DEBUG] Erro: Formato de destino não especificado")
+        return jsonify({'erro': 'Formato de destino não especificado'}), 400
+    
+    return processar_conversao(arquivo, formato_destino)
 
-        if not allowed_file(arquivo):
+def processar_conversao(arquivo, formato_destino: str, conteudo_hash: str = None, salvar=None):
+    """
+    Valida, converte e entrega um arquivo recebido (upload direto ou envio em partes).
+    
+    Args:
+        arquivo: FileStorage (ou equivalente com filename e stream)
+        formato_destino: Formato de saída pedido
+        conteudo_hash: SHA-256 já conhecido do conteúdo (evita reler o arquivo)
+        salvar: Grava o arquivo num caminho (padrão: guardar_upload)
+    """
+    cronometro = StageTimer()
+    formato_origem = None
+    status = 'error'
+    try:
+        with cronometro.stage('validation'):
+            permitido = allowed_file(arquivo)
+        if not permitido:
             print("[DEBUG] Erro: Tipo de arquivo não permitido")
             return jsonify({'erro': 'Tipo de arquivo não permitido ou corrompido'}), 400
         
-        # Salva arquivo temporário
-        nome_arquivo = secure_filename(arquivo.filename)
-        caminho_origem = os.path.join(app.config['UPLOAD_FOLDER'], nome_arquivo)
-        print(f"[DEBUG] Salvando arquivo em: {caminho_origem}")
-        arquivo.save(caminho_origem)
+        # Estrutura interna (diretório central do ZIP, trailer do PDF), lida
+        # direto do upload antes de qualquer leitor abrir o arquivo
+        with cronometro.stage('inspection'):
+            estrutura = validador_arquivos.validate_structure(
+                arquivo.stream, os.path.splitext(arquivo.filename)[1]
+            )
+        if not estrutura.is_valid:
+            print(f"[DEBUG] Erro: {estrutura.message}")
+            return jsonify({'erro': 'Arquivo excede os limites de estrutura', 'detalhes': estrutura.details}), 400
         
-        # Define nome do arquivo de destino
-        nome_base = os.path.splitext(nome_arquivo)[0]
         print(f"[DEBUG] Formatos suportados: {conversor.formatos_suportados}")
         print(f"[DEBUG] Buscando formato: {formato_destino}")
         
         if formato_destino not in conversor.formatos_suportados:
             print(f"[DEBUG] Erro: Formato {formato_destino} não encontrado")
             return jsonify({'erro': f'Formato {formato_destino} não suportado'}), 400
-            
+        
+        nome_arquivo = secure_filename(arquivo.filename)
+        formato_origem = formato_do_arquivo(nome_arquivo)
+        
+        # Define nome do arquivo de destino
+        nome_base = os.path.splitext(nome_arquivo)[0]
         extensao_destino = conversor.formatos_suportados[formato_destino][0]
         nome_destino = f"{nome_base}_convertido{extensao_destino}"
-        caminho_destino = os.path.join(app.config['UPLOAD_FOLDER'], nome_destino)
         
-        print(f"[DEBUG] Caminho destino: {caminho_destino}")
+        # Uploads idênticos (mesmo conteúdo e formatos de origem e destino) em andamento
+        # ao mesmo tempo são convertidos uma vez só: a primeira requisição
+        # converte e as demais esperam e recebem o mesmo artefato
+        chave = None
+        if app.config['COALESCE_ENABLED']:
+            if conteudo_hash is None:
+                with cronometro.stage('hash'):
+                    conteudo_hash = hash_conteudo(arquivo.stream)
+            # O formato de origem vem da extensão e muda a conversão: os mesmos
+            # bytes enviados como .txt e como .md não compartilham a saída
+            chave = (conteudo_hash, formato_origem, formato_destino)
+        perfil = perfil_solicitado()
+        lider = []
+        
+        def _converter_compartilhado():
+            lider.append(True)
+            # Controle de admissão: sob sobrecarga, rejeita rápido (503) em vez de
+            # deixar todas as conversões disputando CPU e disco
+            with cronometro.stage('admission'):
+                vaga = admissao.acquire(formato_destino)
+            espaco_voo = Workspace(app.config['UPLOAD_FOLDER'], janitor=zelador).open()
+            try:
+                # Salva arquivo temporário
+                caminho_origem = str(espaco_voo.file(nome_arquivo))
+                print(f"[DEBUG] Salvando arquivo em: {caminho_origem}")
+                with cronometro.stage('upload'):
+                    if salvar is not None:
+                        salvar(caminho_origem)
+                    else:
+                        guardar_upload(arquivo, caminho_origem, conteudo_hash)
+                saida = str(espaco_voo.file(nome_destino))
+                print("[DEBUG] Iniciando conversão...")
+                sucesso, metadados = converter_com_limites(
+                    caminho_origem, saida, formato_destino, cronometro, perfil
+                )
+                # Guarda a saída para /download/<id> (ETag e Range em novas tentativas)
+                artefato = None
+                if sucesso and os.path.exists(saida):
+                    with cronometro.stage('store'):
+                        artefato = artefatos.store(saida, nome_destino)
+                return espaco_voo, saida, sucesso, metadados, artefato
+            except BaseException:
+                espaco_voo.close()
+                raise
+            finally:
+                admissao.release(vaga)
+        
+        inicio_espera = time.perf_counter()
+        try:
+            voo = conversoes_em_voo.do(
+                chave, _converter_compartilhado,
+                timeout=app.config['COALESCE_WAIT_TIMEOUT'],
+                cleanup=lambda resultado: resultado[0].close()
+            )
+        except ServiceOverloadedError as e:
+            print(f"[DEBUG] Requisição rejeitada: {e.details}")
+            return resposta_sobrecarga(e)
+        except ProcessingTimeoutError as e:
+            print(f"[DEBUG] Tempo limite excedido: {e.message}")
+            status = 'timeout'
+            return jsonify({'erro': 'Tempo limite de conversão excedido', 'detalhes': e.details}), 504
+        except TimeoutError as e:
+            print(f"[DEBUG] Tempo limite aguardando conversão idêntica: {e}")
+            status = 'timeout'
+            return jsonify({'erro': 'Tempo limite de conversão excedido'}), 504
+        except ConversionError as e:
+            print(f"[DEBUG] Falha no processo de conversão: {e.message}")
+            return jsonify({'erro': 'Falha na conversão'}), 500
         
-        # Realiza a conversão
-        print("[DEBUG] Iniciando conversão...")
-        sucesso = conversor.converter(caminho_origem, caminho_destino, formato_destino)
-        arquivo_existe = os.path.exists(caminho_destino)
-        print(f"[DEBUG] Resultado da conversão: {sucesso} | Arquivo existe: {arquivo_existe} | Caminho: {caminho_destino}")
+        # A saída já foi guardada como artefato; o diretório da conversão
+        # compartilhada é removido quando a última requisição o libera
+        _, saida, sucesso, metadados, artefato = voo.value
+        voo.release()
+        if not lider:
+            print("[DEBUG] Conversão compartilhada com requisição idêntica em andamento")
+            cronometro.record('coalesce', time.perf_counter() - inicio_espera)
+            metadados = {nome: valor for nome, valor in metadados.items() if nome != 'perfil'}
+            # Registro próprio sobre o mesmo conteúdo: o nome do download (e o
+            # id em /download) são os desta requisição, não os da líder
+            if artefato is not None:
+                with cronometro.stage('store'):
+                    artefato = artefatos.store(artefato.path, nome_destino, sha256=artefato.sha256)
+        arquivo_existe = artefato is not None
+        print(f"[DEBUG] Resultado da conversão: {sucesso} | Arquivo existe: {arquivo_existe} | Caminho: {saida}")
         
         if sucesso and arquivo_existe:
             print("[DEBUG] Conversão bem-sucedida, enviando arquivo")
-            return send_file(caminho_destino, as_attachment=True, download_name=nome_destino)
+            with cronometro.stage('delivery'):
+                resposta = entregar_artefato(artefato)
+            resposta.headers['X-Artifact-Id'] = artefato.id
+            resposta.headers['X-Download-Url'] = f'/download/{artefato.id}'
+            if metadados.get('codificacao'):
+                resposta.headers['X-Source-Encoding'] = metadados['codificacao']
+            if metadados.get('perfil'):
+                resposta.headers['X-Profile-Id'] = perfil['id']
+            
+            # 'send' vai até o fim do envio do corpo; só então a conversão é
+            # registrada. send_file usa direct_passthrough, que ignora
+            # call_on_close, por isso o corpo é envolvido diretamente
+            status = 'sent'
+            inicio_envio = time.perf_counter()
+            
+            def _registrar_envio():
+                cronometro.record('send', time.perf_counter() - inicio_envio)
+                registrar_metricas(cronometro, formato_origem, formato_destino, 'ok')
+            
+            resposta.response = ClosingIterator(resposta.response, _registrar_envio)
+            return resposta
         elif sucesso and not arquivo_existe:
             print("[DEBUG] Erro: Arquivo convertido não encontrado no caminho esperado")
             return jsonify({'erro': 'Arquivo convertido não encontrado'}), 500
@@ -787,14 +1462,159 @@ def converter_arquivo():
         print(f"[DEBUG] Stack trace: {traceback.format_exc()}")
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
     finally:
-        # Limpa arquivos temporários
+        # Conversões que não chegaram ao envio são registradas aqui
+        if formato_origem and status != 'sent':
+            registrar_metricas(cronometro, formato_origem, formato_destino, status)
+
+@app.route('/download/<artefato_id>')
+def baixar_artefato(artefato_id):
+    """
+    Baixa de novo uma saída convertida.
+    
+    ETag forte (SHA-256 do conteúdo): If-None-Match responde 304, e Range /
+    If-Range permitem retomar downloads interrompidos (206). No modo x-accel
+    o corpo (e o Range) fica a cargo do nginx
+    """
+    artefato = artefatos.get(artefato_id)
+    if artefato is None:
+        return jsonify({'erro': 'Arquivo não encontrado ou expirado'}), 404
+    resposta = entregar_artefato(artefato)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+@app.route('/envios', methods=['POST'])
+def criar_envio():
+    """
+    Abre um envio em partes: {'nome': 'tese.pdf', 'tamanho': 52428800}.
+    
+    As partes vão em PUT /envios/<id>?offset=N (em qualquer ordem, em paralelo
+    e repetidas se preciso); GET /envios/<id> diz o que falta; POST
+    /envios/<id>/concluir com formato_destino converte como /converter.
+    """
+    dados = request.get_json(silent=True) or request.form
+    nome = secure_filename(dados.get('nome') or '')
+    try:
+        tamanho = int(dados.get('tamanho'))
+    except (TypeError, ValueError):
+        return jsonify({'erro': 'Tamanho do arquivo não informado'}), 400
+    
+    extensao = os.path.splitext(nome)[1].lower()
+    plano = validador_arquivos.plan_for(extensao)
+    if not nome or plano is None:
+        return jsonify({'erro': 'Tipo de arquivo não permitido'}), 400
+    try:
+        envio = envios.create(nome, tamanho, plano.max_size)
+    except ValidationError as e:
+        return jsonify({'erro': 'Tamanho de arquivo inválido', 'detalhes': e.details}), 400
+    
+    resposta = jsonify(envios.status(envio))
+    resposta.status_code = 201
+    resposta.headers['Location'] = f'/envios/{envio.id}'
+    return resposta
+
+@app.route('/envios/<envio_id>', methods=['GET', 'PUT', 'DELETE'])
+def parte_envio(envio_id):
+    """Estado do envio (GET), uma parte no offset dado (PUT) ou cancelamento (DELETE)"""
+    envio = envios.get(envio_id)
+    if envio is None:
+        return jsonify({'erro': 'Envio não encontrado ou expirado'}), 404
+    
+    if request.method == 'DELETE':
+        envios.discard(envio)
+        return '', 204
+    
+    if request.method == 'PUT':
         try:
-            if 'caminho_origem' in locals():
-                print(f"[DEBUG] Removendo arquivo temporário: {caminho_origem}")
-                os.remove(caminho_origem)
-        except Exception as cleanup_error:
-            print(f"[DEBUG] Erro na limpeza: {cleanup_error}")
-            pass
+            offset = int(request.args.get('offset', ''))
+        except ValueError:
+            return jsonify({'erro': 'Parâmetro offset ausente ou inválido'}), 400
+        if envios.is_finalized(envio):
+            return jsonify({'erro': 'Envio já concluído'}), 409
+        try:
+            envios.write_chunk(envio, offset, request.stream)
+        except ValidationError as e:
+            return jsonify({'erro': e.message, 'detalhes': e.details}), 400
+        except SessionNotFoundError:
+            # Expirado e removido pelo zelador entre o get() e a escrita
+            return jsonify({'erro': 'Envio não encontrado ou expirado'}), 404
+        except ClientDisconnected:
+            # O que chegou até a queda já foi registrado; o cliente retoma de lá
+            return jsonify({'erro': 'Conexão interrompida', 'estado': envios.status(envio)}), 400
+    
+    try:
+        return jsonify(envios.status(envio))
+    except SessionNotFoundError:
+        return jsonify({'erro': 'Envio não encontrado ou expirado'}), 404
+
+@app.route('/envios/<envio_id>/concluir', methods=['POST'])
+def concluir_envio(envio_id):
+    """Converte um envio completo; o SHA-256 já vem pronto das partes recebidas"""
+    envio = envios.get(envio_id)
+    if envio is None:
+        return jsonify({'erro': 'Envio não encontrado ou expirado'}), 404
+    dados = request.get_json(silent=True) or request.form
+    formato_destino = dados.get('formato_destino')
+    if not formato_destino:
+        return jsonify({'erro': 'Formato de destino não especificado'}), 400
+    try:
+        concluido = envios.finalize(envio)
+    except ValidationError as e:
+        return jsonify({'erro': 'Envio incompleto', 'detalhes': e.details}), 409
+    except SessionNotFoundError:
+        return jsonify({'erro': 'Envio não encontrado ou expirado'}), 404
+    
+    # O arquivo do envio é copiado para o armazenamento de blobs (não vinculado:
+    # o arquivo do envio continua gravável enquanto a sessão existir)
+    with open(concluido.path, 'rb') as fluxo:
+        resposta = app.make_response(processar_conversao(
+            FileStorage(stream=fluxo, filename=envio.filename), formato_destino,
+            conteudo_hash=concluido.sha256
+        ))
+    # Falhas do servidor (503, 504...) mantêm o envio para uma nova tentativa
+    if resposta.status_code < 500:
+        envios.discard(envio)
+    return resposta
+
+@app.route('/inspecionar', methods=['POST'])
+def inspecionar_arquivo():
+    """
+    Metadados do documento sem converter: título, autor, páginas e palavras,
+    lidos só do trailer do PDF, dos docProps do DOCX ou do <title> do HTML.
+    O resultado fica em cache pelo SHA-256 do conteúdo.
+    """
+    if 'arquivo' not in request.files:
+        return jsonify({'erro': 'Nenhum arquivo enviado'}), 400
+    arquivo = request.files['arquivo']
+    if not allowed_file(arquivo):
+        return jsonify({'erro': 'Tipo de arquivo não permitido ou corrompido'}), 400
+    extensao = os.path.splitext(arquivo.filename)[1].lower()
+    if extensao not in FORMATOS_INSPECAO:
+        return jsonify({'erro': f'Formato {extensao} não pode ser inspecionado'}), 400
+    
+    conteudo_hash = hash_conteudo(arquivo.stream)
+    chave = f'inspecao-{FORMATOS_INSPECAO[extensao].value}-{conteudo_hash}'
+    metadados = cache_de_inspecao().get(chave)
+    em_cache = metadados is not None
+    if not em_cache:
+        estrutura = validador_arquivos.validate_structure(arquivo.stream, extensao)
+        if not estrutura.is_valid:
+            return jsonify({'erro': 'Arquivo excede os limites de estrutura', 'detalhes': estrutura.details}), 400
+        try:
+            documento = inspect_document(arquivo.stream, extensao)
+        except MetadataError as e:
+            print(f"[DEBUG] Metadados ilegíveis: {e}")
+            return jsonify({'erro': 'Não foi possível ler os metadados do arquivo'}), 422
+        metadados = {
+            'formato': documento.format.value,
+            'titulo': documento.title,
+            'autor': documento.author,
+            'paginas': documento.page_count,
+            'palavras': documento.word_count,
+        }
+        cache_de_inspecao().set(chave, metadados)
+    
+    tamanho = arquivo.stream.seek(0, os.SEEK_END)
+    return jsonify(dict(metadados, sha256=conteudo_hash, tamanho=tamanho, em_cache=em_cache))
 
 @app.route('/formatos')
 def listar_formatos():
@@ -1140,7 +1960,9 @@ if __name__ == '__main__':
     print("   🔧 Correção automática de espaçamento")
     
     print("\n🌐 Servidor iniciando...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Cada requisição usa seu próprio diretório e o conversor não guarda
+    # estado, então o servidor pode atender requisições em paralelo
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
 
 def create_app(config_name: str = None) -> Flask:
     """
@@ -1165,7 +1987,15 @@ def create_app(config_name: str = None) -> Flask:
         log_level=app.config.get('LOG_LEVEL', 'INFO'),
         log_dir=Path(app.config.get('LOG_DIR', 'logs')),
         app_name='conversor',
-        enable_json=app.config.get('ENABLE_JSON_LOGGING', False)
+        enable_json=app.config.get('ENABLE_JSON_LOGGING', False),
+        async_logging=app.config.get('LOG_ASYNC', True),
+        queue_size=app.config.get('LOG_QUEUE_SIZE', 10000),
+        queue_policy=app.config.get('LOG_QUEUE_POLICY', 'drop'),
+        queue_block_timeout=app.config.get('LOG_QUEUE_BLOCK_TIMEOUT', 1.0),
+        redact_span=app.config.get('LOG_REDACT_SPAN', False),
+        batch_writes=app.config.get('LOG_BATCH_WRITES', False),
+        batch_max_bytes=app.config.get('LOG_BATCH_MAX_BYTES', 64 * 1024),
+        batch_interval=app.config.get('LOG_BATCH_INTERVAL', 1.0)
     )
     
     # Setup CORS
@@ -1181,7 +2011,13 @@ def create_app(config_name: str = None) -> Flask:
     app.register_blueprint(api_bp)
     
     # Initialize rate limiter
-    app.rate_limiter = IPRateLimiter()
+    # The module-level limiter, already exported on /metrics
+    app.rate_limiter = limitador
+    app.extensions['storage_janitor'] = zelador
+    app.extensions['admission'] = admissao
+    if app.config.get('JANITOR_ENABLED', True):
+        app.before_request(zelador.ensure_started)
+    app.add_url_rule('/metrics', 'metrics', exportar_metricas)
     
     # Health check endpoint
     @app.route('/health')
@@ -1201,7 +2037,9 @@ def create_app(config_name: str = None) -> Flask:
 
 
 # Create app instance
-app = create_app()
+# Desativado enquanto os imports da fábrica estão comentados no topo: sem isso
+# o módulo falha ao ser importado (gunicorn, processos do pool de conversão)
+# app = create_app()
 
 if __name__ == '__main__':
     # Development server
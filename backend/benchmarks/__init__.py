@@ -0,0 +1,8 @@
+"""
+Benchmarks Package
+
+Corpus sintético determinístico e medições de desempenho do conversor.
+Executar a partir da raiz do repositório:
+
+    python -m backend.benchmarks.run --output benchmark.json
+"""
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deterministic corpus of academic-style documents for benchmarking.
+
+Text is generated from a seeded PRNG, so the same (seed, pages) pair always
+yields the same document. Every format is then written with the project's
+own `escrever_*` writers, so benchmark inputs look like real conversion
+outputs: institution header, title, abstract, numbered sections and
+subsections, lists, quotations and references.
+"""
+
+import hashlib
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+# Size classes (pages); LINES_PER_PAGE is calibrated against the A4 output of escrever_pdf
+SIZE_CLASSES = (1, 10, 100, 500)
+FORMATS = ('pdf', 'docx', 'txt', 'html', 'md')
+EXTENSIONS = {'pdf': '.pdf', 'docx': '.docx', 'txt': '.txt', 'html': '.html', 'md': '.md'}
+LINES_PER_PAGE = 25
+DEFAULT_SEED = 20240101
+
+# No '&' or '<': reportlab paragraphs interpret them as markup
+WORDS = (
+    'análise', 'dados', 'sistema', 'processo', 'modelo', 'resultado', 'estudo',
+    'pesquisa', 'método', 'avaliação', 'desempenho', 'conversão', 'documento',
+    'estrutura', 'formato', 'texto', 'validação', 'qualidade', 'ensino', 'aprendizagem',
+    'universidade', 'tecnologia', 'informação', 'conhecimento', 'desenvolvimento',
+    'proposta', 'abordagem', 'aplicação', 'ferramenta', 'experimento', 'amostra',
+    'variável', 'hipótese', 'teoria', 'prática', 'contexto', 'literatura', 'revisão',
+    'de', 'da', 'do', 'em', 'para', 'com', 'que', 'uma', 'um', 'os', 'as', 'no', 'na',
+    'sobre', 'entre', 'pelo', 'pela', 'foi', 'são', 'como', 'mais', 'também',
+)
+TOPICS = (
+    'Introdução', 'Fundamentação Teórica', 'Metodologia', 'Resultados',
+    'Discussão', 'Trabalhos Relacionados', 'Implementação', 'Avaliação Experimental',
+)
+AUTHORS = ('SILVA, J.', 'SOUZA, M.', 'OLIVEIRA, A.', 'PEREIRA, L.', 'COSTA, R.', 'SANTOS, F.')
+
+
+def _sentence(rng: random.Random, min_words: int = 8, max_words: int = 20) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return words[0].capitalize() + ' ' + ' '.join(words[1:]) + '.'
+
+
+def _paragraph(rng: random.Random) -> str:
+    return ' '.join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+
+
+def iter_document_lines(pages: int, seed: int = DEFAULT_SEED) -> Iterable[str]:
+    """Yield the lines of a synthetic academic document of about `pages` pages"""
+    rng = random.Random(f'{seed}:{pages}')
+    budget = pages * LINES_PER_PAGE
+
+    header = [
+        'UNIVERSIDADE FEDERAL DE TECNOLOGIA',
+        'CENTRO DE CIÊNCIAS EXATAS',
+        '',
+        'Avaliação De Desempenho Em Conversão De Documentos',
+        '',
+        'RESUMO',
+        _paragraph(rng),
+        '',
+    ]
+    yield from header
+    emitted = len(header)
+
+    section = 0
+    while emitted < budget:
+        section += 1
+        topic = TOPICS[(section - 1) % len(TOPICS)]
+        lines = [f'{section}. {topic}', '']
+
+        for subsection in range(1, rng.randint(2, 4) + 1):
+            lines.extend([f'{section}.{subsection} {rng.choice(TOPICS)}', ''])
+            for _ in range(rng.randint(2, 4)):
+                lines.extend([_paragraph(rng), ''])
+
+            kind = rng.random()
+            if kind < 0.3:
+                lines.extend(f'{i}) {_sentence(rng, 4, 8)}' for i in range(1, 4))
+                lines.append('')
+            elif kind < 0.5:
+                lines.extend(f'- {_sentence(rng, 4, 8)}' for _ in range(3))
+                lines.append('')
+            elif kind < 0.6:
+                lines.extend([f'"{_sentence(rng)}"', ''])
+
+        yield from lines
+        emitted += len(lines)
+
+    yield 'REFERÊNCIAS'
+    yield ''
+    for i in range(max(3, pages // 5)):
+        yield f'{AUTHORS[i % len(AUTHORS)]} {_sentence(rng, 4, 8)} {2000 + i % 24}.'
+
+
+def generate_text(pages: int, seed: int = DEFAULT_SEED) -> str:
+    """The full text of a synthetic document"""
+    return '\n'.join(iter_document_lines(pages, seed)) + '\n'
+
+
+def build_corpus(
+    conversor,
+    output_dir: Path,
+    sizes: Iterable[int] = SIZE_CLASSES,
+    formats: Iterable[str] = FORMATS,
+    seed: int = DEFAULT_SEED
+) -> List[Dict]:
+    """
+    Write every (size, format) document to `output_dir` with the project's writers.
+
+    Existing files from an identical corpus (same seed and text hash, as
+    recorded in manifest.json) are reused, so large PDFs are only built once.
+
+    Args:
+        conversor: ConversorUniversalMelhorado instance whose writers are used
+        output_dir: Directory for the corpus and its manifest
+        sizes: Page counts to generate
+        formats: Formats to write each document in
+        seed: PRNG seed
+
+    Returns:
+        Manifest entries: pages, format, path, bytes, text_sha256
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / 'manifest.json'
+
+    previous: Dict[str, Dict] = {}
+    if manifest_path.exists():
+        try:
+            previous = {entry['path']: entry for entry in json.loads(manifest_path.read_text())}
+        except (ValueError, KeyError, TypeError):
+            previous = {}
+
+    writers = {
+        'pdf': conversor.escrever_pdf,
+        'docx': conversor.escrever_docx,
+        'txt': conversor.escrever_txt,
+        'html': conversor.escrever_html,
+        'md': conversor.escrever_md,
+    }
+
+    entries = []
+    for pages in sizes:
+        text = generate_text(pages, seed)
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+        for fmt in formats:
+            name = f'academico_{pages:03d}p{EXTENSIONS[fmt]}'
+            path = output_dir / name
+            cached = previous.get(name)
+            if not (cached and cached.get('text_sha256') == text_hash and path.exists()):
+                writers[fmt](text, str(path))
+
+            entries.append({
+                'pages': pages,
+                'format': fmt,
+                'path': name,
+                'bytes': path.stat().st_size,
+                'text_sha256': text_hash,
+                'seed': seed,
+            })
+
+    # Keep entries of other sizes/formats so partial runs don't invalidate them
+    previous.update((entry['path'], entry) for entry in entries)
+    manifest_path.write_text(json.dumps(sorted(previous.values(), key=lambda e: e['path']), indent=2))
+    return entries
+
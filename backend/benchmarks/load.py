@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP load generator for the conversion endpoints.
+
+Drives /converter (legacy form fields) and/or /api/v1/convert over real HTTP
+with a weighted mix of source/target formats and document sizes taken from
+the benchmark corpus. The server is either:
+
+- in-process: the Flask app served by a threaded werkzeug server on an
+  ephemeral port (default);
+- gunicorn: a local `gunicorn backend.app:app` started by the harness;
+- an existing server given with --url (RSS sampled only with --server-pid).
+
+Closed-loop by default (--concurrency clients back to back). With --rate the
+load is open-loop: request i is due at start + i/rate and its latency is
+measured from that moment, so a saturated server shows up as queueing delay
+instead of silently lowering the offered load.
+
+The report has p50/p95/p99 latency overall and per format pair, throughput,
+status counts, error / 429 / 503 rates and server RSS (whole process tree,
+conversion workers included) over time. SLO flags make the run exit 1 when
+violated. --max-error-rate counts failures only; requests shed by admission
+control (503) have their own threshold, --max-shed-rate.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.load --duration 30 --concurrency 8 \\
+        --mix txt:pdf=3 docx:txt=1 --sizes 1 10 --slo-p95-ms 2000
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .corpus import DEFAULT_SEED, EXTENSIONS, build_corpus
+from .run import percentile
+
+# Endpoint name -> (path, file field, target format field)
+ENDPOINTS = {
+    'converter': ('/converter', 'arquivo', 'formato_destino'),
+    'api': ('/api/v1/convert', 'file', 'target_format'),
+}
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'md': 'text/markdown',
+}
+
+
+@dataclass
+class RequestTemplate:
+    """A pre-encoded multipart request"""
+    endpoint: str
+    source: str
+    target: str
+    pages: int
+    body: bytes
+    content_type: str
+
+    @property
+    def pair(self) -> str:
+        return f'{self.source}->{self.target}'
+
+
+@dataclass
+class Sample:
+    """Outcome of one request"""
+    started: float
+    latency: float
+    status: int
+    endpoint: str
+    pair: str
+    pages: int
+    error: Optional[str] = None
+
+
+def encode_multipart(fields: Dict[str, str], file_field: str, filename: str,
+                     content: bytes, content_type: str) -> Tuple[bytes, str]:
+    """multipart/form-data body and its Content-Type header"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+         f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n').encode()
+    )
+    parts.append(content)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def parse_mix(specs: Sequence[str]) -> List[Tuple[str, str, float]]:
+    """'txt:pdf=3' -> ('txt', 'pdf', 3.0); weight defaults to 1"""
+    mix = []
+    for spec in specs:
+        pair, _, weight = spec.partition('=')
+        source, _, target = pair.partition(':')
+        if source not in EXTENSIONS or target not in EXTENSIONS:
+            raise ValueError(f'Invalid format pair: {spec}')
+        mix.append((source, target, float(weight or 1)))
+    return mix
+
+
+def build_templates(
+    corpus_dir: Path,
+    endpoints: Sequence[str],
+    mix: Sequence[Tuple[str, str, float]],
+    sizes: Sequence[int],
+    seed: int
+) -> Tuple[List[RequestTemplate], List[float]]:
+    """Request templates for every endpoint x pair x size, with their weights"""
+    from ..app import ConversorUniversalMelhorado
+
+    sources = sorted({source for source, _, _ in mix})
+    entries = build_corpus(ConversorUniversalMelhorado(), corpus_dir, sizes, sources, seed)
+    by_key = {(entry['pages'], entry['format']): entry for entry in entries}
+
+    templates, weights = [], []
+    for endpoint in endpoints:
+        _, file_field, target_field = ENDPOINTS[endpoint]
+        for source, target, weight in mix:
+            for pages in sizes:
+                entry = by_key[(pages, source)]
+                content = (corpus_dir / entry['path']).read_bytes()
+                body, content_type = encode_multipart(
+                    {target_field: target}, file_field, entry['path'], content, CONTENT_TYPES[source]
+                )
+                templates.append(RequestTemplate(endpoint, source, target, pages, body, content_type))
+                weights.append(weight)
+    return templates, weights
+
+
+def process_tree_rss(pid: int) -> Tuple[int, int]:
+    """(total RSS in bytes, process count) of `pid` and all its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total, count, pending = 0, 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+            count += 1
+        except (OSError, IndexError, ValueError):
+            continue
+        pending.extend(children.get(current, ()))
+    return total, count
+
+
+class RssSampler(threading.Thread):
+    """Samples the server's process-tree RSS at a fixed interval"""
+
+    def __init__(self, pid: int, interval: float):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict] = []
+        self._stop_event = threading.Event()
+        self._started_at = time.monotonic()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss, processes = process_tree_rss(self.pid)
+            self.samples.append({
+                't': round(time.monotonic() - self._started_at, 3),
+                'rss_bytes': rss,
+                'processes': processes,
+            })
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class InProcessServer:
+    """The Flask app on a threaded werkzeug server in a background thread"""
+
+    def __init__(self):
+        from werkzeug.serving import make_server
+        from ..app import app
+
+        # One access-log line per request would dominate the output
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.app = app
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self.server.serve_forever, name='load-server', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        from ..app import pool_conversao
+        pool_conversao.shutdown()
+
+
+class GunicornServer:
+    """A local gunicorn serving backend.app:app"""
+
+    def __init__(self, workers: int, threads: int, timeout: float):
+        if shutil.which('gunicorn') is None:
+            raise RuntimeError('gunicorn is not installed')
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.command = [
+            'gunicorn', '--bind', f'127.0.0.1:{self.port}',
+            '--workers', str(workers), '--threads', str(threads),
+            '--timeout', str(int(timeout)), 'backend.app:app',
+        ]
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def __enter__(self):
+        repo_root = Path(__file__).resolve().parents[2]
+        self.process = subprocess.Popen(self.command, cwd=repo_root)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with code {self.process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError('gunicorn did not start listening within 30s')
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class ExternalServer:
+    """A server that is already running"""
+
+    def __init__(self, url: str, pid: Optional[int]):
+        self.url = url.rstrip('/')
+        self.pid = pid
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class LoadGenerator:
+    """Issues requests from worker threads and collects samples"""
+
+    def __init__(self, url: str, templates: List[RequestTemplate], weights: List[float],
+                 concurrency: int, duration: Optional[float], total_requests: Optional[int],
+                 rate: Optional[float], timeout: float, seed: int):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.templates = templates
+        self.weights = weights
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total_requests = total_requests
+        self.rate = rate
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+
+        self.samples: List[Sample] = []
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._start = 0.0
+
+    def _next(self) -> Optional[Tuple[int, RequestTemplate]]:
+        """Index and template of the next request, or None when done"""
+        with self._lock:
+            index = self._issued
+            if self.total_requests is not None and index >= self.total_requests:
+                return None
+            if self.duration is not None and time.perf_counter() - self._start >= self.duration:
+                return None
+            if self.rate and self.duration is not None and index / self.rate >= self.duration:
+                return None
+            self._issued += 1
+            return index, self.rng.choices(self.templates, self.weights)[0]
+
+    def _send(self, connection: http.client.HTTPConnection, template: RequestTemplate) -> int:
+        path = ENDPOINTS[template.endpoint][0]
+        connection.request('POST', path, body=template.body, headers={
+            'Content-Type': template.content_type,
+            'Content-Length': str(len(template.body)),
+        })
+        response = connection.getresponse()
+        # Read the whole body: download time is part of the user-visible latency
+        while response.read(64 * 1024):
+            pass
+        return response.status
+
+    def _worker(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        while True:
+            item = self._next()
+            if item is None:
+                break
+            index, template = item
+
+            if self.rate:
+                due = self._start + index / self.rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                started = due
+            else:
+                started = time.perf_counter()
+
+            status, error = 0, None
+            try:
+                status = self._send(connection, template)
+            except (OSError, http.client.HTTPException) as e:
+                error = f'{type(e).__name__}: {e}'
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+            sample = Sample(started - self._start, time.perf_counter() - started, status,
+                            template.endpoint, template.pair, template.pages, error)
+            with self._lock:
+                self.samples.append(sample)
+        connection.close()
+
+    def run(self) -> float:
+        """Run the load; returns elapsed wall time"""
+        self._start = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._worker, name=f'load-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - self._start
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict:
+    """Latency percentiles, throughput and status rates for a set of samples"""
+    total = len(samples)
+    if not total:
+        return {'requests': 0}
+
+    latencies = [sample.latency for sample in samples]
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        key = str(sample.status) if sample.status else 'connection_error'
+        statuses[key] = statuses.get(key, 0) + 1
+
+    ok = sum(1 for sample in samples if 200 <= sample.status < 300)
+    throttled = statuses.get('429', 0)
+    shed = statuses.get('503', 0)
+    return {
+        'requests': total,
+        'ok': ok,
+        'throughput_rps': total / elapsed if elapsed else 0.0,
+        'goodput_rps': ok / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000,
+            'mean': sum(latencies) / total * 1000,
+        },
+        'status_counts': statuses,
+        # 429 (rate limit) and 503 (admission control) are reported apart from errors
+        'error_rate': (total - ok - throttled - shed) / total,
+        'rate_429': throttled / total,
+        'rate_503': shed / total,
+    }
+
+
+def check_slo(summary: Dict, p95_ms: Optional[float], p99_ms: Optional[float],
+              max_error_rate: Optional[float], max_shed_rate: Optional[float] = None) -> List[str]:
+    """Human-readable SLO violations"""
+    violations = []
+    if not summary.get('requests'):
+        return ['no requests completed']
+    latency = summary['latency_ms']
+    if p95_ms is not None and latency['p95'] > p95_ms:
+        violations.append(f"p95 {latency['p95']:.0f} ms > {p95_ms:.0f} ms")
+    if p99_ms is not None and latency['p99'] > p99_ms:
+        violations.append(f"p99 {latency['p99']:.0f} ms > {p99_ms:.0f} ms")
+    if max_error_rate is not None and summary['error_rate'] > max_error_rate:
+        violations.append(f"error rate {summary['error_rate']:.2%} > {max_error_rate:.2%}")
+    if max_shed_rate is not None and summary['rate_503'] > max_shed_rate:
+        violations.append(f"503 (shed) rate {summary['rate_503']:.2%} > {max_shed_rate:.2%}")
+    return violations
+
+
+def run(args) -> Dict:
+    """Start the server, apply the load and build the report"""
+    templates, weights = build_templates(
+        Path(args.corpus_dir), args.endpoints, parse_mix(args.mix), args.sizes, args.seed
+    )
+
+    if args.url:
+        server = ExternalServer(args.url, args.server_pid)
+    elif args.server == 'gunicorn':
+        server = GunicornServer(args.gunicorn_workers, args.gunicorn_threads, args.timeout)
+    else:
+        server = InProcessServer()
+
+    with server:
+        sampler = None
+        if server.pid and os.path.isdir('/proc'):
+            sampler = RssSampler(server.pid, args.rss_interval)
+            sampler.start()
+
+        generator = LoadGenerator(
+            server.url, templates, weights, args.concurrency,
+            None if args.requests else args.duration, args.requests,
+            args.rate, args.timeout, args.seed
+        )
+        elapsed = generator.run()
+
+        if sampler:
+            sampler.stop()
+
+    samples = sorted(generator.samples, key=lambda sample: sample.started)
+    by_pair: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_pair.setdefault(f'{sample.endpoint} {sample.pair} {sample.pages}p', []).append(sample)
+
+    summary = summarize(samples, elapsed)
+    rss = sampler.samples if sampler else []
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if sample.error:
+            errors[sample.error] = errors.get(sample.error, 0) + 1
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'server': 'external' if args.url else args.server,
+            'url': server.url,
+            'endpoints': list(args.endpoints),
+            'mix': list(args.mix),
+            'sizes': list(args.sizes),
+            'concurrency': args.concurrency,
+            'rate': args.rate,
+            'elapsed_seconds': elapsed,
+        },
+        'summary': summary,
+        'by_pair': {key: summarize(group, elapsed) for key, group in sorted(by_pair.items())},
+        'server_rss': {
+            'peak_bytes': max((point['rss_bytes'] for point in rss), default=None),
+            'samples': rss,
+        },
+        'connection_errors': errors,
+        'slo_violations': check_slo(summary, args.slo_p95_ms, args.slo_p99_ms, args.max_error_rate,
+                                    args.max_shed_rate),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga HTTP do conversor')
+    parser.add_argument('--server', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--url', help='Servidor já em execução (ignora --server)')
+    parser.add_argument('--server-pid', type=int, help='PID do servidor externo, para amostrar RSS')
+    parser.add_argument('--gunicorn-workers', type=int, default=2)
+    parser.add_argument('--gunicorn-threads', type=int, default=4)
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=['converter'])
+    parser.add_argument('--mix', nargs='+', default=['txt:pdf=2', 'docx:txt=1', 'html:md=1'],
+                        help="Pares origem:destino=peso (padrão: %(default)s)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10],
+                        help='Tamanhos dos documentos em páginas (padrão: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Clientes simultâneos')
+    parser.add_argument('--duration', type=float, default=30.0, help='Duração em segundos')
+    parser.add_argument('--requests', type=int, help='Número total de requisições (ignora --duration)')
+    parser.add_argument('--rate', type=float, help='Carga aberta: requisições por segundo')
+    parser.add_argument('--timeout', type=float, default=300.0, help='Timeout por requisição')
+    parser.add_argument('--rss-interval', type=float, default=0.5, help='Intervalo de amostragem do RSS')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--corpus-dir', default=str(Path(tempfile.gettempdir()) / 'conversor-bench-corpus'))
+    parser.add_argument('--output', help='Arquivo JSON do relatório (padrão: stdout)')
+    parser.add_argument('--slo-p95-ms', type=float)
+    parser.add_argument('--slo-p99-ms', type=float)
+    parser.add_argument('--max-error-rate', type=float,
+                        help='Ex.: 0.01 para 1%%; não conta 429 nem 503 (ver --max-shed-rate)')
+    parser.add_argument('--max-shed-rate', type=float, help='Fração máxima de 503 (controle de admissão)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+
+    summary = report['summary']
+    if summary.get('requests'):
+        latency = summary['latency_ms']
+        print(f"{summary['requests']} requisições em {report['meta']['elapsed_seconds']:.1f}s | "
+              f"{summary['throughput_rps']:.1f} req/s | p50 {latency['p50']:.0f} ms "
+              f"p95 {latency['p95']:.0f} ms p99 {latency['p99']:.0f} ms | "
+              f"erros {summary['error_rate']:.1%} 429 {summary['rate_429']:.1%} "
+              f"503 {summary['rate_503']:.1%}", file=sys.stderr)
+    for violation in report['slo_violations']:
+        print(f'SLO VIOLADO: {violation}', file=sys.stderr)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    return 1 if report['slo_violations'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark runner for the conversion engine.
+
+Times every reader (`ler_*`), text normalization, structure detection,
+every writer (`escrever_*`) and the full `converter()` source x target
+matrix over the synthetic corpus, and writes latency percentiles,
+throughput and peak RSS per case to JSON.
+
+Each case runs in a forked child (when available), so its peak RSS is not
+polluted by earlier cases. A previous report can be passed with --compare
+to fail the run when a case's median latency regresses.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.run --sizes 1 10 --output bench.json
+    python -m backend.benchmarks.run --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from ..app import ConversorUniversalMelhorado
+from ..core.worker_pool import _current_rss
+from .corpus import DEFAULT_SEED, EXTENSIONS, FORMATS, SIZE_CLASSES, build_corpus, generate_text
+
+BENCHMARKS = ('read', 'normalize', 'classify', 'write', 'convert')
+
+
+@dataclass
+class BenchCase:
+    """One timed operation over one input"""
+    bench: str
+    func: Callable[[], object]
+    input_bytes: int
+    pages: int
+    format: Optional[str] = None
+    target: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        parts = [self.bench, self.format or 'text', f'{self.pages}p']
+        if self.target:
+            parts.append(self.target)
+        return ':'.join(parts)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks"""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes"""
+    peak = 0
+    if resource is not None:
+        # KB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return max(peak, _current_rss())
+
+
+def _measure(case: BenchCase, repeat: int, max_seconds: float, warmup: int) -> Dict:
+    """Run a case in this process; at least one timed run, then up to `repeat`"""
+    for _ in range(warmup):
+        case.func()
+
+    baseline = _current_rss()
+    latencies = []
+    budget_end = time.perf_counter() + max_seconds
+    while len(latencies) < repeat:
+        started = time.perf_counter()
+        case.func()
+        latencies.append(time.perf_counter() - started)
+        if time.perf_counter() > budget_end:
+            break
+
+    return {'latencies': latencies, 'baseline_rss': baseline, 'peak_rss': _peak_rss()}
+
+
+def _child(conn, case: BenchCase, repeat: int, max_seconds: float, warmup: int):
+    try:
+        conn.send(('ok', _measure(case, repeat, max_seconds, warmup)))
+    except Exception as e:
+        conn.send(('error', f'{type(e).__name__}: {e}'))
+    finally:
+        conn.close()
+
+
+def run_case(case: BenchCase, repeat: int, max_seconds: float, warmup: int, isolate: bool) -> Dict:
+    """Measure a case, in a forked child when `isolate` is set"""
+    if not isolate:
+        try:
+            raw = _measure(case, repeat, max_seconds, warmup)
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+    else:
+        context = multiprocessing.get_context('fork')
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(target=_child, args=(child_conn, case, repeat, max_seconds, warmup))
+        process.start()
+        child_conn.close()
+        try:
+            status, raw = parent_conn.recv()
+        except EOFError:
+            status, raw = 'error', f'benchmark process died (exit code {process.exitcode})'
+        process.join()
+        if status == 'error':
+            return {'error': raw}
+
+    latencies = raw['latencies']
+    total = sum(latencies)
+    return {
+        'runs': len(latencies),
+        'latency_ms': {
+            'min': min(latencies) * 1000,
+            'mean': total / len(latencies) * 1000,
+            'p50': percentile(latencies, 50) * 1000,
+            'p90': percentile(latencies, 90) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000,
+        },
+        'ops_per_second': len(latencies) / total if total else math.inf,
+        'throughput_mb_s': case.input_bytes * len(latencies) / total / 1e6 if total else math.inf,
+        'baseline_rss_bytes': raw['baseline_rss'],
+        'peak_rss_bytes': raw['peak_rss'],
+        'rss_growth_bytes': max(0, raw['peak_rss'] - raw['baseline_rss']),
+    }
+
+
+def build_cases(
+    conversor: ConversorUniversalMelhorado,
+    corpus_dir: Path,
+    scratch_dir: Path,
+    sizes: Sequence[int],
+    formats: Sequence[str],
+    benchmarks: Sequence[str],
+    seed: int
+) -> List[BenchCase]:
+    """Every benchmark case for the requested sizes, formats and benchmarks"""
+    entries = build_corpus(conversor, corpus_dir, sizes, formats, seed)
+    by_key = {(entry['pages'], entry['format']): entry for entry in entries}
+
+    readers = {
+        'pdf': conversor.ler_pdf,
+        'docx': conversor.ler_docx,
+        'txt': conversor.ler_txt,
+        'html': conversor.ler_html,
+        'md': conversor.ler_md,
+    }
+    writers = {
+        'pdf': conversor.escrever_pdf,
+        'docx': conversor.escrever_docx,
+        'txt': conversor.escrever_txt,
+        'html': conversor.escrever_html,
+        'md': conversor.escrever_md,
+    }
+
+    cases = []
+    for pages in sizes:
+        text = generate_text(pages, seed)
+        text_bytes = len(text.encode('utf-8'))
+
+        if 'normalize' in benchmarks:
+            cases.append(BenchCase(
+                'normalize', lambda t=text: conversor._validar_e_limpar_texto(t), text_bytes, pages
+            ))
+        if 'classify' in benchmarks:
+            cases.append(BenchCase(
+                'classify', lambda t=text: conversor._detectar_estrutura_documento(t), text_bytes, pages
+            ))
+
+        for fmt in formats:
+            entry = by_key[(pages, fmt)]
+            source = str(corpus_dir / entry['path'])
+
+            if 'read' in benchmarks:
+                cases.append(BenchCase(
+                    'read', lambda r=readers[fmt], s=source: r(s), entry['bytes'], pages, fmt
+                ))
+            if 'write' in benchmarks:
+                output = str(scratch_dir / f'escrita_{pages}p{EXTENSIONS[fmt]}')
+                cases.append(BenchCase(
+                    'write', lambda w=writers[fmt], t=text, o=output: w(t, o), text_bytes, pages, fmt
+                ))
+            if 'convert' in benchmarks:
+                for target in formats:
+                    if target == fmt:
+                        continue
+                    output = str(scratch_dir / f'conversao_{pages}p_{fmt}{EXTENSIONS[target]}')
+                    cases.append(BenchCase(
+                        'convert',
+                        lambda s=source, o=output, t=target: _convert_or_fail(conversor, s, o, t),
+                        entry['bytes'], pages, fmt, target
+                    ))
+    return cases
+
+
+def _convert_or_fail(conversor: ConversorUniversalMelhorado, source: str, output: str, target: str):
+    # converter() reports failures as False; a benchmark must not time a failure
+    if not conversor.converter(source, output, target):
+        raise RuntimeError(f'conversion {source} -> {target} failed')
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Cases whose median latency grew by more than `threshold` (0.2 = 20%)"""
+    previous = {result['case']: result for result in baseline.get('results', []) if 'latency_ms' in result}
+    regressions = []
+    for result in report['results']:
+        before = previous.get(result['case'])
+        if not before or 'latency_ms' not in result:
+            continue
+        old, new = before['latency_ms']['p50'], result['latency_ms']['p50']
+        if old > 0 and (new - old) / old > threshold:
+            regressions.append({'case': result['case'], 'baseline_p50_ms': old, 'p50_ms': new,
+                                'change': (new - old) / old})
+    return regressions
+
+
+def run(args) -> Dict:
+    """Build the corpus, run every case and return the report"""
+    conversor = ConversorUniversalMelhorado()
+    corpus_dir = Path(args.corpus_dir)
+    isolate = not args.no_isolate and 'fork' in multiprocessing.get_all_start_methods()
+
+    with tempfile.TemporaryDirectory(prefix='conversor-bench-') as scratch:
+        cases = build_cases(
+            conversor, corpus_dir, Path(scratch), args.sizes, args.formats, args.benchmarks, args.seed
+        )
+
+        results = []
+        for number, case in enumerate(cases, 1):
+            outcome = run_case(case, args.repeat, args.max_seconds, args.warmup, isolate)
+            result = {
+                'case': case.key,
+                'bench': case.bench,
+                'format': case.format,
+                'target': case.target,
+                'pages': case.pages,
+                'input_bytes': case.input_bytes,
+            }
+            result.update(outcome)
+            results.append(result)
+
+            if 'error' in outcome:
+                summary = f"ERRO {outcome['error']}"
+            else:
+                summary = (f"p50 {outcome['latency_ms']['p50']:.1f} ms  "
+                           f"p95 {outcome['latency_ms']['p95']:.1f} ms  "
+                           f"pico RSS {outcome['peak_rss_bytes'] / 2**20:.0f} MB")
+            print(f'[{number}/{len(cases)}] {case.key:<28} {summary}', file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sizes': list(args.sizes),
+            'formats': list(args.formats),
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'isolated': isolate,
+        },
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks do conversor de documentos')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZE_CLASSES),
+                        help='Tamanhos do corpus em páginas (padrão: %(default)s)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5, help='Execuções medidas por caso')
+    parser.add_argument('--warmup', type=int, default=1, help='Execuções descartadas por caso')
+    parser.add_argument('--max-seconds', type=float, default=30.0,
+                        help='Orçamento de tempo por caso (ao menos uma execução sempre ocorre)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--corpus-dir', default=str(Path(tempfile.gettempdir()) / 'conversor-bench-corpus'),
+                        help='Diretório do corpus (reaproveitado entre execuções)')
+    parser.add_argument('--output', help='Arquivo JSON do relatório (padrão: stdout)')
+    parser.add_argument('--compare', help='Relatório anterior para detectar regressões')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Aumento relativo da mediana considerado regressão (padrão: 0.2)')
+    parser.add_argument('--no-isolate', action='store_true',
+                        help='Roda os casos no próprio processo (pico de RSS acumulado)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+
+    exit_code = 0
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        report['regressions'] = compare(report, baseline, args.threshold)
+        for regression in report['regressions']:
+            print(f"REGRESSÃO {regression['case']}: {regression['baseline_p50_ms']:.1f} ms -> "
+                  f"{regression['p50_ms']:.1f} ms ({regression['change']:+.0%})", file=sys.stderr)
+        exit_code = 1 if report['regressions'] else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,13 +21,46 @@ class Config:
     ALLOWED_EXTENSIONS = {
         'pdf', 'docx', 'doc', 'txt', 'html', 'htm', 'md', 'markdown'
     }
+    MAX_FILE_SIZES = {  # Tamanho máximo por extensão (planos de validação do FileSecurityValidator)
+        'pdf': 50 * 1024 * 1024,
+        'docx': 25 * 1024 * 1024,
+        'doc': 25 * 1024 * 1024,
+        'txt': 10 * 1024 * 1024,
+        'html': 10 * 1024 * 1024,
+        'htm': 10 * 1024 * 1024,
+        'md': 5 * 1024 * 1024,
+        'markdown': 5 * 1024 * 1024
+    }
     
     # Diretórios
     BASE_DIR = Path(__file__).parent
-    UPLOAD_FOLDER = BASE_DIR / 'uploads'
-    TEMP_FOLDER = BASE_DIR / 'temp'
+    # Dados gravados (uploads, temp, cache, artefatos e blobs) ficam juntos, num
+    # só sistema de arquivos: os nomes legíveis são hard links para os blobs.
+    # Em contêiner, aponte STORAGE_DIR para um único volume montado
+    STORAGE_DIR = Path(os.environ.get('STORAGE_DIR') or BASE_DIR)
+    UPLOAD_FOLDER = STORAGE_DIR / 'uploads'
+    TEMP_FOLDER = STORAGE_DIR / 'temp'
+    CACHE_FOLDER = STORAGE_DIR / 'cache'
+    ARTIFACTS_FOLDER = STORAGE_DIR / 'artifacts'  # Saídas disponíveis em /download/<id>
+    VARIANTS_FOLDER = ARTIFACTS_FOLDER / 'variants'  # Variantes comprimidas por SHA-256 do conteúdo
+    BLOBS_FOLDER = STORAGE_DIR / 'blobs'  # Conteúdo por SHA-256; nomes legíveis são hard links (mesmo disco)
     TEMPLATES_FOLDER = BASE_DIR / 'templates'
     
+    # Entrega dos arquivos convertidos (core/delivery.py): 'send_file' ou
+    # 'x-accel' (nginx envia via X-Accel-Redirect; ver docker/nginx.conf)
+    DELIVERY_MODE = os.environ.get('DELIVERY_MODE', 'send_file')
+    ACCEL_REDIRECT_PREFIX = '/_protected/artifacts'  # location interna do nginx
+    
+    # Saídas de texto comprimidas conforme Accept-Encoding (core/compression.py);
+    # brotli e zstd só são usados se os pacotes estiverem instalados
+    COMPRESSION_ENABLED = True
+    COMPRESSION_ENCODINGS = ('br', 'zstd', 'gzip')  # Ordem de preferência do servidor
+    COMPRESSION_MIN_SIZE = 1024  # Bytes; arquivos menores vão sem compressão
+    
+    # Envios em partes retomáveis (core/uploads.py): POST /envios, PUT das partes
+    # (cada uma até MAX_CONTENT_LENGTH) e POST /envios/<id>/concluir
+    CHUNKED_UPLOAD_MAX_SIZE = max(MAX_FILE_SIZES.values())
+    
     # Configurações de conversão
     CONVERSION_SETTINGS = {
         'pdf': {
@@ -58,15 +91,75 @@ class Config:
     # Configurações de logging
     LOG_LEVEL = 'INFO'  # DEBUG, INFO, WARNING, ERROR
     LOG_FILE = BASE_DIR / 'logs' / 'conversor.log'
+    LOG_ASYNC = True  # Handlers rodam numa thread de fundo (QueueListener)
+    LOG_QUEUE_SIZE = 10000  # Registros aguardando escrita antes de aplicar a política
+    LOG_QUEUE_POLICY = 'drop'  # 'drop' descarta (e conta) ou 'block' espera por espaço
+    LOG_QUEUE_BLOCK_TIMEOUT = 1.0  # Segundos que 'block' espera antes de descartar
+    LOG_REDACT_SPAN = False  # True: mascara só o valor (token=[REDACTED]), não a mensagem inteira
+    ENABLE_JSON_LOGGING = False  # Um objeto JSON por linha (NDJSON), via orjson se instalado
+    LOG_BATCH_WRITES = False  # Log principal gravado em lotes (uma escrita por lote)
+    LOG_BATCH_MAX_BYTES = 64 * 1024  # Tamanho do lote que dispara a escrita
+    LOG_BATCH_INTERVAL = 1.0  # Segundos máximos que um registro espera no lote
     
     # Configurações de performance
     MAX_WORKERS = 4  # Número de workers para processamento paralelo
     TIMEOUT = 300  # Timeout em segundos para conversões
     
+    # Pool de processos isolados para conversões (core/worker_pool.py)
+    USE_WORKER_POOL = True
+    WORKER_POOL_SIZE = MAX_WORKERS
+    WORKER_MAX_JOBS = 100  # Recicla o processo após N conversões
+    WORKER_MAX_RSS_MB = 512  # Recicla o processo se a memória residente passar disso
+    WORKER_MEMORY_LIMIT_MB = 1024  # RLIMIT_AS por processo
+    WORKER_CPU_LIMIT = TIMEOUT  # RLIMIT_CPU (segundos de CPU) por conversão
+    
+    # Controle de admissão (core/admission.py): vagas e fila por classe de formato
+    ADMISSION_CLASSES = {
+        'heavy': {'max_concurrent': 2, 'max_queue': 8, 'expected_seconds': 10.0},  # PDF, DOCX
+        'light': {'max_concurrent': 4, 'max_queue': 32, 'expected_seconds': 1.0},  # TXT, MD, HTML
+    }
+    ADMISSION_FORMAT_CLASSES = {'pdf': 'heavy', 'docx': 'heavy'}
+    ADMISSION_MAX_WAIT = 30  # Segundos que uma requisição pode esperar na fila
+    
+    # Uploads idênticos simultâneos (mesmo SHA-256 e formato de destino)
+    # compartilham uma única conversão (core/singleflight.py)
+    COALESCE_ENABLED = True
+    COALESCE_WAIT_TIMEOUT = 330  # Espera máxima de uma requisição duplicada (TIMEOUT + fila)
+    
+    # Limites de estrutura verificados antes dos leitores (core/container_inspection.py)
+    CONTAINER_MAX_ZIP_ENTRIES = 5000  # Entradas no diretório central de um DOCX
+    CONTAINER_MAX_UNCOMPRESSED = 512 * 1024 * 1024  # Total descompactado
+    CONTAINER_MAX_ENTRY_SIZE = 256 * 1024 * 1024  # Maior entrada descompactada
+    CONTAINER_MAX_RATIO = 200  # Taxa de compressão máxima (entradas acima de 1 MB)
+    CONTAINER_MAX_PDF_OBJECTS = 500000  # Objetos declarados no trailer do PDF
+    
+    # Perfilamento sob demanda (core/profiling.py); desligado por padrão
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true')
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')  # Cabeçalho X-Profile-Token e /admin/perfis
+    PROFILING_SAMPLE_RATE = 0.0  # Fração das conversões perfiladas sem cabeçalho
+    PROFILING_MODE = 'sampling'  # 'sampling' (amostragem de pilha) ou 'cprofile'
+    PROFILING_INTERVAL = 0.005  # Segundos entre amostras de pilha
+    PROFILING_DIR = BASE_DIR / 'profiles'
+    PROFILING_MAX_PROFILES = 50  # Mantém apenas os perfis mais recentes
+    
     # Configurações de cache
     ENABLE_CACHE = True
     CACHE_TIMEOUT = 3600  # 1 hora em segundos
     
+    # Faxina em segundo plano (core/janitor.py) de uploads, temp e cache:
+    # idade máxima e cota de bytes por diretório, com índice em vez de glob
+    JANITOR_ENABLED = True
+    JANITOR_INTERVAL = 60  # Segundos entre passadas
+    JANITOR_RESCAN_INTERVAL = 3600  # Releitura completa dos diretórios (arquivos fora do índice)
+    JANITOR_GRACE = 300  # Entradas mais novas que isso não são removidas por cota
+    JANITOR_AREAS = {
+        'uploads': {'max_age': 3600, 'max_bytes': 2 * 1024 * 1024 * 1024},
+        'temp': {'max_age': 3600, 'max_bytes': 1024 * 1024 * 1024},
+        'cache': {'max_age': CACHE_TIMEOUT, 'max_bytes': 1024 * 1024 * 1024},
+        'artifacts': {'max_age': 3600, 'max_bytes': 2 * 1024 * 1024 * 1024},
+        'variants': {'max_age': 3600, 'max_bytes': 1024 * 1024 * 1024},
+    }
+    
     # Configurações de interface
     UI_SETTINGS = {
         'theme_color': '#667eea',
@@ -117,6 +210,7 @@ class Config:
         # Cria diretórios necessários
         cls.UPLOAD_FOLDER.mkdir(exist_ok=True)
         cls.TEMP_FOLDER.mkdir(exist_ok=True)
+        cls.CACHE_FOLDER.mkdir(exist_ok=True)
         cls.LOG_FILE.parent.mkdir(exist_ok=True)
         
         # Configura Flask
@@ -139,8 +233,14 @@ class ProductionConfig(Config):
     HOST = '0.0.0.0'
 
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    if not SECRET_KEY:
-        raise ValueError("A SECRET_KEY deve ser definida na variável de ambiente em produção.")
+
+    @classmethod
+    def init_app(cls, app):
+        # Verificado ao criar o app, não ao importar: o app.py importa este
+        # módulo (ex.: MAX_FILE_SIZES) também fora de produção
+        if not cls.SECRET_KEY:
+            raise ValueError("A SECRET_KEY deve ser definida na variável de ambiente em produção.")
+        return super().init_app(app)
 
 class StagingConfig(Config):
     """Configurações para ambiente de homologação"""
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Admission control for conversion requests.
+
+Each format class (e.g. heavy PDF/DOCX output vs. light TXT/MD/HTML) has a
+bounded number of concurrent slots and a bounded FIFO wait queue. A request
+is rejected immediately when the queue is full or when its estimated wait
+already exceeds its deadline, so overload sheds a few requests quickly
+instead of slowing every request down.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from .exceptions import ServiceOverloadedError
+
+
+@dataclass
+class AdmissionClassConfig:
+    """Limits for one format class"""
+    max_concurrent: int = 4
+    max_queue: int = 16
+    expected_seconds: float = 2.0  # Initial service-time estimate
+
+
+class _Waiter:
+    """A queued request waiting to be handed a slot"""
+
+    __slots__ = ('event', 'granted')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _AdmissionClass:
+    """Slots, queue and counters for one format class"""
+
+    # Weight of the newest observation in the service-time average
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, name: str, config: AdmissionClassConfig):
+        self.name = name
+        self.config = config
+        self.lock = threading.Lock()
+        self.active = 0
+        self.queue: Deque[_Waiter] = deque()
+        self.avg_service_seconds = config.expected_seconds
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {'queue_full': 0, 'deadline': 0, 'wait_timeout': 0}
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+
+    def estimated_wait(self, position: int) -> float:
+        """Expected wait for a request at `position` in the queue (1-based)"""
+        rounds = math.ceil(position / self.config.max_concurrent)
+        return rounds * self.avg_service_seconds
+
+    def record_service(self, seconds: float):
+        """Fold an observed service time into the running average"""
+        self.avg_service_seconds += self.EWMA_ALPHA * (seconds - self.avg_service_seconds)
+
+
+@dataclass
+class AdmissionTicket:
+    """Proof of admission; pass back to release()"""
+    format_class: str
+    admitted_at: float
+    waited: float
+
+
+class AdmissionController:
+    """Bounded concurrency and bounded queues per format class"""
+
+    def __init__(
+        self,
+        classes: Dict[str, AdmissionClassConfig],
+        format_classes: Dict[str, str],
+        default_class: str,
+        max_wait: float = 30.0
+    ):
+        """
+        Initialize admission controller.
+
+        Args:
+            classes: Limits per format class name
+            format_classes: Target format -> class name
+            default_class: Class used for formats not in format_classes
+            max_wait: Default deadline (seconds) a request may spend queued
+        """
+        if default_class not in classes:
+            raise ValueError(f"Unknown default admission class: {default_class}")
+
+        self.classes = {name: _AdmissionClass(name, cfg) for name, cfg in classes.items()}
+        self.format_classes = dict(format_classes)
+        self.default_class = default_class
+        self.max_wait = max_wait
+
+    def class_for(self, target_format: str) -> str:
+        """Format class name for a target format"""
+        return self.format_classes.get(target_format, self.default_class)
+
+    def acquire(self, target_format: str, deadline: Optional[float] = None) -> AdmissionTicket:
+        """
+        Take a slot for a conversion to `target_format`, waiting if needed.
+
+        Args:
+            target_format: Output format of the conversion
+            deadline: Seconds the caller is willing to wait (default max_wait)
+
+        Raises:
+            ServiceOverloadedError: Queue full, deadline unreachable or expired
+        """
+        klass = self.classes[self.class_for(target_format)]
+        deadline = self.max_wait if deadline is None else min(deadline, self.max_wait)
+        started = time.monotonic()
+
+        with klass.lock:
+            if klass.active < klass.config.max_concurrent and not klass.queue:
+                klass.active += 1
+                klass.admitted += 1
+                return AdmissionTicket(klass.name, started, 0.0)
+
+            position = len(klass.queue) + 1
+            estimate = klass.estimated_wait(position)
+
+            if len(klass.queue) >= klass.config.max_queue:
+                self._reject(klass, 'queue_full', estimate)
+            if estimate > deadline:
+                self._reject(klass, 'deadline', estimate)
+
+            waiter = _Waiter()
+            klass.queue.append(waiter)
+            klass.max_queue_depth = max(klass.max_queue_depth, len(klass.queue))
+
+        waiter.event.wait(deadline)
+
+        with klass.lock:
+            waited = time.monotonic() - started
+            klass.wait_seconds_total += waited
+            if not waiter.granted:
+                klass.queue.remove(waiter)
+                self._reject(klass, 'wait_timeout', klass.estimated_wait(len(klass.queue) + 1))
+            klass.admitted += 1
+
+        return AdmissionTicket(klass.name, time.monotonic(), waited)
+
+    def release(self, ticket: AdmissionTicket):
+        """Free a slot, handing it straight to the oldest waiter if any"""
+        klass = self.classes[ticket.format_class]
+        with klass.lock:
+            klass.record_service(time.monotonic() - ticket.admitted_at)
+            if klass.queue:
+                waiter = klass.queue.popleft()
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                klass.active -= 1
+
+    @contextmanager
+    def admit(self, target_format: str, deadline: Optional[float] = None):
+        """Context manager around acquire()/release()"""
+        ticket = self.acquire(target_format, deadline)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _reject(self, klass: _AdmissionClass, reason: str, estimate: float):
+        """Count and raise a rejection (caller holds klass.lock)"""
+        klass.rejected[reason] += 1
+        raise ServiceOverloadedError(
+            f"Server busy: {klass.name} conversions are saturated",
+            details={
+                'format_class': klass.name,
+                'reason': reason,
+                'retry_after': max(1, math.ceil(estimate)),
+                'queue_depth': len(klass.queue),
+            }
+        )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-class gauges and counters for monitoring"""
+        stats = {}
+        for name, klass in self.classes.items():
+            with klass.lock:
+                stats[name] = {
+                    'active': klass.active,
+                    'queue_depth': len(klass.queue),
+                    'max_concurrent': klass.config.max_concurrent,
+                    'max_queue': klass.config.max_queue,
+                    'max_queue_depth_seen': klass.max_queue_depth,
+                    'admitted': klass.admitted,
+                    'rejected_queue_full': klass.rejected['queue_full'],
+                    'rejected_deadline': klass.rejected['deadline'],
+                    'rejected_wait_timeout': klass.rejected['wait_timeout'],
+                    'wait_seconds_total': klass.wait_seconds_total,
+                    'avg_service_seconds': klass.avg_service_seconds,
+                }
+        return stats
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Converted artifacts kept for re-download.
+
+Each conversion output is stored under an opaque random id, in a directory
+of its own (`<id>/content` plus `<id>/meta.json`), so the storage janitor
+ages it out as a single entry. The SHA-256 of the content is recorded at
+store time and serves as a strong ETag: downloads can be answered with
+304 Not Modified or with byte ranges without re-reading the file.
+
+With a BlobStore, `content` is a hard link to the output's blob, so the
+same output stored twice (re-conversions of the same file) takes the disk
+space of one.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+ARTIFACT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+CONTENT_NAME = 'content'
+META_NAME = 'meta.json'
+
+
+def valid_artifact_id(artifact_id: str) -> bool:
+    return bool(ARTIFACT_ID_RE.match(artifact_id or ''))
+
+
+def file_sha256(path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A stored conversion output"""
+    id: str
+    name: str  # download file name
+    size: int
+    sha256: str
+    created: float
+    path: Path
+
+    @property
+    def etag(self) -> str:
+        return self.sha256
+
+
+class ArtifactStore:
+    """Directory of converted artifacts addressed by id"""
+
+    def __init__(self, directory, janitor=None, blobs=None):
+        self.directory = Path(directory)
+        self.janitor = janitor
+        self.blobs = blobs
+
+    def store(self, source, name: str, sha256: Optional[str] = None) -> Artifact:
+        """
+        Keep a copy of `source` (hard-linked when possible) and return its Artifact.
+
+        `sha256`, when already known (e.g. another artifact's content), saves
+        reading the file again.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        artifact_id = uuid.uuid4().hex
+        folder = self.directory / artifact_id
+        folder.mkdir()
+        try:
+            content = folder / CONTENT_NAME
+            if self.blobs is not None:
+                digest, _ = self.blobs.put_file(source, sha256)
+                self.blobs.link(digest, content)
+            else:
+                try:
+                    os.link(source, content)
+                except OSError:
+                    shutil.copyfile(source, content)
+                digest = sha256 or file_sha256(content)
+            artifact = Artifact(artifact_id, name, content.stat().st_size, digest, time.time(), content)
+            meta = {key: value for key, value in asdict(artifact).items() if key != 'path'}
+            partial = folder / (META_NAME + '.tmp')
+            partial.write_text(json.dumps(meta), encoding='utf-8')
+            os.replace(partial, folder / META_NAME)
+        except BaseException:
+            shutil.rmtree(folder, ignore_errors=True)
+            raise
+        if self.janitor is not None:
+            self.janitor.track(folder, size=artifact.size, created=artifact.created)
+        return artifact
+
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        """The artifact, or None if the id is malformed, unknown or expired"""
+        if not valid_artifact_id(artifact_id):
+            return None
+        folder = self.directory / artifact_id
+        try:
+            meta = json.loads((folder / META_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        content = folder / CONTENT_NAME
+        if not content.is_file():
+            return None
+        return Artifact(path=content, **meta)
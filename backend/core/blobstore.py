@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed blob store.
+
+Every upload and every output is kept once, under its SHA-256, in
+directories sharded by the first hex digits (`ab/cd/abcd...`). Blobs are
+written to a temporary name inside the store and renamed into place, so
+a blob path either does not exist or holds the complete content; a blob
+that already exists is never written again.
+
+Places that need a readable name (a request workspace, an artifact's
+`content`) get a hard link to the blob. The link count is the reference
+count: a blob whose only link is its own store entry is unreferenced, and
+`collect` removes it once it has stayed that way for a grace period. This
+holds across worker processes without any bookkeeping of our own, and
+deleting a workspace or an artifact is all it takes to drop a reference.
+Blobs are read-only, so no named link can change the stored content.
+
+When the store and the target are on different filesystems, `link` falls
+back to a copy (correct, but without the deduplication).
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import stat
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+BLOCK_SIZE = 1024 * 1024
+TMP_DIR = 'tmp'
+
+
+class BlobStore:
+    """Blobs by SHA-256, referenced through hard links"""
+
+    def __init__(self, directory, shard_depth: int = 2):
+        self.directory = Path(directory)
+        self.shard_depth = shard_depth
+        self._lock = threading.Lock()
+        self._stats = {'puts': 0, 'dedup_hits': 0, 'bytes_written': 0, 'bytes_deduplicated': 0,
+                       'links': 0, 'link_copies': 0, 'collected_total': 0, 'reclaimed_bytes_total': 0}
+
+    def path_for(self, digest: str) -> Path:
+        """Where the blob for `digest` lives (whether or not it exists)"""
+        if not SHA256_RE.match(digest):
+            raise ValueError(f'Not a SHA-256 hex digest: {digest!r}')
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return self.directory.joinpath(*shards, digest)
+
+    def lookup(self, digest: str) -> Optional[Path]:
+        """Path of the blob if stored, else None (one stat, no index)"""
+        path = self.path_for(digest)
+        return path if path.exists() else None
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _temporary(self) -> Path:
+        tmp = self.directory / TMP_DIR
+        tmp.mkdir(parents=True, exist_ok=True)
+        return tmp / f'{uuid.uuid4().hex}.part'
+
+    def _place(self, temporary: Path, digest: str, size: int) -> Path:
+        """Rename a complete temporary file into place, unless the blob already exists"""
+        final = self.path_for(digest)
+        if final.exists():
+            temporary.unlink()
+            self._count('dedup_hits')
+            self._count('bytes_deduplicated', size)
+            return final
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(temporary, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(temporary, final)
+        self._count('bytes_written', size)
+        return final
+
+    def put_stream(self, stream: BinaryIO, digest: Optional[str] = None) -> Tuple[str, Path]:
+        """
+        Store the content of `stream` (read from its current position).
+
+        With a known `digest` of an existing blob nothing is read at all.
+        """
+        self._count('puts')
+        if digest is not None:
+            existing = self.lookup(digest)
+            if existing is not None:
+                self._count('dedup_hits')
+                self._count('bytes_deduplicated', existing.stat().st_size)
+                return digest, existing
+
+        temporary = self._temporary()
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(temporary, 'wb') as out:
+                for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+                    hasher.update(block)
+                    out.write(block)
+                    size += len(block)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+        digest = hasher.hexdigest()
+        return digest, self._place(temporary, digest, size)
+
+    def put_file(self, source, digest: Optional[str] = None) -> Tuple[str, Path]:
+        """
+        Store an existing file, adopting it by hard link when possible (no copy).
+
+        `source` itself becomes a reference to the blob (and read-only), so it
+        must not be a file anything may still write to; copy those in with
+        `put_stream` instead.
+        """
+        source = Path(source)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(source, 'rb') as f:
+                for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+
+        self._count('puts')
+        size = source.stat().st_size
+        existing = self.lookup(digest)
+        if existing is not None:
+            self._count('dedup_hits')
+            self._count('bytes_deduplicated', size)
+            return digest, existing
+
+        temporary = self._temporary()
+        try:
+            os.link(source, temporary)
+        except OSError:
+            shutil.copyfile(source, temporary)
+        return digest, self._place(temporary, digest, size)
+
+    def link(self, digest: str, destination) -> Path:
+        """Give the blob a readable name (one more reference)"""
+        destination = Path(destination)
+        blob = self.path_for(digest)
+        try:
+            os.link(blob, destination)
+            self._count('links')
+        except OSError as e:
+            if not blob.exists():
+                raise FileNotFoundError(f'Blob {digest} is not stored') from e
+            shutil.copyfile(blob, destination)
+            self._count('link_copies')
+        return destination
+
+    def refcount(self, digest: str) -> int:
+        """Named links to the blob, besides its own store entry"""
+        try:
+            return os.stat(self.path_for(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def collect(self, grace: float = 300.0) -> Tuple[int, int]:
+        """
+        Remove blobs without references for at least `grace` seconds.
+
+        The link count changes a blob's ctime, so ctime tells how long it
+        has been unreferenced. Returns (blobs removed, bytes reclaimed).
+        """
+        now = time.time()
+        removed = reclaimed = 0
+        for root, _, files in os.walk(self.directory):
+            if Path(root).name == TMP_DIR:
+                # Interrupted writes; nothing links to these
+                for name in files:
+                    path = Path(root) / name
+                    try:
+                        if now - path.stat().st_mtime > grace:
+                            path.unlink()
+                    except FileNotFoundError:
+                        pass
+                continue
+            for name in files:
+                if not SHA256_RE.match(name):
+                    continue
+                path = Path(root) / name
+                try:
+                    info = path.stat()
+                except FileNotFoundError:
+                    continue
+                if info.st_nlink <= 1 and now - info.st_ctime > grace:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                    reclaimed += info.st_size
+        self._count('collected_total', removed)
+        self._count('reclaimed_bytes_total', reclaimed)
+        return removed, reclaimed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -5,10 +5,13 @@ Caching utilities for improved performance
 """
 
 import hashlib
+import os
 import pickle
+import sqlite3
+import threading
 import time
 from pathlib import Path
-from typing import Any, Optional, Callable, Dict
+from typing import Any, Optional, Callable, Dict, List
 from functools import wraps
 import logging
 
@@ -16,20 +19,118 @@ logger = logging.getLogger(__name__)
 
 
 class FileCache:
-    """Simple file-based cache for conversion results"""
+    """
+    File-based cache for conversion results, indexed by SQLite.
+
+    Values are pickled to `<key>.cache` files; a small SQLite database in the
+    same directory records each key's size, expiry and last access. A hit is
+    one index lookup plus one open (no stat), and cleanup_expired walks the
+    expiry index, so its cost follows the number of expired entries rather
+    than the number of files. If the index is missing or unreadable it is
+    rebuilt from one directory scan at startup.
+
+    The index file name starts with a dot so the storage janitor leaves it
+    alone; files the janitor removes are dropped from the index on the next
+    lookup.
+    """
     
-    def __init__(self, cache_dir: Path, max_age: int = 3600):
+    INDEX_NAME = '.index.sqlite3'
+    # Last-access times are written in batches, not on every hit
+    ACCESS_FLUSH_SIZE = 256
+    
+    STAT_NAMES = ('hits', 'misses', 'sets', 'expired', 'errors')
+
+    def __init__(self, cache_dir: Path, max_age: int = 3600, janitor=None):
         """
         Initialize file cache.
         
         Args:
             cache_dir: Directory to store cache files
             max_age: Maximum age of cache entries in seconds
+            janitor: Optional StorageJanitor indexing the cache directory
         """
         self.cache_dir = Path(cache_dir)
         self.max_age = max_age
+        self.janitor = janitor
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._stats = dict.fromkeys(self.STAT_NAMES, 0)
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._db = self._open_index()
     
+    # Index
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.cache_dir / self.INDEX_NAME), check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _open_index(self) -> sqlite3.Connection:
+        """Open the index, rebuilding it from the directory when it is new or corrupt"""
+        try:
+            db = self._connect()
+            exists = db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries'"
+            ).fetchone()
+            if exists and db.execute('PRAGMA quick_check').fetchone()[0] == 'ok':
+                return db
+            db.close()
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Cache index unreadable, rebuilding: {e}")
+        for suffix in ('', '-wal', '-shm'):
+            (self.cache_dir / (self.INDEX_NAME + suffix)).unlink(missing_ok=True)
+        db = self._connect()
+        self._rebuild(db)
+        return db
+
+    def _rebuild(self, db: sqlite3.Connection):
+        """Create the schema and index every .cache file found in the directory"""
+        db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+            """
+        )
+        rows = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.cache') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                rows.append((entry.name[:-len('.cache')], stat.st_size,
+                             stat.st_mtime + self.max_age, stat.st_mtime))
+        with db:
+            db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', rows)
+        if rows:
+            logger.info(f"Cache index rebuilt with {len(rows)} entries")
+
+    def _flush_accessed(self):
+        """Write buffered last-access times (caller holds the lock)"""
+        if self._accessed:
+            with self._db:
+                self._db.executemany('UPDATE entries SET accessed = ? WHERE key = ?',
+                                     [(stamp, key) for key, stamp in self._accessed.items()])
+            self._accessed.clear()
+
+    def _drop(self, keys: List[str]):
+        """Remove files and index rows (caller holds the lock)"""
+        for key in keys:
+            cache_path = self._get_cache_path(key)
+            cache_path.unlink(missing_ok=True)
+            if self.janitor is not None:
+                self.janitor.forget(cache_path)
+            self._accessed.pop(key, None)
+        with self._db:
+            self._db.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in keys])
+
+    # Cache API
+
     def _get_cache_key(self, *args, **kwargs) -> str:
         """Generate cache key from arguments"""
         key_data = str(args) + str(sorted(kwargs.items()))
@@ -42,42 +143,76 @@ class FileCache:
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         try:
-            cache_path = self._get_cache_path(key)
-            
-            if not cache_path.exists():
-                return None
+            now = time.time()
+            with self._lock:
+                row = self._db.execute('SELECT expires FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    self._stats['misses'] += 1
+                    return None
+                
+                # Check if cache is expired
+                if row[0] <= now:
+                    self._drop([key])
+                    self._stats['expired'] += 1
+                    self._stats['misses'] += 1
+                    return None
             
-            # Check if cache is expired
-            if time.time() - cache_path.stat().st_mtime > self.max_age:
-                cache_path.unlink(missing_ok=True)
+            try:
+                with open(self._get_cache_path(key), 'rb') as f:
+                    value = pickle.load(f)
+            except FileNotFoundError:
+                # Removed behind the index's back (janitor, manual cleanup)
+                with self._lock:
+                    self._drop([key])
+                    self._stats['misses'] += 1
                 return None
             
-            with open(cache_path, 'rb') as f:
-                return pickle.load(f)
+            with self._lock:
+                self._stats['hits'] += 1
+                self._accessed[key] = now
+                if len(self._accessed) >= self.ACCESS_FLUSH_SIZE:
+                    self._flush_accessed()
+            return value
                 
         except Exception as e:
             logger.warning(f"Cache read error: {e}")
+            self._stats['errors'] += 1
+            self._stats['misses'] += 1
             return None
     
     def set(self, key: str, value: Any) -> bool:
         """Set value in cache"""
         try:
             cache_path = self._get_cache_path(key)
+            # Thread ids repeat across the pool's processes: the pid keeps
+            # concurrent writers of the same key on separate partial files
+            partial = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
             
-            with open(cache_path, 'wb') as f:
+            with open(partial, 'wb') as f:
                 pickle.dump(value, f)
+                size = f.tell()
+            os.replace(partial, cache_path)
             
+            now = time.time()
+            with self._lock:
+                with self._db:
+                    self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                     (key, size, now + self.max_age, now))
+                self._stats['sets'] += 1
+            if self.janitor is not None:
+                self.janitor.track(cache_path, size=size)
             return True
             
         except Exception as e:
             logger.warning(f"Cache write error: {e}")
+            self._stats['errors'] += 1
             return False
     
     def delete(self, key: str) -> bool:
         """Delete value from cache"""
         try:
-            cache_path = self._get_cache_path(key)
-            cache_path.unlink(missing_ok=True)
+            with self._lock:
+                self._drop([key])
             return True
         except Exception as e:
             logger.warning(f"Cache delete error: {e}")
@@ -87,28 +222,43 @@ class FileCache:
         """Clear all cache entries"""
         count = 0
         try:
-            for cache_file in self.cache_dir.glob("*.cache"):
-                cache_file.unlink(missing_ok=True)
-                count += 1
+            with self._lock:
+                keys = [row[0] for row in self._db.execute('SELECT key FROM entries')]
+                self._drop(keys)
+                count = len(keys)
         except Exception as e:
             logger.warning(f"Cache clear error: {e}")
         
         return count
     
     def cleanup_expired(self) -> int:
-        """Remove expired cache entries"""
+        """Remove expired cache entries (walks the expiry index only)"""
         count = 0
         current_time = time.time()
         
         try:
-            for cache_file in self.cache_dir.glob("*.cache"):
-                if current_time - cache_file.stat().st_mtime > self.max_age:
-                    cache_file.unlink(missing_ok=True)
-                    count += 1
+            with self._lock:
+                keys = [row[0] for row in self._db.execute(
+                    'SELECT key FROM entries WHERE expires <= ? ORDER BY expires', (current_time,)
+                )]
+                self._drop(keys)
+                self._flush_accessed()
+                count = len(keys)
         except Exception as e:
             logger.warning(f"Cache cleanup error: {e}")
         
+        self._stats['expired'] += count
         return count
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for monitoring"""
+        return dict(self._stats)
+
+    def close(self):
+        """Flush pending access times and close the index"""
+        with self._lock:
+            self._flush_accessed()
+            self._db.close()
 
 
 def cached(cache_instance: FileCache, key_func: Optional[Callable] = None):
@@ -160,6 +310,7 @@ class MemoryCache:
         self.max_age = max_age
         self.cache: Dict[str, Dict[str, Any]] = {}
         self.access_order: list = []
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
     
     def _cleanup_expired(self):
         """Remove expired entries"""
@@ -184,14 +335,18 @@ class MemoryCache:
         if self.access_order:
             lru_key = self.access_order[0]
             self._remove_key(lru_key)
+            self._stats['evictions'] += 1
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         self._cleanup_expired()
         
         if key not in self.cache:
+            self._stats['misses'] += 1
             return None
         
+        self._stats['hits'] += 1
+        
         # Update access order
         if key in self.access_order:
             self.access_order.remove(key)
@@ -229,4 +384,10 @@ class MemoryCache:
     
     def size(self) -> int:
         """Get current cache size"""
-        return len(self.cache)
\ No newline at end of file
+        return len(self.cache)
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for monitoring"""
+        stats = dict(self._stats)
+        stats['size'] = len(self.cache)
+        return stats
\ No newline at end of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-encoding for text outputs (HTML, TXT, MD).
+
+gzip is always available (stdlib); brotli and zstd are used when their
+packages are installed. Compression is incremental: `compress_chunks` turns
+an iterable of byte chunks into compressed chunks with bounded memory, so
+it works equally for files read in blocks and for output produced chunk by
+chunk.
+
+Compressed variants are kept in a VariantStore, by content SHA-256
+(`<sha256>.<ext>`), so every artifact with the same content (coalesced
+followers, re-uploads) shares one. On a miss, `VariantStore.stream` yields
+the compressed chunks as they are produced, so the first download starts
+right away, and writes them to the variant at the same time; the variant
+is renamed into place only when complete.
+"""
+
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Extensions of outputs worth compressing
+TEXT_EXTENSIONS = frozenset({'.html', '.htm', '.txt', '.md', '.markdown'})
+# Suffix of the cached variant for each content-coding
+VARIANT_SUFFIXES = {'gzip': '.gz', 'br': '.br', 'zstd': '.zst'}
+CHUNK_SIZE = 64 * 1024
+
+
+def available_encodings() -> List[str]:
+    """Content-codings this process can produce, in order of preference"""
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return encodings
+
+
+def is_compressible(name: str) -> bool:
+    return Path(name).suffix.lower() in TEXT_EXTENSIONS
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str, level: Optional[int] = None) -> Iterator[bytes]:
+    """Compress a stream of chunks incrementally, yielding compressed chunks"""
+    if encoding == 'gzip':
+        # wbits 16+: gzip container, as expected for Content-Encoding: gzip
+        compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, finish = compressor.compress, compressor.flush
+    elif encoding == 'br' and brotli is not None:
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=5 if level is None else level)
+        compress, finish = compressor.process, compressor.finish
+    elif encoding == 'zstd' and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+        compress, finish = compressor.compress, compressor.flush
+    else:
+        raise ValueError(f'Unsupported content-coding: {encoding!r}')
+
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    data = finish()
+    if data:
+        yield data
+
+
+def read_chunks(path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        yield from iter(lambda: f.read(chunk_size), b'')
+
+
+class VariantStore:
+    """Compressed variants of artifact contents, addressed by content SHA-256"""
+
+    def __init__(self, directory, janitor=None):
+        self.directory = Path(directory)
+        self.janitor = janitor
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'builds': 0, 'builds_aborted': 0, 'bytes_written': 0}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def path_for(self, sha256: str, encoding: str) -> Path:
+        return self.directory / (sha256 + VARIANT_SUFFIXES[encoding])
+
+    def lookup(self, sha256: str, encoding: str) -> Optional[Path]:
+        """The complete variant, or None if it has not been built (or was reaped)"""
+        path = self.path_for(sha256, encoding)
+        if not path.is_file():
+            return None
+        self._count('hits')
+        return path
+
+    def stream(self, source, sha256: str, encoding: str) -> Iterator[bytes]:
+        """
+        Compress `source` chunk by chunk, yielding the compressed chunks and
+        writing them to the variant as they go.
+
+        The variant is written to a temporary name and renamed into place
+        once complete, so concurrent requests never see a partial file (if
+        two build it at the same time, the last rename wins with identical
+        content). If the consumer stops early (client gone), the partial
+        file is dropped.
+        """
+        variant = self.path_for(sha256, encoding)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = variant.with_name(f'{variant.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        size = 0
+        complete = False
+        try:
+            with open(partial, 'wb') as out:
+                for data in compress_chunks(read_chunks(source), encoding):
+                    out.write(data)
+                    size += len(data)
+                    yield data
+            os.replace(partial, variant)
+            complete = True
+        finally:
+            if not complete:
+                partial.unlink(missing_ok=True)
+                self._count('builds_aborted')
+        self._count('builds')
+        self._count('bytes_written', size)
+        if self.janitor is not None:
+            self.janitor.track(variant, size=size)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
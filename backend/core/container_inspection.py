@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bounded-cost structural inspection of ZIP-based (DOCX) and PDF uploads.
+
+Runs before the readers, so decompression bombs and object floods are
+rejected before python-docx or PyPDF2 allocate anything:
+
+- ZIP: the end-of-central-directory record gives the entry count and the
+  central directory size, which are checked before the directory itself is
+  read; its records are then walked (never decompressed) to sum uncompressed
+  sizes and find the worst compression ratio. ZIP64 is supported.
+- PDF: the object count is the trailer's (or cross-reference stream's)
+  /Size, found from the file tail via startxref. Files without a usable
+  trailer are scanned for 'N G obj' headers, stopping once over budget.
+"""
+
+import os
+import re
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+# Container kind inspected for each extension
+CONTAINER_KINDS = {'.docx': 'zip', '.pdf': 'pdf'}
+
+_EOCD = struct.Struct('<4s4H2LH')
+_EOCD_SIGNATURE = b'PK\x05\x06'
+_ZIP64_LOCATOR = struct.Struct('<4sLQL')
+_ZIP64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+_ZIP64_EOCD = struct.Struct('<4sQ2H2L4Q')
+_ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+_CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+_CENTRAL_HEADER_SIGNATURE = b'PK\x01\x02'
+_ZIP64_EXTRA_ID = 0x0001
+_MAX_COMMENT = 0xFFFF
+
+_STARTXREF_RE = re.compile(rb'startxref\s+(\d+)')
+_SIZE_RE = re.compile(rb'/Size\s+(\d+)')
+_OBJ_RE = re.compile(rb'\d+\s+\d+\s+obj\b')
+_PDF_TAIL_BYTES = 4096
+_PDF_SCAN_CHUNK = 1024 * 1024
+
+
+class ContainerFormatError(ValueError):
+    """The container's structure could not be read"""
+
+
+@dataclass
+class ContainerBudget:
+    """Limits a container must stay within to reach the readers"""
+    max_zip_entries: int = 5000
+    max_zip_uncompressed_bytes: int = 512 * 1024 * 1024
+    max_zip_entry_bytes: int = 256 * 1024 * 1024
+    max_zip_ratio: float = 200.0
+    zip_ratio_min_bytes: int = 1024 * 1024  # smaller entries may compress arbitrarily well
+    max_pdf_objects: int = 500000
+
+
+@dataclass
+class ContainerReport:
+    """Structure summary of one file and the budget rules it broke"""
+    kind: str
+    stats: Dict[str, Union[int, float]] = field(default_factory=dict)
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def within_budget(self) -> bool:
+        return not self.violations
+
+
+class ContainerInspector:
+    """Checks ZIP and PDF structure against a ContainerBudget"""
+
+    def __init__(self, budget: Optional[ContainerBudget] = None):
+        self.budget = budget or ContainerBudget()
+
+    def inspect(self, source: Union[str, Path, BinaryIO], ext: str) -> Optional[ContainerReport]:
+        """
+        Inspect a path or a seekable binary stream (whose position is restored).
+
+        Returns:
+            ContainerReport, or None for extensions that are not containers
+        """
+        kind = CONTAINER_KINDS.get(ext.lower())
+        return self.inspect_kind(source, kind) if kind else None
+
+    def inspect_kind(self, source: Union[str, Path, BinaryIO], kind: str) -> ContainerReport:
+        """Inspect `source` as a 'zip' or 'pdf' container"""
+        inspect = self._inspect_zip if kind == 'zip' else self._inspect_pdf
+        if isinstance(source, (str, Path)):
+            with open(source, 'rb') as f:
+                return self._run(inspect, kind, f)
+        position = source.tell()
+        try:
+            return self._run(inspect, kind, source)
+        finally:
+            source.seek(position)
+
+    def _run(self, inspect, kind: str, f: BinaryIO) -> ContainerReport:
+        size = f.seek(0, os.SEEK_END)
+        try:
+            return inspect(f, size)
+        except (ContainerFormatError, struct.error) as e:
+            return ContainerReport(kind, {'bytes': size}, [f'malformed {kind}: {e}'])
+
+    # ZIP
+
+    def _read_zip_directory_location(self, f: BinaryIO, size: int) -> Tuple[int, int, int]:
+        """(entry count, central directory size, central directory offset)"""
+        tail_length = min(size, _EOCD.size + _MAX_COMMENT)
+        f.seek(size - tail_length)
+        tail = f.read(tail_length)
+        position = tail.rfind(_EOCD_SIGNATURE)
+        if position < 0 or len(tail) - position < _EOCD.size:
+            raise ContainerFormatError('end of central directory not found')
+        _, _, _, _, entries, directory_size, directory_offset, _ = _EOCD.unpack_from(tail, position)
+
+        if entries == 0xFFFF or directory_size == 0xFFFFFFFF or directory_offset == 0xFFFFFFFF:
+            locator_position = position - _ZIP64_LOCATOR.size
+            if locator_position < 0:
+                locator_start = size - tail_length + locator_position
+                f.seek(locator_start)
+                locator = f.read(_ZIP64_LOCATOR.size)
+            else:
+                locator = tail[locator_position:position]
+            signature, _, zip64_offset, _ = _ZIP64_LOCATOR.unpack(locator)
+            if signature != _ZIP64_LOCATOR_SIGNATURE:
+                raise ContainerFormatError('ZIP64 locator not found')
+            f.seek(zip64_offset)
+            record = f.read(_ZIP64_EOCD.size)
+            if len(record) < _ZIP64_EOCD.size or not record.startswith(_ZIP64_EOCD_SIGNATURE):
+                raise ContainerFormatError('ZIP64 end of central directory not found')
+            _, _, _, _, _, _, _, entries, directory_size, directory_offset = _ZIP64_EOCD.unpack(record)
+
+        if directory_offset + directory_size > size:
+            raise ContainerFormatError('central directory beyond end of file')
+        return entries, directory_size, directory_offset
+
+    @staticmethod
+    def _zip64_sizes(extra: bytes, compressed: int, uncompressed: int) -> Tuple[int, int]:
+        position = 0
+        while position + 4 <= len(extra):
+            header_id, length = struct.unpack_from('<2H', extra, position)
+            data = extra[position + 4:position + 4 + length]
+            if header_id == _ZIP64_EXTRA_ID:
+                values = iter(struct.unpack_from(f'<{len(data) // 8}Q', data))
+                # Present only for the fields saturated in the fixed header, in this order
+                if uncompressed == 0xFFFFFFFF:
+                    uncompressed = next(values, uncompressed)
+                if compressed == 0xFFFFFFFF:
+                    compressed = next(values, compressed)
+                break
+            position += 4 + length
+        return compressed, uncompressed
+
+    def _inspect_zip(self, f: BinaryIO, size: int) -> ContainerReport:
+        budget = self.budget
+        entries, directory_size, directory_offset = self._read_zip_directory_location(f, size)
+        report = ContainerReport('zip', {'bytes': size, 'entries': entries})
+
+        # Decided before reading the directory: its size follows from the entry count
+        if entries > budget.max_zip_entries:
+            report.violations.append(f'{entries} entries (max {budget.max_zip_entries})')
+            return report
+        # Generous per-entry allowance for names, extra fields and comments
+        max_directory = entries * (_CENTRAL_HEADER.size + 4096)
+        if directory_size > max_directory:
+            report.violations.append(f'central directory of {directory_size} bytes for {entries} entries')
+            return report
+
+        f.seek(directory_offset)
+        directory = f.read(directory_size)
+        total_uncompressed = 0
+        total_compressed = 0
+        largest_entry = 0
+        worst_ratio = 0.0
+        position = 0
+        for _ in range(entries):
+            if directory[position:position + 4] != _CENTRAL_HEADER_SIGNATURE:
+                raise ContainerFormatError('truncated central directory')
+            fields = _CENTRAL_HEADER.unpack_from(directory, position)
+            compressed, uncompressed = fields[8], fields[9]
+            name_length, extra_length, comment_length = fields[10], fields[11], fields[12]
+            extra_start = position + _CENTRAL_HEADER.size + name_length
+            if compressed == 0xFFFFFFFF or uncompressed == 0xFFFFFFFF:
+                compressed, uncompressed = self._zip64_sizes(
+                    directory[extra_start:extra_start + extra_length], compressed, uncompressed
+                )
+            position = extra_start + extra_length + comment_length
+
+            total_uncompressed += uncompressed
+            total_compressed += compressed
+            largest_entry = max(largest_entry, uncompressed)
+            if uncompressed >= budget.zip_ratio_min_bytes:
+                worst_ratio = max(worst_ratio, uncompressed / max(compressed, 1))
+
+        report.stats.update({
+            'uncompressed_bytes': total_uncompressed,
+            'compressed_bytes': total_compressed,
+            'largest_entry_bytes': largest_entry,
+            'max_ratio': round(worst_ratio, 1),
+        })
+        if total_uncompressed > budget.max_zip_uncompressed_bytes:
+            report.violations.append(
+                f'{total_uncompressed} bytes uncompressed (max {budget.max_zip_uncompressed_bytes})'
+            )
+        if largest_entry > budget.max_zip_entry_bytes:
+            report.violations.append(f'entry of {largest_entry} bytes (max {budget.max_zip_entry_bytes})')
+        if worst_ratio > budget.max_zip_ratio:
+            report.violations.append(f'compression ratio {worst_ratio:.0f} (max {budget.max_zip_ratio:.0f})')
+        return report
+
+    # PDF
+
+    def _pdf_declared_objects(self, f: BinaryIO, size: int) -> Optional[int]:
+        """/Size of the newest trailer or cross-reference stream, if it can be found"""
+        tail_length = min(size, _PDF_TAIL_BYTES)
+        f.seek(size - tail_length)
+        tail = f.read(tail_length)
+
+        trailer = tail.rfind(b'trailer')
+        if trailer >= 0:
+            match = _SIZE_RE.search(tail, trailer)
+            if match:
+                return int(match.group(1))
+
+        # Cross-reference stream (PDF 1.5+): /Size is in the stream's dictionary
+        matches = list(_STARTXREF_RE.finditer(tail))
+        if matches:
+            offset = int(matches[-1].group(1))
+            if offset < size:
+                f.seek(offset)
+                match = _SIZE_RE.search(f.read(_PDF_TAIL_BYTES))
+                if match:
+                    return int(match.group(1))
+        return None
+
+    def _pdf_count_objects(self, f: BinaryIO, limit: int) -> int:
+        """Count object headers, stopping as soon as `limit` is exceeded"""
+        f.seek(0)
+        count = 0
+        carry = b''
+        resume = 0
+        while count <= limit:
+            chunk = f.read(_PDF_SCAN_CHUNK)
+            data = carry + chunk
+            # The last bytes are held back so a header cut by the chunk boundary is seen whole
+            cut = len(data) - 64 if chunk else len(data)
+            last_end = 0
+            for match in _OBJ_RE.finditer(data, resume):
+                if match.start() >= cut:
+                    break
+                count += 1
+                last_end = match.end()
+            if not chunk:
+                break
+            carry = data[cut:]
+            resume = max(0, last_end - cut)
+        return count
+
+    def _inspect_pdf(self, f: BinaryIO, size: int) -> ContainerReport:
+        budget = self.budget
+        report = ContainerReport('pdf', {'bytes': size})
+        f.seek(0)
+        if not f.read(1024).lstrip().startswith(b'%PDF-'):
+            raise ContainerFormatError('missing %PDF header')
+
+        objects = self._pdf_declared_objects(f, size)
+        if objects is None:
+            objects = self._pdf_count_objects(f, budget.max_pdf_objects)
+            report.stats['objects_scanned'] = True
+        report.stats['objects'] = objects
+        if objects > budget.max_pdf_objects:
+            report.violations.append(f'{objects} objects (max {budget.max_pdf_objects})')
+        return report
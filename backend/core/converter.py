@@ -7,8 +7,6 @@ Document Conversion Engine - Refactored with Design Patterns
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
 from pathlib import Path
-import tempfile
-import shutil
 from dataclasses import dataclass
 from enum import Enum
 
@@ -38,6 +36,7 @@ class DocumentMetadata:
     page_count: Optional[int] = None
     word_count: Optional[int] = None
     structure_elements: Optional[List[str]] = None
+    encoding: Optional[str] = None  # Detected source encoding for text formats
 
 class DocumentReader(ABC):
     """Abstract base class for document readers"""
@@ -76,7 +75,6 @@ class DocumentProcessor:
     def __init__(self):
         self.readers: List[DocumentReader] = []
         self.writers: List[DocumentWriter] = []
-        self.temp_dir = Path(tempfile.mkdtemp())
     
     def register_reader(self, reader: DocumentReader):
         """Register a document reader"""
@@ -126,9 +124,10 @@ class DocumentProcessor:
             content = reader.read(input_path)
             metadata = reader.extract_metadata(input_path)
             
-            # Generate output path if not provided
+            # Generate output path if not provided (next to the input, so it
+            # stays inside the caller's workspace; the processor holds no files)
             if not output_path:
-                output_path = self.temp_dir / f"{input_path.stem}_converted.{output_format.value}"
+                output_path = input_path.with_name(f"{input_path.stem}_converted.{output_format.value}")
             
             # Write converted content
             result = writer.write(content, output_path, metadata)
@@ -141,11 +140,6 @@ class DocumentProcessor:
                 message="Conversion failed",
                 error_details=str(e)
             )
-    
-    def __del__(self):
-        """Cleanup temporary directory"""
-        if hasattr(self, 'temp_dir') and self.temp_dir.exists():
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
 
 # Factory pattern for creating processors
 class DocumentProcessorFactory:
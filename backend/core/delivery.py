@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Delivery of stored artifacts.
+
+Two modes:
+
+- 'send_file': the Python worker streams the file (werkzeug handles
+  If-None-Match and Range itself).
+- 'x-accel': the response carries no body, only an X-Accel-Redirect header
+  naming an internal nginx location mapped onto the artifacts directory;
+  nginx then sends the file with sendfile(2), and the worker is free as
+  soon as the headers are written. Validators stay the app's: a matching
+  If-None-Match is answered with 304 here, without a redirect. Range
+  requests are served by nginx.
+
+Text artifacts are offered compressed when the client accepts one of the
+configured content-codings, with their own strong ETag (`<sha256>-<coding>`).
+The variant is kept per content SHA-256 in a VariantStore under the
+artifacts directory and, once built, delivered like the original. The
+first download of a variant is compressed on the fly and streamed by the
+worker (in both modes, without Range support) while the variant is written.
+"""
+
+import mimetypes
+from pathlib import Path
+from typing import Optional, Sequence
+
+from flask import current_app, request, send_file
+
+from .artifacts import Artifact
+from .compression import VariantStore, available_encodings, is_compressible
+
+DELIVERY_MODES = ('send_file', 'x-accel')
+
+
+def accel_redirect_uri(artifact: Artifact, prefix: str, path: Optional[Path] = None) -> str:
+    """
+    Internal nginx URI of an artifact's content, or of a file (variant) under
+    the same artifacts directory
+    """
+    root = artifact.path.parent.parent
+    relative = (path or artifact.path).relative_to(root)
+    return f"{prefix.rstrip('/')}/{relative.as_posix()}"
+
+
+def negotiate_encoding(artifact: Artifact, encodings: Sequence[str], min_size: int = 0) -> Optional[str]:
+    """
+    Content-coding to send `artifact` with for the current request, or None for identity.
+
+    `encodings` is the server's preference order; codings whose package is
+    not installed are skipped.
+    """
+    if not encodings or artifact.size < min_size or not is_compressible(artifact.name):
+        return None
+    usable = available_encodings()
+    return request.accept_encodings.best_match([e for e in encodings if e in usable])
+
+
+def _attachment(artifact: Artifact, etag: str, body=None):
+    """Header-only (or streamed) download response, answered with 304 when the ETag matches"""
+    response = current_app.response_class(body)
+    response.mimetype = mimetypes.guess_type(artifact.name)[0] or 'application/octet-stream'
+    response.headers.set('Content-Disposition', 'attachment', filename=artifact.name)
+    response.set_etag(etag)
+    response.last_modified = artifact.created
+    response.make_conditional(request)
+    return response
+
+
+def send_artifact(artifact: Artifact, mode: str = 'send_file', accel_prefix: str = '/_protected/artifacts',
+                  encodings: Sequence[str] = (), min_compress_size: int = 0,
+                  variants: Optional[VariantStore] = None):
+    """
+    Response delivering `artifact` as a download, for the current request.
+
+    Compression needs `variants` (the store of compressed variants); without
+    it the artifact is always sent as is.
+    """
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f'Unknown delivery mode: {mode!r}')
+
+    encoding = negotiate_encoding(artifact, encodings, min_compress_size) if variants is not None else None
+    etag = f'{artifact.etag}-{encoding}' if encoding else artifact.etag
+    path: Optional[Path] = artifact.path
+    if encoding:
+        path = variants.lookup(artifact.sha256, encoding)
+
+    if path is None:
+        # First request for this variant: compress while sending
+        response = _attachment(artifact, etag, variants.stream(artifact.path, artifact.sha256, encoding))
+    elif mode == 'send_file':
+        response = send_file(path, as_attachment=True, download_name=artifact.name,
+                             etag=etag, last_modified=artifact.created)
+    else:
+        response = _attachment(artifact, etag)
+        if response.status_code != 304:
+            # nginx follows X-Accel-Redirect whatever the status, so only 200s carry it
+            response.headers['X-Accel-Redirect'] = accel_redirect_uri(artifact, accel_prefix, path)
+
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if variants is not None and encodings and is_compressible(artifact.name):
+        response.vary.add('Accept-Encoding')
+    return response
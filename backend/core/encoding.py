@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Text decoding with encoding detection.
+
+Files are read from disk exactly once (memory-mapped above a size threshold)
+and every decoding attempt works on that single buffer.
+"""
+
+import codecs
+import mmap
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# Files larger than this are memory-mapped instead of read into a bytes copy
+MMAP_THRESHOLD = 1024 * 1024
+
+# Bytes inspected for BOMs and <meta charset> declarations
+SNIFF_SIZE = 4096
+
+# Byte order marks, longest first (UTF-32 LE starts with the UTF-16 LE BOM)
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Tried in order when nothing is declared; latin-1 never fails
+FALLBACK_ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+
+# Declared labels that browsers (and legacy Windows tools) treat as cp1252
+DECLARED_ALIASES = {
+    'iso-8859-1': 'cp1252',
+    'iso8859-1': 'cp1252',
+    'latin1': 'cp1252',
+    'latin-1': 'cp1252',
+    'us-ascii': 'cp1252',
+    'ascii': 'cp1252',
+}
+
+META_CHARSET_RE = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:\-]+)',
+    re.IGNORECASE
+)
+XML_DECLARATION_RE = re.compile(rb'^<\?xml[^>]+encoding\s*=\s*["\']([A-Za-z0-9_.:\-]+)')
+
+_ESCAPED_BYTES_RE = re.compile('[\udc80-\udcff]+')
+_DECODED_NON_ASCII_RE = re.compile('[\u0080-\udc7f\udd00-\U0010ffff]')
+
+# cp1252 leaves five bytes undefined; those fall back to latin-1
+_SINGLE_BYTE_CHARS = {
+    byte: bytes([byte]).decode('cp1252', 'ignore') or bytes([byte]).decode('latin-1')
+    for byte in range(0x80, 0x100)
+}
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+@dataclass
+class DecodedText:
+    """Decoded document text and how it was decoded"""
+    text: str
+    encoding: str
+    bom: bool = False
+    declared: Optional[str] = None
+    mixed: bool = False  # UTF-8 with stray cp1252 bytes
+
+
+def _normalize_codec(label: Optional[str]) -> Optional[str]:
+    """Resolve a declared charset label to a Python codec name"""
+    if not label:
+        return None
+
+    label = label.strip().lower()
+    label = DECLARED_ALIASES.get(label, label)
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def sniff_bom(head: bytes) -> Tuple[Optional[str], int]:
+    """Return (encoding, bom_length) for a leading byte order mark"""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    return None, 0
+
+
+def sniff_declared_encoding(head: bytes) -> Optional[str]:
+    """Find a <meta charset> or XML declaration in the first bytes of a file"""
+    match = XML_DECLARATION_RE.match(head) or META_CHARSET_RE.search(head)
+    if match:
+        return _normalize_codec(match.group(1).decode('ascii', 'ignore'))
+    return None
+
+
+def _redecode_escaped(match) -> str:
+    """Map a run of surrogate-escaped bytes to their single-byte characters"""
+    return ''.join(_SINGLE_BYTE_CHARS[ord(char) - 0xDC00] for char in match.group())
+
+
+def _decode_utf8_mixed(data: Buffer) -> Optional[str]:
+    """
+    Decode UTF-8 text containing stray single-byte (cp1252) characters.
+
+    Returns None when the buffer has no valid multi-byte UTF-8 sequences,
+    in which case it is better treated as a single-byte encoding.
+    """
+    text = str(data, 'utf-8', 'surrogateescape')
+
+    if not _DECODED_NON_ASCII_RE.search(text):
+        return None
+
+    return _ESCAPED_BYTES_RE.sub(_redecode_escaped, text)
+
+
+def decode_bytes(data: Buffer, html: bool = False) -> DecodedText:
+    """
+    Decode a buffer using BOM, declared charset and a validated fallback chain.
+
+    Args:
+        data: Raw file content (bytes or any buffer, e.g. an mmap)
+        html: Also honour <meta charset> / XML encoding declarations
+
+    Returns:
+        DecodedText with the text and the encoding that produced it
+    """
+    head = bytes(data[:SNIFF_SIZE])
+
+    encoding, bom_length = sniff_bom(head)
+    if encoding:
+        body = memoryview(data)[bom_length:]
+        try:
+            return DecodedText(str(body, encoding, 'replace'), encoding, bom=True)
+        finally:
+            body.release()
+
+    declared = sniff_declared_encoding(head) if html else None
+    candidates = [declared] if declared else []
+    candidates.extend(enc for enc in FALLBACK_ENCODINGS if enc != declared)
+
+    for candidate in candidates:
+        try:
+            text = str(data, candidate, 'strict')
+        except UnicodeDecodeError:
+            if candidate == 'utf-8':
+                mixed = _decode_utf8_mixed(data)
+                if mixed is not None:
+                    return DecodedText(mixed, 'utf-8', declared=declared, mixed=True)
+            continue
+        return DecodedText(text, candidate, declared=declared)
+
+    # Unreachable in practice: latin-1 maps every byte
+    return DecodedText(str(data, 'latin-1'), 'latin-1', declared=declared)
+
+
+def read_text(file_path: Union[str, Path], html: bool = False,
+              mmap_threshold: int = MMAP_THRESHOLD) -> DecodedText:
+    """
+    Read and decode a text file with a single pass over the disk.
+
+    Args:
+        file_path: File to read
+        html: Honour in-document charset declarations
+        mmap_threshold: Size above which the file is memory-mapped
+
+    Returns:
+        DecodedText
+    """
+    with open(file_path, 'rb') as f:
+        size = f.seek(0, 2)
+        f.seek(0)
+
+        if size < mmap_threshold or size == 0:
+            return decode_bytes(f.read(), html=html)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_bytes(mapped, html=html)
+
+
+class TextChunkReader:
+    """
+    Decode a memory-mapped text file as a sequence of line-aligned chunks.
+
+    The whole decoded document is never held in memory: the file is mapped,
+    decoded slice by slice with an incremental decoder, and each yielded chunk
+    ends on a line boundary. Without a BOM, bytes are decoded as UTF-8 and any
+    invalid sequences as cp1252, which reproduces the utf-8 / cp1252 / mixed
+    outcomes of decode_bytes without needing to see the whole file first.
+    After iteration `encoding` and `mixed` describe what was found.
+    """
+
+    def __init__(self, file_path: Union[str, Path], chunk_size: int = 1024 * 1024):
+        self.file_path = Path(file_path)
+        self.chunk_size = chunk_size
+        self.encoding: Optional[str] = None
+        self.bom = False
+        self.mixed = False
+
+    def __iter__(self):
+        with open(self.file_path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                self.encoding = 'utf-8'
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from self._iter_mapped(mapped)
+
+    def _iter_mapped(self, mapped: mmap.mmap):
+        encoding, offset = sniff_bom(mapped[:4])
+        self.bom = encoding is not None
+        self.encoding = encoding or 'utf-8'
+
+        if self.bom:
+            decoder = codecs.getincrementaldecoder(encoding)('replace')
+        else:
+            decoder = codecs.getincrementaldecoder('utf-8')('surrogateescape')
+
+        saw_escaped = saw_multibyte = False
+        pending = ''
+        size = len(mapped)
+
+        while offset < size:
+            end = min(offset + self.chunk_size, size)
+            text = decoder.decode(mapped[offset:end], final=end >= size)
+            offset = end
+
+            if not self.bom:
+                saw_multibyte = saw_multibyte or bool(_DECODED_NON_ASCII_RE.search(text))
+                if _ESCAPED_BYTES_RE.search(text):
+                    saw_escaped = True
+                    text = _ESCAPED_BYTES_RE.sub(_redecode_escaped, text)
+
+            text = pending + text
+            cut = text.rfind('\n') + 1
+            if cut:
+                pending = text[cut:]
+                yield text[:cut]
+            elif len(text) >= 4 * self.chunk_size:
+                # Pathological input without line breaks: don't buffer it all
+                pending = ''
+                yield text
+            else:
+                pending = text
+
+        if pending:
+            yield pending
+
+        if saw_escaped:
+            self.mixed = saw_multibyte
+            self.encoding = 'utf-8' if saw_multibyte else 'cp1252'
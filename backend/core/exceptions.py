@@ -84,6 +84,11 @@ class ProcessingTimeoutError(ConversionError):
     pass
 
 
+class ServiceOverloadedError(ConverterError):
+    """Raised when a request is shed by admission control."""
+    pass
+
+
 class DependencyError(ConverterError):
     """Raised when required dependency is missing."""
     pass
\ No newline at end of file
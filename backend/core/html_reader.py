@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming HTML text extraction.
+
+Text is collected through a SAX-style parser target, so no tree is built and
+every text node is assigned to exactly one block (its innermost enclosing
+block element). Output is produced in document order in a single linear pass.
+"""
+
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional
+
+from .encoding import read_text
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+# Elements that start a new line of output
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'caption', 'dd', 'div', 'dl',
+    'dt', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul'
+})
+
+# Elements whose whole subtree is ignored
+SKIP_TAGS = frozenset({'script', 'style', 'title', 'noscript', 'template'})
+
+# Default size of text chunks fed to the parser
+CHUNK_SIZE = 64 * 1024
+
+
+class BlockTextCollector:
+    """Parser target that turns start/end/data events into block lines"""
+
+    def __init__(self):
+        self.blocks: List[str] = []
+        self._open_blocks: List[str] = []
+        self._buffer: List[str] = []
+        self._skip_depth = 0
+        self._pre_depth = 0
+
+    def start(self, tag: str, attrib=None):
+        """Handle an opening tag"""
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+
+        if tag == 'br':
+            self._flush()
+        elif tag in BLOCK_TAGS:
+            self._flush()
+            self._open_blocks.append(tag)
+            if tag == 'pre':
+                self._pre_depth += 1
+
+    def end(self, tag: str):
+        """Handle a closing tag"""
+        tag = tag.lower()
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if self._skip_depth:
+            return
+
+        # Unbalanced markup: close everything up to the matching block
+        if tag in BLOCK_TAGS and tag in self._open_blocks:
+            self._flush()
+            while self._open_blocks:
+                closed = self._open_blocks.pop()
+                if closed == 'pre':
+                    self._pre_depth -= 1
+                if closed == tag:
+                    break
+
+    def data(self, text: str):
+        """Handle character data"""
+        if not self._skip_depth:
+            self._buffer.append(text)
+
+    def close(self) -> List[str]:
+        """Flush pending text and return the collected blocks"""
+        self._flush()
+        return self.blocks
+
+    def drain(self) -> List[str]:
+        """Return and forget the blocks collected so far"""
+        blocks, self.blocks = self.blocks, []
+        return blocks
+
+    def _flush(self):
+        """Emit the text accumulated for the current block"""
+        if not self._buffer:
+            return
+
+        text = ''.join(self._buffer)
+        self._buffer.clear()
+
+        if self._pre_depth:
+            self.blocks.extend(line.rstrip() for line in text.split('\n') if line.strip())
+        else:
+            text = ' '.join(text.split())
+            if text:
+                self.blocks.append(text)
+
+
+class _StdlibEventParser(HTMLParser):
+    """Adapter feeding html.parser events to a collector (used without lxml)"""
+
+    def __init__(self, target: BlockTextCollector):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag)
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def _create_parser(target: BlockTextCollector, use_lxml: Optional[bool] = None):
+    """Create an incremental parser driving the given target"""
+    if use_lxml is None:
+        use_lxml = etree is not None
+
+    if use_lxml:
+        if etree is None:
+            raise ImportError("lxml is not installed")
+        return etree.HTMLParser(target=target, remove_comments=True, remove_pis=True)
+
+    return _StdlibEventParser(target)
+
+
+def iter_html_blocks(chunks: Iterable[str], use_lxml: Optional[bool] = None) -> Iterator[str]:
+    """
+    Extract block-level text from HTML fed as a sequence of text chunks.
+
+    Args:
+        chunks: Decoded HTML text, in any number of pieces
+        use_lxml: Force (True) or disable (False) the lxml backend;
+            defaults to lxml when installed, html.parser otherwise
+
+    Yields:
+        One whitespace-normalized line per block, in document order
+    """
+    collector = BlockTextCollector()
+    parser = _create_parser(collector, use_lxml)
+
+    fed = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        fed = True
+        yield from collector.drain()
+
+    # libxml2 refuses to close a parser that was never fed
+    if fed:
+        parser.close()
+    collector.close()
+    yield from collector.drain()
+
+
+def extract_html_blocks(text: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Extract block-level text from an already decoded HTML document"""
+    return iter_html_blocks(text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+
+
+def read_html_blocks(file_path, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Decode an HTML file (honouring <meta charset>) and extract its blocks"""
+    decoded = read_text(file_path, html=True)
+    return extract_html_blocks(decoded.text, chunk_size)
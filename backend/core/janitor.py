@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background janitor for upload, temp and cache storage.
+
+Each storage area (a directory) has an age limit and a byte quota. The
+janitor keeps an index of the top-level entries of every area (request
+workspaces, cache files, stray temp files) instead of globbing the
+directories on every pass:
+
+- producers report what they create and delete (`track` / `forget`), e.g.
+  Workspace on open and close;
+- one full scan seeds the index when the janitor starts, and a slow
+  periodic rescan picks up anything created behind its back.
+
+Names starting with a dot are metadata (e.g. FileCache's index database)
+and are never reaped.
+
+Every pass removes entries older than the area's max age, then the oldest
+entries until the area is back under its quota. Housekeeping that needs a
+full walk anyway (e.g. BlobStore.collect) can be added with `add_task`; it
+runs on the rescan cadence. Entries younger than the
+grace period are never removed for quota reasons, so in-flight requests
+keep their files. Before an entry is removed its mtime is checked once: an
+entry touched since it was indexed (e.g. a chunked upload still receiving
+data, possibly in another process) counts as created at that time.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StorageArea:
+    """A directory whose top-level entries the janitor manages"""
+    name: str
+    directory: Path
+    max_age: Optional[float] = None  # seconds; None: no age limit
+    max_bytes: Optional[int] = None  # None: no quota
+
+    def __post_init__(self):
+        self.directory = Path(self.directory)
+
+
+@dataclass
+class _IndexEntry:
+    created: float
+    size: Optional[int] = None  # None: measured on each pass (directories that grow)
+
+
+def _entry_size(path: Path) -> int:
+    """Bytes used by a file, or by every file under a directory"""
+    try:
+        if not path.is_dir():
+            return path.stat().st_size
+    except OSError:
+        return 0
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _last_modified(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+class StorageJanitor:
+    """Enforces age and byte quotas over a set of StorageAreas"""
+
+    def __init__(self, areas: Iterable[StorageArea], interval: float = 60.0,
+                 rescan_interval: float = 3600.0, grace: float = 300.0):
+        """
+        Initialize janitor.
+
+        Args:
+            areas: Directories to manage
+            interval: Seconds between passes
+            rescan_interval: Seconds between full directory rescans
+            grace: Entries younger than this are exempt from quota eviction
+        """
+        self.areas: Dict[str, StorageArea] = {area.name: area for area in areas}
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+        self.grace = grace
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[Path, _IndexEntry]] = {name: {} for name in self.areas}
+        self._area_bytes: Dict[str, int] = {name: 0 for name in self.areas}
+        self._removed: Dict[str, int] = {name: 0 for name in self.areas}
+        self._reclaimed: Dict[str, int] = {name: 0 for name in self.areas}
+        self._runs = 0
+        self._last_run_seconds = 0.0
+        self._last_scan = 0.0
+        self._tasks: List[Callable[[], object]] = []
+
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+
+    # Index maintenance
+
+    def _area_for(self, path: Path) -> Optional[str]:
+        for name, area in self.areas.items():
+            if path.parent == area.directory:
+                return name
+        return None
+
+    def track(self, path, size: Optional[int] = None, created: Optional[float] = None):
+        """Record a new top-level entry (file or directory) of one of the areas"""
+        path = Path(path)
+        name = self._area_for(path)
+        if name is None or path.name.startswith('.'):
+            return
+        with self._lock:
+            self._index[name][path] = _IndexEntry(created or time.time(), size)
+
+    def forget(self, path):
+        """Drop an entry its producer has deleted itself"""
+        path = Path(path)
+        name = self._area_for(path)
+        if name is None:
+            return
+        with self._lock:
+            self._index[name].pop(path, None)
+
+    def scan(self):
+        """Rebuild the index from the directories (startup and periodic reconcile)"""
+        # An area may live inside another (e.g. uploads under temp); never reap it whole
+        area_dirs = {area.directory for area in self.areas.values()}
+        for name, area in self.areas.items():
+            found: Dict[Path, _IndexEntry] = {}
+            try:
+                with os.scandir(area.directory) as entries:
+                    for entry in entries:
+                        try:
+                            stat = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if entry.name.startswith('.') or Path(entry.path) in area_dirs:
+                            continue
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        found[Path(entry.path)] = _IndexEntry(stat.st_mtime, None if is_dir else stat.st_size)
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                # Keep what producers reported (their creation time is exact)
+                current = self._index[name]
+                self._index[name] = {path: current.get(path, entry) for path, entry in found.items()}
+        self._last_scan = time.time()
+
+    def add_task(self, task: Callable[[], object]):
+        """Run `task` after every full rescan (failures are logged, not raised)"""
+        self._tasks.append(task)
+
+    def _run_tasks(self):
+        for task in self._tasks:
+            try:
+                task()
+            except Exception as e:
+                logger.warning(f"Janitor task {getattr(task, '__name__', task)} failed: {e}")
+
+    # Reclaiming
+
+    def _remove(self, path: Path) -> bool:
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logger.warning(f"Janitor could not remove {path}: {e}")
+            return False
+
+    def _reclaim_area(self, name: str, now: float) -> int:
+        area = self.areas[name]
+        with self._lock:
+            snapshot = list(self._index[name].items())
+
+        sized = []
+        for path, entry in snapshot:
+            size = entry.size if entry.size is not None else _entry_size(path)
+            sized.append((entry.created, path, size))
+        sized.sort(key=lambda item: item[0])
+
+        doomed: List[tuple] = []
+        keep: List[tuple] = []
+        refreshed: Dict[Path, float] = {}
+        for item in sized:
+            if area.max_age is not None and now - item[0] > area.max_age:
+                active = _last_modified(item[1])
+                if active > item[0] and now - active <= area.max_age:
+                    refreshed[item[1]] = active
+                    keep.append((active,) + item[1:])
+                else:
+                    doomed.append(item)
+            else:
+                keep.append(item)
+        keep.sort(key=lambda item: item[0])
+
+        total = sum(item[2] for item in keep)
+        if area.max_bytes is not None and total > area.max_bytes:
+            survivors = []
+            for item in keep:
+                if total > area.max_bytes and now - item[0] >= self.grace:
+                    active = _last_modified(item[1])
+                    if now - active < self.grace:
+                        refreshed[item[1]] = active
+                        survivors.append(item)
+                        continue
+                    doomed.append(item)
+                    total -= item[2]
+                else:
+                    survivors.append(item)
+            keep = survivors
+
+        reclaimed = 0
+        removed = 0
+        gone = []
+        for _, path, size in doomed:
+            if self._remove(path):
+                reclaimed += size
+                removed += 1
+                gone.append(path)
+            else:
+                total += size
+
+        with self._lock:
+            for path in gone:
+                self._index[name].pop(path, None)
+            for path, active in refreshed.items():
+                entry = self._index[name].get(path)
+                if entry is not None:
+                    entry.created = max(entry.created, active)
+            self._area_bytes[name] = total
+            self._removed[name] += removed
+            self._reclaimed[name] += reclaimed
+        return reclaimed
+
+    def run_once(self) -> int:
+        """One pass over every area; returns the bytes reclaimed"""
+        started = time.perf_counter()
+        now = time.time()
+        if now - self._last_scan >= self.rescan_interval:
+            self.scan()
+            self._run_tasks()
+        reclaimed = sum(self._reclaim_area(name, now) for name in self.areas)
+        with self._lock:
+            self._runs += 1
+            self._last_run_seconds = time.perf_counter() - started
+        return reclaimed
+
+    # Background thread
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"Janitor pass failed: {e}")
+            if self._stop_event.wait(self.interval):
+                return
+
+    def ensure_started(self):
+        """Start the janitor thread in this process if it is not running (cheap when it is)"""
+        if self._owner_pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._owner_pid == os.getpid() and self._thread is not None:
+                return
+            for area in self.areas.values():
+                area.directory.mkdir(parents=True, exist_ok=True)
+            self._stop_event = threading.Event()
+            self._last_scan = 0.0
+            self._thread = threading.Thread(target=self._loop, name='storage-janitor', daemon=True)
+            self._owner_pid = os.getpid()
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._owner_pid == os.getpid():
+            self._thread.join()
+        self._thread = None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-area entries, bytes, removals and reclaimed bytes"""
+        with self._lock:
+            return {
+                name: {
+                    'entries': len(self._index[name]),
+                    'bytes': self._area_bytes[name],
+                    'removed_total': self._removed[name],
+                    'reclaimed_bytes_total': self._reclaimed[name],
+                    'runs_total': self._runs,
+                    'last_run_seconds': self._last_run_seconds,
+                }
+                for name in self.areas
+            }
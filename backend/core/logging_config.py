@@ -4,84 +4,361 @@
 Centralized logging configuration
 """
 
+import atexit
 import logging
 import logging.handlers
+import queue
+import re
+import socket
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, Optional
 import json
-from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+QUEUE_POLICIES = ('drop', 'block')
+
+
+def _default_encoder() -> Callable[[Dict[str, Any]], str]:
+    """orjson when installed, else the stdlib encoder with compact separators"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        return lambda entry: orjson.dumps(entry, default=str, option=option).decode('utf-8')
+    encoder = json.JSONEncoder(ensure_ascii=False, default=str, separators=(',', ':'))
+    return encoder.encode
+
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord('', logging.INFO, '', 0, '', (), None).__dict__
+) | {'message', 'asctime'}
 
 
 class JSONFormatter(logging.Formatter):
-    """JSON formatter for structured logging"""
+    """
+    JSON formatter for structured logging.
+    
+    Fields that never change for a process (app name, host) are computed
+    once; the pid comes from the record. Serialization goes through
+    `encoder` (orjson when installed) and the timestamp prefix is reused
+    for every record within the same second.
+    """
+    
+    def __init__(self, app_name: Optional[str] = None,
+                 encoder: Optional[Callable[[Dict[str, Any]], str]] = None):
+        super().__init__()
+        self.static_fields = {'host': socket.gethostname()}
+        if app_name:
+            self.static_fields['app'] = app_name
+        self.encoder = encoder or _default_encoder()
+        self._excluded = _RECORD_ATTRIBUTES | {SecurityFilter.CACHE_ATTR}
+        self._second = None
+        self._second_prefix = ''
+    
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        if second != self._second:
+            self._second_prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second))
+            self._second = second
+        return f'{self._second_prefix}.{int((created - second) * 1e6):06d}'
     
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON"""
         log_entry = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'timestamp': self._timestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
             'module': record.module,
             'function': record.funcName,
-            'line': record.lineno
+            'line': record.lineno,
+            'pid': record.process,
         }
+        log_entry.update(self.static_fields)
         
-        # Add exception info if present
+        # Add exception info if present (already rendered when the record came through a queue)
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry['exception'] = record.exc_text
         
         # Add extra fields
+        excluded = self._excluded
         for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
-                          'filename', 'module', 'lineno', 'funcName', 'created',
-                          'msecs', 'relativeCreated', 'thread', 'threadName',
-                          'processName', 'process', 'getMessage', 'exc_info',
-                          'exc_text', 'stack_info']:
+            if key not in excluded:
                 log_entry[key] = value
         
-        return json.dumps(log_entry, ensure_ascii=False)
+        return self.encoder(log_entry)
+
+
+class BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that writes records in batches.
+    
+    Formatted records (one NDJSON line each, with JSONFormatter) are
+    buffered and written with a single write() once `max_batch_bytes` are
+    pending or the oldest has waited `flush_interval` seconds; a background
+    thread enforces the interval when no further records arrive. Rollover
+    is checked per batch.
+    """
+    
+    def __init__(self, filename, max_bytes: int = 0, backup_count: int = 0,
+                 max_batch_bytes: int = 64 * 1024, flush_interval: float = 1.0,
+                 encoding: Optional[str] = 'utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self._batch = []
+        self._batch_bytes = 0
+        self._batch_started = 0.0
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='log-batch-flusher', daemon=True)
+        self._flusher.start()
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        if not self._batch:
+            self._batch_started = time.monotonic()
+        self._batch.append(line)
+        self._batch_bytes += len(line)
+        if self._batch_bytes >= self.max_batch_bytes:
+            self._write_batch()
+    
+    def _write_batch(self):
+        # Called with self.lock held
+        if not self._batch:
+            return
+        data = ''.join(self._batch)
+        self._batch.clear()
+        self._batch_bytes = 0
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(data)
+            self.stream.flush()
+        except Exception:
+            # Same reporting as a failed emit (stderr when logging.raiseExceptions)
+            self.handleError(None)
+    
+    def _flush_periodically(self):
+        while not self._stop_event.wait(self.flush_interval / 2):
+            with self.lock:
+                if self._batch and time.monotonic() - self._batch_started >= self.flush_interval:
+                    self._write_batch()
+    
+    def flush(self):
+        with self.lock:
+            self._write_batch()
+        super().flush()
+    
+    def close(self):
+        self._stop_event.set()
+        if self._flusher.is_alive() and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+        super().close()
 
 
 class SecurityFilter(logging.Filter):
-    """Filter to remove sensitive information from logs"""
+    """
+    Filter to remove sensitive information from logs.
+    
+    All patterns are compiled into one case-insensitive regex. A record is
+    scanned once: the outcome is cached on the record, so the same record
+    passing through several handlers is not formatted or scanned again.
+    
+    By default a message mentioning any pattern is replaced entirely; with
+    `redact_span`, only the value assigned to a matching key (the `abc123`
+    in `token=abc123` or `token: abc123`) is replaced, and a key mentioned
+    without a value is left as is.
+    """
     
     SENSITIVE_PATTERNS = [
         'password', 'token', 'key', 'secret', 'auth',
         'credential', 'session', 'cookie'
     ]
+    REDACTED_MESSAGE = "[REDACTED - Sensitive information]"
+    REDACTED_VALUE = "[REDACTED]"
+    
+    # Attribute marking a record as already processed
+    CACHE_ATTR = '_security_filtered'
+    
+    def __init__(self, name: str = '', patterns: Optional[Iterable[str]] = None,
+                 redact_span: bool = False):
+        super().__init__(name)
+        self.patterns = list(patterns if patterns is not None else self.SENSITIVE_PATTERNS)
+        self.redact_span = redact_span
+        alternatives = '|'.join(sorted((re.escape(p.lower()) for p in self.patterns), key=len, reverse=True))
+        # Matched against the lowercased message: much faster than re.IGNORECASE
+        self._matcher = re.compile(alternatives)
+        # key=value / key: value (quoted, or an auth scheme plus credentials): keep the key
+        self._span_matcher = re.compile(
+            rf'(?P<key>[\w.-]*(?:{alternatives})[\w.-]*["\']?)(?P<sep>\s*[:=]\s*)'
+            r'(?P<value>"[^"]*"|\'[^\']*\'|(?:Bearer|Basic|Token)\s+[^\s,;&]+|[^\s,;&]+)',
+            re.IGNORECASE
+        )
+    
+    def redact(self, message: str) -> Optional[str]:
+        """Redacted form of `message`, or None if nothing sensitive was found"""
+        if not self._matcher.search(message.lower()):
+            return None
+        if not self.redact_span:
+            return self.REDACTED_MESSAGE
+        redacted = self._span_matcher.sub(
+            lambda m: f"{m.group('key')}{m.group('sep')}{self.REDACTED_VALUE}", message
+        )
+        # A key with no value after it is not a secret by itself
+        return redacted if redacted != message else None
     
     def filter(self, record: logging.LogRecord) -> bool:
         """Filter sensitive information from log records"""
-        message = record.getMessage().lower()
-        
-        # Check if message contains sensitive information
-        for pattern in self.SENSITIVE_PATTERNS:
-            if pattern in message:
-                record.msg = "[REDACTED - Sensitive information]"
-                record.args = ()
-                break
+        if getattr(record, self.CACHE_ATTR, False):
+            return True
         
+        redacted = self.redact(record.getMessage())
+        if redacted is not None:
+            record.msg = redacted
+            record.args = ()
+        setattr(record, self.CACHE_ATTR, True)
         return True
 
 
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler over a bounded queue that never lets logging stall a request.
+    
+    When the queue is full, the 'drop' policy discards the record at once and
+    'block' waits up to `block_timeout` seconds for room before discarding it.
+    Discarded records are counted, never raised.
+    """
+    
+    def __init__(self, maxsize: int = 10000, policy: str = 'drop', block_timeout: float = 1.0):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        super().__init__(queue.Queue(maxsize))
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Make the record safe to hand to another thread.
+        
+        Only the message is merged with its arguments here (they may be
+        mutated after the call returns); formatting is left to the listener's
+        handlers. Tracebacks are rendered to text so frames are not kept alive.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return
+        with self._counter_lock:
+            self.enqueued += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Records queued and dropped so far, and the current queue depth"""
+        with self._counter_lock:
+            return {
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+            }
+
+
+_traceback_formatter = logging.Formatter()
+
+# Queue handler/listener per configured logger (setup_logging may run again)
+_queue_pipelines: Dict[str, tuple] = {}
+
+
+def _stop_queue_pipeline(app_name: str):
+    pipeline = _queue_pipelines.pop(app_name, None)
+    if pipeline:
+        listener = pipeline[1]
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def stop_logging():
+    """Flush queued records and stop every logging listener thread"""
+    for app_name in list(_queue_pipelines):
+        _stop_queue_pipeline(app_name)
+
+
+atexit.register(stop_logging)
+
+
+def get_logging_stats() -> Dict[str, Dict[str, int]]:
+    """Queue counters per logger configured with async logging"""
+    return {app_name: handler.stats() for app_name, (handler, _) in _queue_pipelines.items()}
+
+
 def setup_logging(
     log_level: str = 'INFO',
     log_dir: Optional[Path] = None,
     app_name: str = 'conversor',
     enable_json: bool = False,
-    enable_console: bool = True
+    enable_console: bool = True,
+    async_logging: bool = True,
+    queue_size: int = 10000,
+    queue_policy: str = 'drop',
+    queue_block_timeout: float = 1.0,
+    redact_span: bool = False,
+    batch_writes: bool = False,
+    batch_max_bytes: int = 64 * 1024,
+    batch_interval: float = 1.0
 ) -> logging.Logger:
     """
     Set up centralized logging configuration.
     
+    With `async_logging`, the logger gets a single BoundedQueueHandler and the
+    console/file handlers run on a QueueListener thread, so filtering,
+    formatting, writing and file rotation stay off the request thread.
+    
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_dir: Directory for log files
         app_name: Application name for log files
         enable_json: Enable JSON formatting
         enable_console: Enable console logging
+        async_logging: Write through a background queue listener
+        queue_size: Maximum records waiting in the queue
+        queue_policy: 'drop' or 'block' when the queue is full
+        queue_block_timeout: Seconds 'block' waits before dropping a record
+        redact_span: Redact only sensitive values instead of whole messages
+        batch_writes: Write the main log file in batches (NDJSON with enable_json)
+        batch_max_bytes: Pending bytes that trigger a batch write
+        batch_interval: Longest a record waits in a batch, in seconds
     
     Returns:
         Configured logger instance
@@ -90,12 +367,17 @@ def setup_logging(
     logger = logging.getLogger(app_name)
     logger.setLevel(getattr(logging, log_level.upper()))
     
-    # Clear existing handlers
+    # Clear existing handlers (and flush a previous listener's queue)
+    _stop_queue_pipeline(app_name)
+    for handler in logger.handlers:
+        handler.close()
     logger.handlers.clear()
+    handlers = []
+    security_filter = SecurityFilter(redact_span=redact_span)
     
     # Create formatters
     if enable_json:
-        formatter = JSONFormatter()
+        formatter = JSONFormatter(app_name)
     else:
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s'
@@ -106,24 +388,33 @@ def setup_logging(
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
-        console_handler.addFilter(SecurityFilter())
-        logger.addHandler(console_handler)
+        console_handler.addFilter(security_filter)
+        handlers.append(console_handler)
     
     # File handlers
     if log_dir:
         log_dir = Path(log_dir)
         log_dir.mkdir(parents=True, exist_ok=True)
         
-        # Main log file (rotating)
-        file_handler = logging.handlers.RotatingFileHandler(
-            log_dir / f'{app_name}.log',
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=5
-        )
+        # Main log file (rotating); the high-volume one, so the only one batched
+        if batch_writes:
+            file_handler = BatchedRotatingFileHandler(
+                log_dir / f'{app_name}.log',
+                max_bytes=10 * 1024 * 1024,  # 10MB
+                backup_count=5,
+                max_batch_bytes=batch_max_bytes,
+                flush_interval=batch_interval
+            )
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_dir / f'{app_name}.log',
+                maxBytes=10 * 1024 * 1024,  # 10MB
+                backupCount=5
+            )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        file_handler.addFilter(SecurityFilter())
-        logger.addHandler(file_handler)
+        file_handler.addFilter(security_filter)
+        handlers.append(file_handler)
         
         # Error log file
         error_handler = logging.handlers.RotatingFileHandler(
@@ -133,8 +424,8 @@ def setup_logging(
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(formatter)
-        error_handler.addFilter(SecurityFilter())
-        logger.addHandler(error_handler)
+        error_handler.addFilter(security_filter)
+        handlers.append(error_handler)
         
         # Security log file
         security_handler = logging.handlers.RotatingFileHandler(
@@ -144,7 +435,19 @@ def setup_logging(
         )
         security_handler.setLevel(logging.WARNING)
         security_handler.setFormatter(formatter)
-        logger.addHandler(security_handler)
+        handlers.append(security_handler)
+    
+    if async_logging and handlers:
+        queue_handler = BoundedQueueHandler(queue_size, queue_policy, queue_block_timeout)
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        listener.start()
+        _queue_pipelines[app_name] = (queue_handler, listener)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     
     return logger
 
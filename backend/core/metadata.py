@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fast document metadata, read without converting.
+
+Only the few bytes that carry the metadata are read:
+
+- PDF: the trailer (found from the file tail via startxref) names the Info
+  dictionary and the catalog; the cross-reference table gives their
+  offsets, and the page count is the /Count of the root of the page tree.
+  No page is parsed. Cross-reference streams (PDF 1.5+, where these objects
+  usually sit in compressed object streams) go through pdfminer, which
+  also only resolves the objects asked for.
+- DOCX: `docProps/core.xml` (title, author) and `docProps/app.xml` (pages
+  and words, as last saved by the editor); nothing else is decompressed.
+- HTML: the `<title>` and `<meta name="author">` of the document head.
+- Markdown: the first heading. Plain text carries no metadata.
+"""
+
+import html
+import os
+import re
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+from .converter import DocumentFormat, DocumentMetadata
+from .encoding import decode_bytes
+
+try:
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+except ImportError:
+    PDFDocument = None
+
+# Format of each inspectable extension
+FORMATS = {
+    '.pdf': DocumentFormat.PDF,
+    '.docx': DocumentFormat.DOCX,
+    '.html': DocumentFormat.HTML,
+    '.htm': DocumentFormat.HTML,
+    '.md': DocumentFormat.MARKDOWN,
+    '.markdown': DocumentFormat.MARKDOWN,
+    '.txt': DocumentFormat.TXT,
+}
+
+_HEAD_BYTES = 64 * 1024  # HTML head / Markdown first heading
+_PDF_TAIL_BYTES = 4096
+_PDF_OBJECT_BYTES = 64 * 1024
+_PDF_MAX_UPDATES = 32  # /Prev chain length (incremental updates)
+_XREF_ENTRY = 20
+_DOCX_MAX_PART = 1024 * 1024
+
+_STARTXREF_RE = re.compile(rb'startxref\s+(\d+)')
+_SUBSECTION_RE = re.compile(rb'\s*(\d+)\s+(\d+)\s*$')
+_ENTRY_RE = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+_OBJECT_RE = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj\b')
+_INT_RE = rb'/%s\s+(\d+)\b(?!\s+\d+\s+R)'
+_REF_RE = rb'/%s\s+(\d+)\s+(\d+)\s+R'
+_STRING_RE = rb'/%s\s*(\(|<(?!<))'
+
+_CORE_NS = {
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+}
+_APP_NS = {'ep': 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties'}
+
+_TITLE_RE = re.compile(r'<title\b[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+_META_RE = re.compile(r'<meta\b[^>]*>', re.IGNORECASE)
+_ATTR_RE = re.compile(r'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+_HEADING_RE = re.compile(r'^#{1,6}\s+(.+?)\s*#*\s*$', re.MULTILINE)
+
+
+class MetadataError(ValueError):
+    """The document's metadata could not be located"""
+
+
+def _clean(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    text = ' '.join(text.split())
+    return text or None
+
+
+# PDF
+
+_ESCAPES = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f'}
+
+
+def decode_pdf_text(raw: bytes) -> str:
+    """A PDF text string: UTF-16BE or UTF-8 with a BOM, else PDFDocEncoding (~Latin-1)"""
+    if raw.startswith(b'\xfe\xff'):
+        return raw[2:].decode('utf-16-be', errors='replace')
+    if raw.startswith(b'\xef\xbb\xbf'):
+        return raw[3:].decode('utf-8', errors='replace')
+    return raw.decode('latin-1')
+
+
+def _literal_string(data: bytes, start: int) -> bytes:
+    """Bytes of the literal string whose '(' is at `start` (escapes and nested parens)"""
+    out = bytearray()
+    depth = 1
+    position = start + 1
+    while position < len(data):
+        byte = data[position]
+        if byte == ord('\\'):
+            position += 1
+            if position >= len(data):
+                break
+            escaped = data[position]
+            if escaped in _ESCAPES:
+                out += _ESCAPES[escaped]
+            elif ord('0') <= escaped <= ord('7'):
+                digits = re.match(rb'[0-7]{1,3}', data[position:position + 3]).group()
+                out.append(int(digits, 8) & 0xFF)
+                position += len(digits) - 1
+            elif escaped == ord('\r'):
+                if data[position + 1:position + 2] == b'\n':
+                    position += 1
+            elif escaped != ord('\n'):
+                out.append(escaped)
+        elif byte == ord('('):
+            depth += 1
+            out.append(byte)
+        elif byte == ord(')'):
+            depth -= 1
+            if not depth:
+                break
+            out.append(byte)
+        else:
+            out.append(byte)
+        position += 1
+    return bytes(out)
+
+
+def _string_value(data: bytes, start: int) -> Optional[bytes]:
+    """Bytes of the literal `(...)` or hex `<...>` string starting at `start`"""
+    if data[start:start + 1] == b'(':
+        return _literal_string(data, start)
+    end = data.find(b'>', start)
+    digits = re.sub(rb'\s', b'', data[start + 1:end if end >= 0 else len(data)])
+    if len(digits) % 2:
+        digits += b'0'
+    try:
+        return bytes.fromhex(digits.decode('ascii'))
+    except ValueError:
+        return None
+
+
+def _pdf_string(data: bytes, key: str) -> Optional[bytes]:
+    """Raw value of a direct string entry `/key (...)` or `/key <...>`"""
+    match = re.search(_STRING_RE % key.encode(), data)
+    return _string_value(data, match.start(1)) if match else None
+
+
+def _pdf_ref(data: bytes, key: str) -> Optional[int]:
+    match = re.search(_REF_RE % key.encode(), data)
+    return int(match.group(1)) if match else None
+
+
+def _pdf_int(data: bytes, key: str) -> Optional[int]:
+    match = re.search(_INT_RE % key.encode(), data)
+    return int(match.group(1)) if match else None
+
+
+class _XrefTable:
+    """Object offsets from classic cross-reference tables, read entry by entry"""
+
+    def __init__(self, f: BinaryIO, size: int):
+        self.f = f
+        self.size = size
+        self.sections: List[Tuple[int, int, int]] = []  # (first object, count, table offset), newest first
+        self.trailer = b''
+
+    def load(self, offset: int):
+        """Read the table at `offset` and those of earlier revisions (/Prev)"""
+        seen = set()
+        for _ in range(_PDF_MAX_UPDATES):
+            if offset in seen or offset >= self.size:
+                break
+            seen.add(offset)
+            trailer = self._load_section(offset)
+            if not self.trailer:
+                self.trailer = trailer
+            previous = _pdf_int(trailer, 'Prev')
+            if previous is None:
+                break
+            offset = previous
+
+    def _load_section(self, offset: int) -> bytes:
+        f = self.f
+        f.seek(offset)
+        if f.read(4) != b'xref':
+            raise MetadataError('not a cross-reference table')
+        f.readline()
+        while True:
+            position = f.tell()
+            match = _SUBSECTION_RE.match(f.readline(64))
+            if match is None:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            self.sections.append((first, count, f.tell()))
+            # Entries are read when an object is looked up, never in bulk
+            f.seek(f.tell() + count * _XREF_ENTRY)
+        f.seek(position)
+        data = f.read(_PDF_TAIL_BYTES)
+        start = data.find(b'trailer')
+        if start < 0:
+            raise MetadataError('trailer not found')
+        end = data.find(b'startxref', start)
+        return data[start:end if end >= 0 else len(data)]
+
+    def offset(self, number: int) -> Optional[int]:
+        for first, count, table in self.sections:
+            if first <= number < first + count:
+                self.f.seek(table + (number - first) * _XREF_ENTRY)
+                match = _ENTRY_RE.match(self.f.read(_XREF_ENTRY))
+                if match is None:
+                    raise MetadataError('malformed cross-reference entry')
+                return int(match.group(1)) if match.group(3) == b'n' else None
+        return None
+
+    def read_object(self, number: Optional[int]) -> Optional[bytes]:
+        """Body of an uncompressed object (up to endobj, or the first 64 KB)"""
+        offset = self.offset(number) if number is not None else None
+        if offset is None:
+            return None
+        self.f.seek(offset)
+        data = self.f.read(_PDF_OBJECT_BYTES)
+        match = _OBJECT_RE.match(data)
+        if match is None or int(match.group(1)) != number:
+            raise MetadataError(f'object {number} not at its cross-reference offset')
+        end = data.find(b'endobj', match.end())
+        return data[match.end():end if end >= 0 else len(data)]
+
+
+def _pdf_info_string(table: _XrefTable, info: bytes, key: str) -> Optional[str]:
+    raw = _pdf_string(info, key)
+    if raw is None:
+        # Indirect string: /Title 12 0 R
+        body = table.read_object(_pdf_ref(info, key))
+        match = re.match(rb'\s*[(<]', body) if body is not None else None
+        raw = _string_value(body, match.end() - 1) if match else None
+    return _clean(decode_pdf_text(raw)) if raw is not None else None
+
+
+def _inspect_pdf_xref(f: BinaryIO, size: int) -> DocumentMetadata:
+    f.seek(max(0, size - _PDF_TAIL_BYTES))
+    matches = list(_STARTXREF_RE.finditer(f.read(_PDF_TAIL_BYTES)))
+    if not matches:
+        raise MetadataError('startxref not found')
+    table = _XrefTable(f, size)
+    table.load(int(matches[-1].group(1)))
+
+    metadata = DocumentMetadata(format=DocumentFormat.PDF)
+    catalog = table.read_object(_pdf_ref(table.trailer, 'Root'))
+    pages = table.read_object(_pdf_ref(catalog, 'Pages')) if catalog is not None else None
+    if pages is None:
+        raise MetadataError('page tree not found')
+    metadata.page_count = _pdf_int(pages, 'Count')
+    if metadata.page_count is None:
+        raise MetadataError('page tree without /Count')
+
+    info = table.read_object(_pdf_ref(table.trailer, 'Info'))
+    # Strings of encrypted files are encrypted; the page count is not
+    if info is not None and b'/Encrypt' not in table.trailer:
+        metadata.title = _pdf_info_string(table, info, 'Title')
+        metadata.author = _pdf_info_string(table, info, 'Author')
+    return metadata
+
+
+def _inspect_pdf_pdfminer(f: BinaryIO) -> DocumentMetadata:
+    f.seek(0)
+    document = PDFDocument(PDFParser(f))
+    metadata = DocumentMetadata(format=DocumentFormat.PDF)
+    pages = resolve1(document.catalog.get('Pages'))
+    if isinstance(pages, dict) and isinstance(resolve1(pages.get('Count')), int):
+        metadata.page_count = resolve1(pages.get('Count'))
+    for info in reversed(document.info):
+        for key, field in (('Title', 'title'), ('Author', 'author')):
+            value = resolve1(info.get(key))
+            if isinstance(value, bytes) and getattr(metadata, field) is None:
+                setattr(metadata, field, _clean(decode_pdf_text(value)))
+    return metadata
+
+
+def _inspect_pdf(f: BinaryIO) -> DocumentMetadata:
+    size = f.seek(0, os.SEEK_END)
+    try:
+        return _inspect_pdf_xref(f, size)
+    except MetadataError:
+        if PDFDocument is None:
+            return DocumentMetadata(format=DocumentFormat.PDF)
+    try:
+        return _inspect_pdf_pdfminer(f)
+    except Exception as e:
+        raise MetadataError(f'unreadable PDF: {e}') from e
+
+
+# DOCX
+
+def _docx_part(archive: zipfile.ZipFile, name: str) -> Optional[ElementTree.Element]:
+    try:
+        entry = archive.getinfo(name)
+    except KeyError:
+        return None
+    if entry.file_size > _DOCX_MAX_PART:
+        return None
+    try:
+        return ElementTree.fromstring(archive.read(entry))
+    except ElementTree.ParseError:
+        return None
+
+
+def _xml_text(root: Optional[ElementTree.Element], path: str, namespaces: Dict[str, str]) -> Optional[str]:
+    if root is None:
+        return None
+    element = root.find(path, namespaces)
+    return _clean(element.text) if element is not None else None
+
+
+def _xml_int(root: Optional[ElementTree.Element], path: str, namespaces: Dict[str, str]) -> Optional[int]:
+    text = _xml_text(root, path, namespaces)
+    return int(text) if text and text.isdigit() else None
+
+
+def _inspect_docx(f: BinaryIO) -> DocumentMetadata:
+    try:
+        archive = zipfile.ZipFile(f)
+    except zipfile.BadZipFile as e:
+        raise MetadataError(f'unreadable DOCX: {e}') from e
+    with archive:
+        core = _docx_part(archive, 'docProps/core.xml')
+        app = _docx_part(archive, 'docProps/app.xml')
+    return DocumentMetadata(
+        format=DocumentFormat.DOCX,
+        title=_xml_text(core, 'dc:title', _CORE_NS),
+        author=_xml_text(core, 'dc:creator', _CORE_NS),
+        page_count=_xml_int(app, 'ep:Pages', _APP_NS),
+        word_count=_xml_int(app, 'ep:Words', _APP_NS),
+    )
+
+
+# HTML and Markdown
+
+def _read_head(f: BinaryIO, html_markup: bool) -> str:
+    f.seek(0)
+    head = f.read(_HEAD_BYTES)
+    if len(head) == _HEAD_BYTES:
+        # Never decode a character cut in half at the end of the block
+        cut = head.rfind(b'>' if html_markup else b'\n')
+        head = head[:cut + 1] if cut >= 0 else head
+    return decode_bytes(head, html=html_markup).text
+
+
+def _inspect_html(f: BinaryIO) -> DocumentMetadata:
+    head = _read_head(f, html_markup=True)
+    metadata = DocumentMetadata(format=DocumentFormat.HTML)
+    match = _TITLE_RE.search(head)
+    if match:
+        metadata.title = _clean(html.unescape(match.group(1)))
+    for tag in _META_RE.findall(head):
+        attributes = {name.lower(): double or single or bare
+                      for name, double, single, bare in _ATTR_RE.findall(tag)}
+        if attributes.get('name', '').lower() == 'author':
+            metadata.author = _clean(html.unescape(attributes.get('content', '')))
+            break
+    return metadata
+
+
+def _inspect_markdown(f: BinaryIO) -> DocumentMetadata:
+    match = _HEADING_RE.search(_read_head(f, html_markup=False))
+    return DocumentMetadata(format=DocumentFormat.MARKDOWN, title=_clean(match.group(1)) if match else None)
+
+
+_INSPECTORS = {
+    DocumentFormat.PDF: _inspect_pdf,
+    DocumentFormat.DOCX: _inspect_docx,
+    DocumentFormat.HTML: _inspect_html,
+    DocumentFormat.MARKDOWN: _inspect_markdown,
+    DocumentFormat.TXT: lambda f: DocumentMetadata(format=DocumentFormat.TXT),
+}
+
+
+def inspect_document(source: Union[str, Path, BinaryIO], ext: str) -> DocumentMetadata:
+    """
+    Metadata of a path or a seekable binary stream (whose position is restored).
+
+    Raises:
+        ValueError: for extensions that cannot be inspected
+        MetadataError: if the document's structure cannot be read
+    """
+    document_format = FORMATS.get(ext.lower())
+    if document_format is None:
+        raise ValueError(f'Cannot inspect {ext!r} files')
+    inspect = _INSPECTORS[document_format]
+    if isinstance(source, (str, Path)):
+        with open(source, 'rb') as f:
+            return inspect(f)
+    position = source.tell()
+    try:
+        return inspect(source)
+    finally:
+        source.seek(position)
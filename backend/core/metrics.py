@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms are kept per label set under a lock. Components that
+already keep their own counters (worker pool, admission control, caches,
+rate limiters) are exported through collectors that read their `stats()`
+at scrape time.
+
+Per-conversion stage timing uses a StageTimer bound to the current context:
+code deep inside the conversion calls `timed_stage('normalize')` without the
+timer being threaded through every signature. Nested stages report self
+time, so a normalize stage inside read is not counted twice.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond text stages up to the conversion timeout
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: a named family of samples keyed by label values"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}',
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values"""
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """Count and sum for one label set"""
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            if series is None:
+                return {'count': 0, 'sum': 0.0}
+            return {'count': sum(series[:-1]), 'sum': series[-1]}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        lines = self.header()
+        names = self.labelnames + ('le',)
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = '+Inf' if math.isinf(bound) else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(names, key + (le,))} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class StatsCollector:
+    """
+    Exports a component's `stats()` dict at scrape time.
+
+    Flat dicts become one sample per key; dicts of dicts (e.g. per format
+    class or per endpoint) become one labelled sample per inner key.
+    Non-numeric values are skipped.
+    """
+
+    def __init__(self, prefix: str, stats_func: Callable[[], Dict], label: Optional[str] = None):
+        self.prefix = prefix
+        self.stats_func = stats_func
+        self.label = label
+
+    def render(self) -> List[str]:
+        stats = self.stats_func()
+        samples: Dict[str, List[str]] = {}
+
+        if self.label:
+            for group, values in sorted(stats.items()):
+                labels = _format_labels((self.label,), (group,))
+                for key, value in values.items():
+                    if isinstance(value, (int, float)):
+                        samples.setdefault(key, []).append(
+                            f'{self.prefix}_{key}{labels} {_format_value(value)}'
+                        )
+        else:
+            for key, value in stats.items():
+                if isinstance(value, (int, float)):
+                    samples[key] = [f'{self.prefix}_{key} {_format_value(value)}']
+
+        lines = []
+        for key in sorted(samples):
+            lines.append(f'# TYPE {self.prefix}_{key} untyped')
+            lines.extend(samples[key])
+        return lines
+
+
+class MetricsRegistry:
+    """Owns metrics and collectors and renders them for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[StatsCollector] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_stats(self, prefix: str, stats_func: Callable[[], Dict], label: Optional[str] = None):
+        """Export the numeric values returned by `stats_func` under `prefix`"""
+        with self._lock:
+            self._collectors.append(StatsCollector(prefix, stats_func, label))
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric and collector"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            lines.extend(collector.render())
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Accumulates self time per named stage of one conversion"""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        # [stage name, start, time spent in nested stages]
+        self._stack: List[list] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed - frame[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def record(self, name: str, seconds: float):
+        """Add a duration measured elsewhere (e.g. in another process)"""
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def update(self, durations: Dict[str, float]):
+        for name, seconds in durations.items():
+            self.record(name, seconds)
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations.values())
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar('stage_timer', default=None)
+
+
+@contextmanager
+def stage_timer(timer: Optional[StageTimer] = None):
+    """Bind a StageTimer to the current context for the duration of the block"""
+    timer = timer or StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def timed_stage(name: str):
+    """Time a stage on the context's StageTimer; a no-op when none is bound"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def observe_stages(histogram: Histogram, durations: Dict[str, float], **labels):
+    """Record every stage duration in a histogram labelled by stage"""
+    for name, seconds in durations.items():
+        histogram.observe(seconds, stage=name, **labels)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opt-in profiling of individual conversions.
+
+Two modes:
+
+- 'sampling': a background thread snapshots the converting thread's stack
+  every few milliseconds (sys._current_frames) and counts identical stacks.
+  Overhead is a small fraction of one core and the result is collapsed-stack
+  text, ready for flamegraph.pl or speedscope.
+- 'cprofile': deterministic cProfile (exact call counts, noticeably slower),
+  saved as a .pstats file and a text report; the sampler runs alongside it
+  so a collapsed-stack file is produced as well.
+
+Profiles are stored by request id in a ProfileStore directory, which keeps
+only the most recent ones. Nothing here runs unless a profile is requested.
+"""
+
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MODES = ('sampling', 'cprofile')
+
+# File kinds produced per profile: suffix -> MIME type
+PROFILE_FILES = {
+    'collapsed': 'text/plain; charset=utf-8',
+    'pstats': 'application/octet-stream',
+    'txt': 'text/plain; charset=utf-8',
+}
+
+# Request ids double as file names
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def valid_request_id(request_id: str) -> bool:
+    """Whether `request_id` is safe to use as a file name"""
+    return bool(request_id and _REQUEST_ID_RE.match(request_id))
+
+
+class StackSampler:
+    """Periodically samples one thread's Python stack"""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        """
+        Initialize sampler.
+
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample (default: the thread creating the sampler)
+        """
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text: one 'frame;frame;frame count' line per stack"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+@dataclass
+class ProfileResult:
+    """Output of one profiled call"""
+    mode: str
+    duration: float
+    samples: int
+    collapsed: str
+    pstats_data: Optional[bytes] = None
+    report: Optional[str] = None
+
+
+def profile_call(func: Callable, *args, mode: str = 'sampling', interval: float = 0.005,
+                 **kwargs) -> Tuple[Any, ProfileResult]:
+    """
+    Run `func(*args, **kwargs)` under the requested profiler.
+
+    Returns:
+        (func's return value, ProfileResult); exceptions from func propagate
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode: {mode}")
+
+    sampler = StackSampler(interval)
+    profiler = cProfile.Profile() if mode == 'cprofile' else None
+    started = time.perf_counter()
+
+    sampler.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        sampler.stop()
+
+    profile = ProfileResult(mode, time.perf_counter() - started, sampler.samples, sampler.collapsed())
+    if profiler is not None:
+        profiler.create_stats()
+        profile.pstats_data = _marshal_stats(profiler)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(60)
+        profile.report = report.getvalue()
+    return result, profile
+
+
+def _marshal_stats(profiler: cProfile.Profile) -> bytes:
+    """The bytes dump_stats() would write, without a temporary file"""
+    return marshal.dumps(profiler.stats)
+
+
+@dataclass
+class ProfileInfo:
+    """Metadata stored next to a profile"""
+    request_id: str
+    mode: str
+    created: float
+    duration: float
+    samples: int
+    files: List[str] = field(default_factory=list)
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+class ProfileStore:
+    """Directory of recent profiles keyed by request id"""
+
+    def __init__(self, directory, max_profiles: int = 50):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def _path(self, request_id: str, kind: str) -> Path:
+        if not valid_request_id(request_id):
+            raise ValueError(f"Invalid request id: {request_id!r}")
+        if kind not in PROFILE_FILES and kind != 'json':
+            raise ValueError(f"Unknown profile file: {kind}")
+        return self.directory / f'{request_id}.{kind}'
+
+    def save(self, request_id: str, profile: ProfileResult, details: Optional[Dict] = None) -> ProfileInfo:
+        """Write a profile's files and metadata, then prune old profiles"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        contents = {
+            'collapsed': profile.collapsed.encode('utf-8'),
+            'pstats': profile.pstats_data,
+            'txt': profile.report.encode('utf-8') if profile.report else None,
+        }
+        info = ProfileInfo(request_id, profile.mode, time.time(), profile.duration,
+                           profile.samples, details=details or {})
+
+        for kind, data in contents.items():
+            if data is None:
+                continue
+            path = self._path(request_id, kind)
+            tmp = path.with_name(path.name + '.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            info.files.append(kind)
+
+        # Metadata last: a profile is listed only once its files are complete
+        self._path(request_id, 'json').write_text(json.dumps(asdict(info)))
+        self.prune()
+        return info
+
+    def list(self) -> List[ProfileInfo]:
+        """Stored profiles, newest first"""
+        infos = []
+        for path in self.directory.glob('*.json'):
+            try:
+                infos.append(ProfileInfo(**json.loads(path.read_text())))
+            except (OSError, ValueError, TypeError):
+                continue
+        return sorted(infos, key=lambda info: info.created, reverse=True)
+
+    def get(self, request_id: str) -> Optional[ProfileInfo]:
+        try:
+            return ProfileInfo(**json.loads(self._path(request_id, 'json').read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def file_path(self, request_id: str, kind: str) -> Optional[Path]:
+        """Path of one profile file, or None if it doesn't exist"""
+        try:
+            path = self._path(request_id, kind)
+        except ValueError:
+            return None
+        return path if path.exists() else None
+
+    def prune(self) -> int:
+        """Delete all but the `max_profiles` most recent profiles"""
+        removed = 0
+        for info in self.list()[self.max_profiles:]:
+            for kind in list(PROFILE_FILES) + ['json']:
+                self._path(info.request_id, kind).unlink(missing_ok=True)
+            removed += 1
+        return removed
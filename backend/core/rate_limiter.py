@@ -27,6 +27,8 @@ class RateLimiter:
         self.config = config
         self.requests: Dict[str, list] = defaultdict(list)
         self.lock = threading.RLock()
+        self.allowed = 0
+        self.rejected = 0
     
     def _cleanup_old_requests(self, client_id: str, current_time: float):
         """Remove requests older than the window"""
@@ -54,6 +56,7 @@ class RateLimiter:
             
             # Check rate limits
             if requests_in_window >= self.config.requests_per_minute:
+                self.rejected += 1
                 return False, {
                     'requests_remaining': 0,
                     'reset_time': int(current_time + self.config.window_size),
@@ -62,6 +65,7 @@ class RateLimiter:
             
             # Add current request
             self.requests[client_id].append(current_time)
+            self.allowed += 1
             
             return True, {
                 'requests_remaining': self.config.requests_per_minute - requests_in_window - 1,
@@ -80,6 +84,15 @@ class RateLimiter:
                 'requests_remaining': max(0, self.config.requests_per_minute - len(self.requests[client_id])),
                 'window_reset': int(current_time + self.config.window_size)
             }
+    
+    def stats(self) -> Dict[str, int]:
+        """Allowed/rejected counters for monitoring"""
+        with self.lock:
+            return {
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'tracked_clients': len(self.requests)
+            }
 
 
 class IPRateLimiter:
@@ -110,6 +123,10 @@ class IPRateLimiter:
         """Get rate limit stats for IP and endpoint"""
         limiter = self.limiters.get(endpoint, self.limiters['default'])
         return limiter.get_client_stats(ip_address)
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters per endpoint for monitoring"""
+        return {endpoint: limiter.stats() for endpoint, limiter in self.limiters.items()}
 
 
 # Flask decorator for rate limiting
@@ -117,18 +134,19 @@ def rate_limit(endpoint: str = 'default'):
     """Decorator to apply rate limiting to Flask routes"""
     def decorator(f):
         def wrapper(*args, **kwargs):
-            from flask import request, jsonify, g
+            from flask import request, jsonify, current_app
             
             # Get client IP
             client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
             if client_ip:
                 client_ip = client_ip.split(',')[0].strip()
             
-            # Check rate limit
-            if not hasattr(g, 'rate_limiter'):
-                g.rate_limiter = IPRateLimiter()
+            # Check rate limit (one limiter per app, so windows and
+            # counters survive across requests)
+            if not hasattr(current_app, 'rate_limiter'):
+                current_app.rate_limiter = IPRateLimiter()
             
-            is_allowed, rate_info = g.rate_limiter.is_allowed(client_ip, endpoint)
+            is_allowed, rate_info = current_app.rate_limiter.is_allowed(client_ip, endpoint)
             
             if not is_allowed:
                 response = jsonify({
@@ -5,12 +5,79 @@ Security validation and sanitization utilities
 """
 
 import os
-import magic
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
 from werkzeug.utils import secure_filename
 from dataclasses import dataclass
 
+from .container_inspection import CONTAINER_KINDS, ContainerBudget, ContainerInspector
+
+try:
+    import magic
+except ImportError:
+    magic = None
+
+# Bytes read from the start of a file for MIME sniffing and signature checks
+HEADER_BYTES = 8192
+
+# MIME types libmagic may report for each extension. Markdown has no magic
+# of its own, so it is normally detected as plain text.
+EXTENSION_MIME_TYPES = {
+    '.pdf': {'application/pdf'},
+    '.docx': {'application/vnd.openxmlformats-officedocument.wordprocessingml.document'},
+    '.doc': {'application/msword'},
+    '.txt': {'text/plain'},
+    '.html': {'text/html'},
+    '.htm': {'text/html'},
+    '.md': {'text/markdown', 'text/x-markdown', 'text/plain'},
+    '.markdown': {'text/markdown', 'text/x-markdown', 'text/plain'},
+}
+
+class SignatureTrie:
+    """Byte-prefix trie: finds which known signature a header starts with in one walk"""
+    
+    def __init__(self, signatures: Iterable[bytes] = ()):
+        self._root: Dict = {}
+        for signature in signatures:
+            self.add(signature)
+    
+    def add(self, signature: bytes):
+        node = self._root
+        for byte in signature:
+            node = node.setdefault(byte, {})
+        node[None] = signature
+    
+    def match(self, header: bytes) -> Optional[bytes]:
+        """Shortest registered signature that `header` starts with, or None"""
+        node = self._root
+        for byte in header:
+            node = node.get(byte)
+            if node is None:
+                return None
+            if None in node:
+                return node[None]
+        return None
+
+# Size cap for extensions without an explicit one
+DEFAULT_MAX_FILE_SIZE = 16 * 1024 * 1024
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    """Everything checked for one extension, resolved once when the validator is built"""
+    ext: str
+    max_size: int
+    mime_types: FrozenSet[str]
+    required_prefixes: Tuple[bytes, ...] = ()  # magic bytes the file must start with, if any
+    container: Optional[str] = None  # 'zip' or 'pdf': structure checked against the budget
+
+@dataclass
+class HeaderInspection:
+    """What one read of a file's first bytes revealed"""
+    size: int
+    mime_type: Optional[str]
+    dangerous_signature: Optional[bytes]
+    prefix: bytes = b''
+
 @dataclass
 class SecurityValidationResult:
     """Result of security validation"""
@@ -36,18 +103,6 @@ class FileSecurityValidator:
     # File extension whitelist
     ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.txt', '.html', '.htm', '.md', '.markdown'}
     
-    # Maximum file sizes (in bytes)
-    MAX_FILE_SIZES = {
-        '.pdf': 50 * 1024 * 1024,    # 50MB
-        '.docx': 25 * 1024 * 1024,   # 25MB
-        '.doc': 25 * 1024 * 1024,    # 25MB
-        '.txt': 10 * 1024 * 1024,    # 10MB
-        '.html': 10 * 1024 * 1024,   # 10MB
-        '.htm': 10 * 1024 * 1024,    # 10MB
-        '.md': 5 * 1024 * 1024,      # 5MB
-        '.markdown': 5 * 1024 * 1024 # 5MB
-    }
-    
     # Dangerous file signatures (magic bytes)
     DANGEROUS_SIGNATURES = [
         b'\x4d\x5a',  # PE executable
@@ -56,8 +111,94 @@ class FileSecurityValidator:
         b'\xfe\xed\xfa',  # Mach-O executable
     ]
     
-    def __init__(self):
+    # Magic bytes binary formats must start with (also enforced without libmagic)
+    REQUIRED_SIGNATURES = {
+        '.pdf': [b'%PDF-'],
+        '.docx': [b'PK\x03\x04'],
+        '.doc': [b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'],  # OLE2 compound file
+    }
+    
+    def __init__(
+        self,
+        container_budget: Optional[ContainerBudget] = None,
+        allowed_extensions: Optional[Iterable[str]] = None,
+        max_file_sizes: Optional[Mapping[str, int]] = None
+    ):
+        """
+        Initialize validator and compile its per-extension plans.
+        
+        Args:
+            container_budget: Structure limits for PDF/DOCX (default: ContainerBudget())
+            allowed_extensions: Accepted extensions, with or without the dot
+                (default: ALLOWED_EXTENSIONS)
+            max_file_sizes: Size caps per extension, with or without the dot
+                (config.MAX_FILE_SIZES; others get DEFAULT_MAX_FILE_SIZE)
+        """
         self.magic_mime = magic.Magic(mime=True) if magic else None
+        self.signature_trie = SignatureTrie(self.DANGEROUS_SIGNATURES)
+        self.container_inspector = ContainerInspector(container_budget)
+        self.plans = self.compile_plans(allowed_extensions, max_file_sizes)
+        self._allowed_list = sorted(self.plans)
+        self._default_plan = ValidationPlan(
+            '', DEFAULT_MAX_FILE_SIZE, frozenset(self.ALLOWED_MIME_TYPES)
+        )
+    
+    @staticmethod
+    def _normalize_ext(ext: str) -> str:
+        ext = ext.lower()
+        return ext if ext.startswith('.') else '.' + ext
+    
+    def compile_plans(
+        self,
+        allowed_extensions: Optional[Iterable[str]] = None,
+        max_file_sizes: Optional[Mapping[str, int]] = None
+    ) -> Dict[str, ValidationPlan]:
+        """Build the ValidationPlan of every allowed extension"""
+        extensions = {self._normalize_ext(ext) for ext in (allowed_extensions or self.ALLOWED_EXTENSIONS)}
+        sizes = {self._normalize_ext(ext): size for ext, size in (max_file_sizes or {}).items()}
+        return {
+            ext: ValidationPlan(
+                ext=ext,
+                max_size=sizes.get(ext, DEFAULT_MAX_FILE_SIZE),
+                mime_types=frozenset(EXTENSION_MIME_TYPES.get(ext, self.ALLOWED_MIME_TYPES)),
+                required_prefixes=tuple(self.REQUIRED_SIGNATURES.get(ext, ())),
+                container=CONTAINER_KINDS.get(ext)
+            )
+            for ext in extensions
+        }
+    
+    def plan_for(self, ext: str) -> Optional[ValidationPlan]:
+        """Plan for an extension (with the dot, lowercase), or None if not allowed"""
+        return self.plans.get(ext)
+    
+    def inspect_header(self, header: bytes, size: int) -> HeaderInspection:
+        """Sniff the MIME type and look up dangerous signatures in already-read bytes"""
+        return HeaderInspection(
+            size=size,
+            mime_type=self.magic_mime.from_buffer(header) if self.magic_mime else None,
+            dangerous_signature=self.signature_trie.match(header),
+            prefix=header[:16]
+        )
+    
+    def inspect_stream(self, stream: BinaryIO) -> HeaderInspection:
+        """
+        Inspect a seekable stream (e.g. an upload) without copying it.
+        
+        Reads HEADER_BYTES from the start and restores the stream position.
+        """
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(0)
+        header = stream.read(HEADER_BYTES)
+        stream.seek(position)
+        return self.inspect_header(header, size)
+    
+    def inspect_file(self, file_path: Path) -> HeaderInspection:
+        """Inspect a file with a single open, fstat and read"""
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            header = f.read(HEADER_BYTES)
+        return self.inspect_header(header, size)
     
     def validate_filename(self, filename: str) -> SecurityValidationResult:
         """Validate filename for security issues"""
@@ -87,12 +228,12 @@ class FileSecurityValidator:
         
         # Check extension
         ext = Path(filename).suffix.lower()
-        if ext not in self.ALLOWED_EXTENSIONS:
+        if ext not in self.plans:
             return SecurityValidationResult(
                 is_valid=False,
                 message=f"File extension '{ext}' not allowed",
                 risk_level="medium",
-                details={"extension": ext, "allowed": list(self.ALLOWED_EXTENSIONS)}
+                details={"extension": ext, "allowed": self._allowed_list}
             )
         
         return SecurityValidationResult(
@@ -103,55 +244,98 @@ class FileSecurityValidator:
     def validate_file_content(self, file_path: Path) -> SecurityValidationResult:
         """Validate file content for security issues"""
         try:
-            # Check file size
-            file_size = file_path.stat().st_size
-            ext = file_path.suffix.lower()
-            max_size = self.MAX_FILE_SIZES.get(ext, 16 * 1024 * 1024)  # Default 16MB
-            
-            if file_size > max_size:
-                return SecurityValidationResult(
-                    is_valid=False,
-                    message=f"File too large: {file_size} bytes (max: {max_size})",
-                    risk_level="medium",
-                    details={"size": file_size, "max_size": max_size}
-                )
-            
-            # Check MIME type
-            if self.magic_mime:
-                mime_type = self.magic_mime.from_file(str(file_path))
-                if mime_type not in self.ALLOWED_MIME_TYPES:
-                    return SecurityValidationResult(
-                        is_valid=False,
-                        message=f"MIME type '{mime_type}' not allowed",
-                        risk_level="high",
-                        details={"mime_type": mime_type, "allowed": list(self.ALLOWED_MIME_TYPES)}
-                    )
-            
-            # Check for dangerous file signatures
-            with open(file_path, 'rb') as f:
-                header = f.read(1024)  # Read first 1KB
-                
-                for signature in self.DANGEROUS_SIGNATURES:
-                    if header.startswith(signature):
-                        return SecurityValidationResult(
-                            is_valid=False,
-                            message="Dangerous file signature detected",
-                            risk_level="critical",
-                            details={"signature": signature.hex()}
-                        )
-            
+            inspection = self.inspect_file(file_path)
+        except Exception as e:
+            return self._validation_error(e)
+        result = self.validate_inspection(inspection, file_path.suffix.lower())
+        if not result.is_valid:
+            return result
+        return self.validate_structure(file_path, file_path.suffix.lower())
+    
+    def validate_inspection(self, inspection: HeaderInspection, ext: str) -> SecurityValidationResult:
+        """Apply the extension's size, signature and MIME rules to an inspected header"""
+        plan = self.plans.get(ext, self._default_plan)
+        
+        # Check file size
+        max_size = plan.max_size
+        if inspection.size > max_size:
+            return SecurityValidationResult(
+                is_valid=False,
+                message=f"File too large: {inspection.size} bytes (max: {max_size})",
+                risk_level="medium",
+                details={"size": inspection.size, "max_size": max_size}
+            )
+        
+        # Check for dangerous file signatures
+        if inspection.dangerous_signature:
             return SecurityValidationResult(
-                is_valid=True,
-                message="File content validation passed"
+                is_valid=False,
+                message="Dangerous file signature detected",
+                risk_level="critical",
+                details={"signature": inspection.dangerous_signature.hex()}
+            )
+        
+        if plan.required_prefixes and not inspection.prefix.startswith(plan.required_prefixes):
+            return SecurityValidationResult(
+                is_valid=False,
+                message=f"File does not start with the '{plan.ext}' signature",
+                risk_level="high",
+                details={"expected": [prefix.hex() for prefix in plan.required_prefixes]}
             )
-            
+        
+        # Check MIME type
+        if inspection.mime_type is not None and inspection.mime_type not in plan.mime_types:
+            return SecurityValidationResult(
+                is_valid=False,
+                message=f"MIME type '{inspection.mime_type}' not allowed",
+                risk_level="high",
+                details={"mime_type": inspection.mime_type, "allowed": sorted(plan.mime_types)}
+            )
+        
+        return SecurityValidationResult(
+            is_valid=True,
+            message="File content validation passed"
+        )
+    
+    def validate_structure(self, source, ext: str) -> SecurityValidationResult:
+        """
+        Check a PDF/DOCX's internal structure against the container budget.
+        
+        Reads only the ZIP central directory or the PDF trailer, so zip bombs
+        and object floods are rejected before any reader parses the file.
+        
+        Args:
+            source: File path or seekable binary stream
+            ext: File extension, with the dot
+        """
+        plan = self.plans.get(ext)
+        if plan is None or plan.container is None:
+            return SecurityValidationResult(is_valid=True, message="File structure validation passed")
+        try:
+            report = self.container_inspector.inspect_kind(source, plan.container)
         except Exception as e:
+            return self._validation_error(e)
+        if not report.within_budget:
             return SecurityValidationResult(
                 is_valid=False,
-                message=f"Validation error: {str(e)}",
+                message=f"File structure exceeds limits: {'; '.join(report.violations)}",
                 risk_level="high",
-                details={"error": str(e)}
+                details={"container": report.kind, "violations": report.violations, **report.stats}
             )
+        return SecurityValidationResult(
+            is_valid=True,
+            message="File structure validation passed",
+            details=report.stats
+        )
+    
+    @staticmethod
+    def _validation_error(error: Exception) -> SecurityValidationResult:
+        return SecurityValidationResult(
+            is_valid=False,
+            message=f"Validation error: {str(error)}",
+            risk_level="high",
+            details={"error": str(error)}
+        )
     
     def sanitize_filename(self, filename: str) -> str:
         """Sanitize filename for safe storage"""
@@ -191,23 +375,22 @@ class FileSecurityValidator:
         if not filename_result.is_valid:
             return filename_result
         
-        # Create temporary file for content validation
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            file_storage.save(tmp_file.name)
-            tmp_path = Path(tmp_file.name)
-        
+        # Validate content straight from the upload stream (no temporary copy)
+        ext = Path(filename).suffix.lower()
         try:
-            # Validate content
-            content_result = self.validate_file_content(tmp_path)
-            return content_result
-        finally:
-            # Clean up temporary file
-            tmp_path.unlink(missing_ok=True)
+            inspection = self.inspect_stream(file_storage.stream)
+        except Exception as e:
+            return self._validation_error(e)
+        result = self.validate_inspection(inspection, ext)
+        if not result.is_valid:
+            return result
+        return self.validate_structure(file_storage.stream, ext)
 
 class InputSanitizer:
     """Sanitize user inputs"""
     
+    ALLOWED_FORMATS = frozenset({'pdf', 'docx', 'txt', 'html', 'md', 'markdown'})
+    
     @staticmethod
     def sanitize_text(text: str, max_length: int = 1000) -> str:
         """Sanitize text input"""
@@ -230,6 +413,4 @@ class InputSanitizer:
             return None
         
         format_str = format_str.lower().strip()
-        allowed_formats = {'pdf', 'docx', 'txt', 'html', 'md', 'markdown'}
-        
-        return format_str if format_str in allowed_formats else None
\ No newline at end of file
+        return format_str if format_str in InputSanitizer.ALLOWED_FORMATS else None
\ No newline at end of file
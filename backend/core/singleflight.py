@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single-flight coalescing of identical in-flight work.
+
+The first caller for a key (the leader) runs the work; callers arriving
+with the same key while it runs (followers) wait for its result instead of
+repeating it. A key stops being in flight as soon as the leader finishes,
+so later callers start a fresh flight (caching is a separate concern).
+
+The result may own resources (e.g. the directory holding a converted file)
+that every participant reads after the flight completes. Each participant
+releases the flight when done with it, and the optional cleanup callback
+runs once the last one has.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class Flight:
+    """One execution of the work, shared by its leader and followers"""
+
+    def __init__(self, key: Optional[Hashable], cleanup: Optional[Callable[[Any], None]] = None):
+        self.key = key
+        self._cleanup = cleanup
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._participants = 1
+        self._released = 0
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def shared(self) -> bool:
+        """Whether more than one request used this flight's result"""
+        return self._participants > 1
+
+    @property
+    def value(self) -> Any:
+        """The leader's result; raises the leader's exception if it failed"""
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _join(self) -> bool:
+        with self._lock:
+            if self._done.is_set():
+                return False
+            self._participants += 1
+            return True
+
+    def _finish(self, value: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._value = value
+            self._error = error
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def release(self):
+        """Signal this participant is done with the result"""
+        with self._lock:
+            self._released += 1
+            last = self._done.is_set() and self._released == self._participants
+        if last and self._cleanup is not None and self._error is None:
+            self._cleanup(self._value)
+
+
+class SingleFlight:
+    """Table of in-flight keys"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+        self._stats = {'leaders': 0, 'followers': 0, 'timeouts': 0, 'failures': 0, 'in_flight': 0}
+
+    def do(self, key: Optional[Hashable], work: Callable[[], Any], timeout: Optional[float] = None,
+           cleanup: Optional[Callable[[Any], None]] = None) -> Flight:
+        """
+        Run `work` once per concurrent `key` and return the Flight holding its result.
+
+        The caller must call `release()` on the returned flight once it no
+        longer needs the result. A key of None disables coalescing for the
+        call.
+
+        Raises:
+            Whatever `work` raised (for the leader and every follower), or
+            TimeoutError when a follower waited longer than `timeout`
+        """
+        with self._lock:
+            flight = self._flights.get(key) if key is not None else None
+            leader = not (flight is not None and flight._join())
+            if not leader:
+                self._stats['followers'] += 1
+            else:
+                flight = Flight(key, cleanup)
+                if key is not None:
+                    self._flights[key] = flight
+                self._stats['leaders'] += 1
+                self._stats['in_flight'] += 1
+
+        if leader:
+            try:
+                value = work()
+            except BaseException as e:
+                self._complete(flight, error=e)
+                flight.release()
+                raise
+            self._complete(flight, value=value)
+            return flight
+
+        if not flight.wait(timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            flight.release()
+            raise TimeoutError(f'waited {timeout}s for an identical request in progress')
+        if flight._error is not None:
+            flight.release()
+            raise flight._error
+        return flight
+
+    def _complete(self, flight: Flight, value: Any = None, error: Optional[BaseException] = None):
+        # No follower can join once the key is gone, so the participant count is final
+        with self._lock:
+            if flight.key is not None and self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            self._stats['in_flight'] -= 1
+            if error is not None:
+                self._stats['failures'] += 1
+        flight._finish(value, error)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumable chunked uploads.
+
+A session is created with the file name and total size; its spool file is
+allocated at that size, and chunks are written at their offsets (in any
+order, in parallel, and retried as often as needed). Received ranges are
+appended to a small log in the session directory, so every worker process
+sees the same progress and a client can ask where to resume.
+
+The SHA-256 is computed while chunks arrive: a chunk that starts where the
+hashed prefix ends is hashed from memory as it is written, and data that
+arrived out of order is read back (from the page cache, usually) once the
+gap before it is filled. At finalize time the hash is normally already
+complete; only a process that did not see the upload hashes what it is
+missing from disk. A finalized session accepts no more chunks, so the
+content behind its hash stays what was hashed.
+
+Every chunk touches the session directory and re-reports it to the storage
+janitor, so sessions age out from their last activity, not their creation.
+A session the janitor removed anyway raises SessionNotFoundError.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from .exceptions import FileNotFoundError as SessionNotFoundError
+from .exceptions import FileTooLargeError, ValidationError
+
+SESSION_PREFIX = 'upload-'
+DATA_NAME = 'data'
+META_NAME = 'meta.json'
+RANGES_NAME = 'ranges'
+FINALIZED_NAME = 'finalized'
+BLOCK_SIZE = 1024 * 1024
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sorted, non-overlapping [start, end) ranges covering the same bytes"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+@dataclass(frozen=True)
+class UploadSession:
+    id: str
+    filename: str
+    size: int
+    created: float
+    directory: Path
+
+    @property
+    def data_path(self) -> Path:
+        return self.directory / DATA_NAME
+
+
+@dataclass(frozen=True)
+class CompletedUpload:
+    """A fully received upload and its content hash"""
+    session: UploadSession
+    sha256: str
+
+    @property
+    def path(self) -> Path:
+        return self.session.data_path
+
+
+class _HashState:
+    """Incremental SHA-256 over the contiguous prefix received so far (per process)"""
+
+    def __init__(self):
+        self.hasher = hashlib.sha256()
+        self.offset = 0
+        self.inline = False  # a chunk at `offset` is being hashed while written
+        self.lock = threading.Lock()
+
+
+class ChunkedUploadStore:
+    """Upload sessions under a spool directory"""
+
+    def __init__(self, directory, max_size: int, janitor=None):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.janitor = janitor
+        self._states: Dict[str, _HashState] = {}
+        self._lock = threading.Lock()
+        self._stats = {'sessions_created': 0, 'sessions_completed': 0, 'chunks': 0,
+                       'bytes_received': 0, 'bytes_hashed_inline': 0, 'bytes_hashed_from_disk': 0}
+
+    # Sessions
+
+    def create(self, filename: str, size: int, max_size: Optional[int] = None) -> UploadSession:
+        """Open a session for `size` bytes (at most `max_size`, or the store's limit)"""
+        self._prune_states()
+        limit = min(self.max_size, max_size or self.max_size)
+        if size <= 0:
+            raise ValidationError('Upload size must be positive', details={'size': size})
+        if size > limit:
+            raise FileTooLargeError(f'Upload of {size} bytes exceeds the limit of {limit}',
+                                    details={'size': size, 'max_size': limit})
+
+        session_id = uuid.uuid4().hex
+        directory = self.directory / f'{SESSION_PREFIX}{session_id}'
+        directory.mkdir(parents=True)
+        session = UploadSession(session_id, filename, size, time.time(), directory)
+        with open(session.data_path, 'wb') as f:
+            f.truncate(size)
+        (directory / RANGES_NAME).touch()
+        (directory / META_NAME).write_text(
+            json.dumps({'filename': filename, 'size': size, 'created': session.created}), encoding='utf-8'
+        )
+        if self.janitor is not None:
+            self.janitor.track(directory, size=size, created=session.created)
+        with self._lock:
+            self._stats['sessions_created'] += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        if not (len(session_id) == 32 and all(c in '0123456789abcdef' for c in session_id)):
+            return None
+        directory = self.directory / f'{SESSION_PREFIX}{session_id}'
+        try:
+            meta = json.loads((directory / META_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            with self._lock:
+                self._states.pop(session_id, None)
+            return None
+        return UploadSession(session_id, meta['filename'], meta['size'], meta['created'], directory)
+
+    def _prune_states(self):
+        """Drop hash states of sessions removed behind our back (e.g. by the janitor)"""
+        with self._lock:
+            ids = list(self._states)
+        gone = [i for i in ids if not (self.directory / f'{SESSION_PREFIX}{i}').is_dir()]
+        with self._lock:
+            for session_id in gone:
+                self._states.pop(session_id, None)
+
+    def _gone(self, session: UploadSession) -> SessionNotFoundError:
+        with self._lock:
+            self._states.pop(session.id, None)
+        return SessionNotFoundError('Upload session no longer exists', details={'id': session.id})
+
+    def discard(self, session: UploadSession):
+        """Remove a session and its spool file"""
+        with self._lock:
+            self._states.pop(session.id, None)
+        shutil.rmtree(session.directory, ignore_errors=True)
+        if self.janitor is not None:
+            self.janitor.forget(session.directory)
+
+    # Progress
+
+    def received(self, session: UploadSession) -> List[Tuple[int, int]]:
+        """Merged [start, end) ranges received so far"""
+        ranges = []
+        try:
+            with open(session.directory / RANGES_NAME, 'r', encoding='ascii') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        ranges.append((int(parts[0]), int(parts[1])))
+        except FileNotFoundError:
+            raise self._gone(session) from None
+        return merge_ranges(ranges)
+
+    def status(self, session: UploadSession) -> Dict:
+        received = self.received(session)
+        missing = []
+        position = 0
+        for start, end in received:
+            if start > position:
+                missing.append((position, start))
+            position = end
+        if position < session.size:
+            missing.append((position, session.size))
+        return {
+            'id': session.id,
+            'filename': session.filename,
+            'size': session.size,
+            'received_bytes': sum(end - start for start, end in received),
+            'received': [list(r) for r in received],
+            'missing': [list(r) for r in missing],
+            'complete': not missing,
+        }
+
+    # Chunks
+
+    def _state(self, session_id: str) -> _HashState:
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                state = self._states[session_id] = _HashState()
+            return state
+
+    def is_finalized(self, session: UploadSession) -> bool:
+        return (session.directory / FINALIZED_NAME).exists()
+
+    def write_chunk(self, session: UploadSession, offset: int, stream: BinaryIO) -> int:
+        """
+        Write the chunk read from `stream` at `offset`; returns the bytes written.
+
+        Whatever was written before an error (e.g. a dropped connection) is
+        still recorded, so the client can resume from the exact byte.
+
+        Raises:
+            ValidationError: for chunks outside the upload or a finalized session
+            SessionNotFoundError: if the session was removed (e.g. expired)
+        """
+        if self.is_finalized(session):
+            raise ValidationError('Upload is already finalized', details={'id': session.id})
+        if offset < 0 or offset >= session.size:
+            raise ValidationError('Chunk offset outside the upload',
+                                  details={'offset': offset, 'size': session.size})
+        state = self._state(session.id)
+        with state.lock:
+            inline = not state.inline and state.offset == offset
+            if inline:
+                state.inline = True
+
+        written = 0
+        try:
+            fd = os.open(session.data_path, os.O_WRONLY)
+        except FileNotFoundError:
+            if inline:
+                with state.lock:
+                    state.inline = False
+            raise self._gone(session) from None
+        try:
+            while True:
+                block = stream.read(BLOCK_SIZE)
+                if not block:
+                    break
+                if offset + written + len(block) > session.size:
+                    raise ValidationError('Chunk extends past the end of the upload',
+                                          details={'offset': offset, 'size': session.size})
+                os.pwrite(fd, block, offset + written)
+                if inline:
+                    state.hasher.update(block)
+                written += len(block)
+        finally:
+            os.close(fd)
+            if inline:
+                with state.lock:
+                    state.offset = offset + written
+                    state.inline = False
+            if written:
+                try:
+                    # One short O_APPEND write per chunk: atomic across processes
+                    with open(session.directory / RANGES_NAME, 'a', encoding='ascii') as log:
+                        log.write(f'{offset} {offset + written}\n')
+                    self._touch(session)
+                except FileNotFoundError:
+                    pass  # removed while the chunk arrived; the next call reports it
+            with self._lock:
+                self._stats['chunks'] += 1
+                self._stats['bytes_received'] += written
+                if inline:
+                    self._stats['bytes_hashed_inline'] += written
+
+        self._catch_up(session, state)
+        return written
+
+    def _touch(self, session: UploadSession):
+        """Mark the session active, for this process's janitor and (via mtime) any other"""
+        os.utime(session.directory)
+        if self.janitor is not None:
+            self.janitor.track(session.directory, size=session.size)
+
+    def _catch_up(self, session: UploadSession, state: _HashState):
+        """Hash data that became contiguous with the hashed prefix"""
+        received = self.received(session)
+        end = received[0][1] if received and received[0][0] == 0 else 0
+        with state.lock:
+            if state.inline or end <= state.offset:
+                return
+            from_disk = end - state.offset
+            with open(session.data_path, 'rb') as f:
+                f.seek(state.offset)
+                remaining = from_disk
+                while remaining:
+                    block = f.read(min(BLOCK_SIZE, remaining))
+                    if not block:
+                        break
+                    state.hasher.update(block)
+                    remaining -= len(block)
+            state.offset = end
+        with self._lock:
+            self._stats['bytes_hashed_from_disk'] += from_disk
+
+    def finalize(self, session: UploadSession) -> CompletedUpload:
+        """
+        The completed upload and its SHA-256.
+
+        Raises:
+            ValidationError: if bytes are still missing or a chunk is in progress
+            SessionNotFoundError: if the session was removed (e.g. expired)
+        """
+        status = self.status(session)
+        if not status['complete']:
+            raise ValidationError('Upload is incomplete', details={'missing': status['missing']})
+        state = self._state(session.id)
+        self._catch_up(session, state)
+        with state.lock:
+            if state.inline or state.offset != session.size:
+                raise ValidationError('A chunk is still being written')
+            digest = state.hasher.copy().hexdigest()
+        (session.directory / FINALIZED_NAME).touch()
+        with self._lock:
+            self._stats['sessions_completed'] += 1
+        return CompletedUpload(session, digest)
+
+    def stats(self) -> Dict[str, int]:
+        self._prune_states()
+        with self._lock:
+            return dict(self._stats, sessions_in_process=len(self._states))
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sandboxed worker processes for running conversions with hard limits.
+
+Each job runs in a pre-spawned child process with an address-space limit
+(RLIMIT_AS) and a per-job CPU budget (RLIMIT_CPU). The caller waits at most
+`timeout` seconds; a worker that overruns is killed and replaced, and the
+caller gets a ProcessingTimeoutError. Workers are recycled after a number of
+jobs or when their resident memory grows past a threshold.
+
+Waiting for an idle worker counts towards the job's timeout. A replacement
+that fails to start is retried with backoff; if it keeps failing the pool
+shrinks (logged and counted) rather than leaving callers waiting for a
+worker that will never come.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .exceptions import ConversionError, ProcessingTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Attempts (with exponential backoff from RESPAWN_BACKOFF seconds) to start a replacement worker
+RESPAWN_ATTEMPTS = 5
+RESPAWN_BACKOFF = 0.5
+
+
+@dataclass
+class WorkerLimits:
+    """Resource limits applied inside each worker process"""
+    memory_mb: Optional[int] = 1024     # RLIMIT_AS (virtual address space)
+    cpu_seconds: Optional[int] = None   # RLIMIT_CPU budget per job
+
+
+def _current_rss() -> int:
+    """Resident set size of the current process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is not None:
+            # Peak rather than current RSS; KB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return 0
+
+
+def _apply_memory_limit(memory_mb: Optional[int]):
+    """Cap the worker's address space"""
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not set RLIMIT_AS: {e}")
+
+
+def _arm_cpu_limit(cpu_seconds: Optional[int]):
+    """Allow `cpu_seconds` more CPU time from now (SIGXCPU once exceeded)"""
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not set RLIMIT_CPU: {e}")
+
+
+def _worker_main(conn, limits: WorkerLimits):
+    """Worker loop: receive (func, args, kwargs), send (status, payload, rss)"""
+    # The parent handles Ctrl+C; workers are stopped through the pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _apply_memory_limit(limits.memory_mb)
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        func, args, kwargs = job
+        _arm_cpu_limit(limits.cpu_seconds)
+        try:
+            reply = ('ok', func(*args, **kwargs))
+        except Exception as e:
+            reply = ('error', e)
+
+        try:
+            conn.send(reply + (_current_rss(),))
+        except Exception as e:
+            # Unpicklable result or exception
+            conn.send(('error', ConversionError(f"Worker could not return result: {e!r}"), _current_rss()))
+
+    conn.close()
+
+
+class _Worker:
+    """Handle on one worker process and its pipe"""
+
+    def __init__(self, context, limits: WorkerLimits):
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, limits),
+            name='conversion-worker',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs = 0
+        self.rss = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def stop(self, graceful: bool = True):
+        """Stop the worker, politely if possible"""
+        if graceful:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(1)
+
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class ConversionWorkerPool:
+    """Pool of pre-spawned, resource-limited worker processes"""
+
+    def __init__(
+        self,
+        size: int = 4,
+        timeout: float = 300,
+        max_jobs_per_worker: int = 100,
+        max_rss_mb: Optional[int] = 512,
+        limits: Optional[WorkerLimits] = None,
+        start_method: str = 'spawn'
+    ):
+        """
+        Initialize worker pool (processes are started lazily).
+
+        Args:
+            size: Number of worker processes
+            timeout: Default wall-clock timeout per job in seconds
+            max_jobs_per_worker: Recycle a worker after this many jobs
+            max_rss_mb: Recycle a worker whose RSS exceeds this after a job
+            limits: Resource limits applied inside workers
+            start_method: multiprocessing start method ('spawn' is safe in
+                threaded servers; 'fork' starts faster)
+        """
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.limits = limits or WorkerLimits()
+        self.context = multiprocessing.get_context(start_method)
+
+        self._idle: 'queue.Queue[_Worker]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._stats = {
+            'jobs': 0,
+            'timeouts': 0,
+            'crashes': 0,
+            'recycled': 0,
+            'busy': 0,
+            'respawn_failures': 0,
+        }
+
+    def start(self):
+        """Spawn all workers (called automatically on first use)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._idle.put(_Worker(self.context, self.limits))
+        atexit.register(self.shutdown)
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run `func(*args, **kwargs)` in a worker and return its result.
+
+        `func` and its arguments must be picklable (module-level functions).
+        Exceptions raised by `func` are re-raised here.
+
+        Raises:
+            ProcessingTimeoutError: Job exceeded its wall-clock or CPU budget
+            ConversionError: Worker process died unexpectedly
+        """
+        if self._closed:
+            raise ConversionError("Worker pool is shut down")
+        self.start()
+
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            self._update_stats(timeouts=1)
+            raise ProcessingTimeoutError(
+                f"No conversion worker available within {timeout}s",
+                details={'timeout': timeout, 'waited_for_worker': True}
+            )
+        self._update_stats(busy=1)
+        rss = 0
+
+        try:
+            worker.conn.send((func, args, kwargs))
+            if not worker.conn.poll(max(0.0, timeout - (time.monotonic() - started))):
+                self._replace(worker, graceful=False)
+                worker = None
+                self._update_stats(timeouts=1)
+                raise ProcessingTimeoutError(
+                    f"Processing exceeded {timeout}s",
+                    details={'timeout': timeout}
+                )
+            status, payload, rss = worker.conn.recv()
+
+        except (EOFError, OSError) as e:
+            exitcode = worker.process.exitcode if worker else None
+            self._replace(worker, graceful=False)
+            worker = None
+
+            if resource is not None and exitcode == -signal.SIGXCPU:
+                self._update_stats(timeouts=1)
+                raise ProcessingTimeoutError(
+                    f"Processing exceeded CPU budget of {self.limits.cpu_seconds}s",
+                    details={'cpu_seconds': self.limits.cpu_seconds}
+                )
+            self._update_stats(crashes=1)
+            raise ConversionError(
+                "Conversion worker died",
+                details={'exitcode': exitcode, 'error': str(e)}
+            )
+
+        finally:
+            self._update_stats(busy=-1)
+            if worker is not None:
+                self._update_stats(jobs=1)
+                self._release(worker, rss)
+
+        logger.debug(f"Worker job finished in {time.monotonic() - started:.3f}s")
+        if status == 'error':
+            raise payload
+        return payload
+
+    def _release(self, worker: _Worker, rss: int):
+        """Return a worker to the idle queue, or recycle it"""
+        worker.jobs += 1
+        worker.rss = rss
+
+        too_many_jobs = self.max_jobs_per_worker and worker.jobs >= self.max_jobs_per_worker
+        too_big = self.max_rss_mb and rss > self.max_rss_mb * 1024 * 1024
+        if self._closed:
+            worker.stop(graceful=True)
+        elif too_many_jobs or too_big:
+            self._update_stats(recycled=1)
+            self._replace(worker, graceful=True)
+        else:
+            self._idle.put(worker)
+
+    def _respawn(self):
+        """Start a replacement worker, retrying with backoff; shrink the pool if it never starts"""
+        delay = RESPAWN_BACKOFF
+        for attempt in range(1, RESPAWN_ATTEMPTS + 1):
+            if self._closed:
+                return
+            try:
+                self._idle.put(_Worker(self.context, self.limits))
+                return
+            except Exception as e:
+                self._update_stats(respawn_failures=1)
+                logger.warning(f"Could not start a conversion worker (attempt {attempt}/{RESPAWN_ATTEMPTS}): {e}")
+                time.sleep(delay)
+                delay *= 2
+        with self._lock:
+            self.size -= 1
+        logger.error(f"Giving up on a conversion worker; pool size is now {self.size}")
+
+    def _replace(self, worker: _Worker, graceful: bool):
+        """Stop a worker and spawn its replacement off the request path"""
+        def _swap():
+            worker.stop(graceful=graceful)
+            self._respawn()
+
+        if graceful:
+            threading.Thread(target=_swap, name='worker-recycle', daemon=True).start()
+        else:
+            # Kill synchronously so a runaway job stops consuming resources now
+            worker.stop(graceful=False)
+            if not self._closed:
+                threading.Thread(target=self._respawn, name='worker-respawn', daemon=True).start()
+
+    def _update_stats(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+    def shutdown(self):
+        """Stop all idle workers; busy ones are stopped when they finish"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop(graceful=True)
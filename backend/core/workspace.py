@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-request working directories.
+
+Every conversion gets its own uniquely named directory under a shared root,
+so concurrent requests for files with the same name never touch each
+other's inputs or outputs. The directory is removed deterministically when
+the workspace is closed: at the end of a `with` block, or — when a file from
+it is being streamed back — once the response body has been sent.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from werkzeug.utils import secure_filename
+from werkzeug.wsgi import ClosingIterator
+
+WORKSPACE_PREFIX = 'req-'
+
+
+class Workspace:
+    """A unique directory owned by one request"""
+
+    def __init__(self, root, prefix: str = WORKSPACE_PREFIX, janitor=None):
+        self.root = Path(root)
+        self.prefix = prefix
+        # Optional StorageJanitor: reaps workspaces whose close() never runs
+        self.janitor = janitor
+        self.path: Optional[Path] = None
+        self._handed_off = False
+
+    def open(self) -> 'Workspace':
+        """Create the directory (mkdtemp: unique name, mode 0700)"""
+        if self.path is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.path = Path(tempfile.mkdtemp(prefix=self.prefix, dir=self.root))
+            if self.janitor is not None:
+                self.janitor.track(self.path)
+        return self
+
+    def file(self, filename: str) -> Path:
+        """Path for `filename` inside the workspace; the name is sanitized to a bare file name"""
+        if self.path is None:
+            raise RuntimeError('workspace is not open')
+        name = secure_filename(os.path.basename(filename))
+        if not name:
+            raise ValueError(f'Invalid file name: {filename!r}')
+        return self.path / name
+
+    def close(self):
+        """Remove the directory, unless a response has taken ownership of it"""
+        if self._handed_off or self.path is None:
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+        if self.janitor is not None:
+            self.janitor.forget(self.path)
+        self.path = None
+
+    def bind_to_response(self, response):
+        """
+        Hand the workspace to a response streaming one of its files.
+
+        The directory is removed when the WSGI server closes the response
+        body (after the last byte is sent, or on client disconnect);
+        close() becomes a no-op until then.
+        """
+        def release():
+            self._handed_off = False
+            self.close()
+
+        self._handed_off = True
+        response.response = ClosingIterator(response.response, release)
+        return response
+
+    def __enter__(self) -> 'Workspace':
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
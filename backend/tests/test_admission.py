@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Admission control tests
+"""
+
+import io
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from ..api.routes import api_bp
+from ..core.admission import AdmissionClassConfig, AdmissionController
+from ..core.exceptions import ServiceOverloadedError
+
+
+def _controller(max_concurrent=1, max_queue=1, expected_seconds=0.1, max_wait=5.0):
+    return AdmissionController(
+        classes={
+            'heavy': AdmissionClassConfig(max_concurrent, max_queue, expected_seconds),
+            'light': AdmissionClassConfig(4, 4, expected_seconds),
+        },
+        format_classes={'pdf': 'heavy', 'docx': 'heavy'},
+        default_class='light',
+        max_wait=max_wait
+    )
+
+
+class TestAdmissionController:
+    """Test slots, queues and load shedding"""
+
+    def test_admits_immediately_when_idle(self):
+        """Test free slots are granted without waiting"""
+        controller = _controller()
+        ticket = controller.acquire('pdf')
+        assert ticket.format_class == 'heavy'
+        assert ticket.waited == 0.0
+        controller.release(ticket)
+        assert controller.stats()['heavy']['active'] == 0
+
+    def test_classes_are_independent(self):
+        """Test a saturated class does not block other formats"""
+        controller = _controller(max_queue=0)
+        ticket = controller.acquire('pdf')
+        with controller.admit('txt') as light:
+            assert light.format_class == 'light'
+        controller.release(ticket)
+
+    def test_rejects_when_queue_full(self):
+        """Test overflow is shed with a Retry-After hint"""
+        controller = _controller(max_queue=0)
+        ticket = controller.acquire('docx')
+        with pytest.raises(ServiceOverloadedError) as exc:
+            controller.acquire('pdf')
+        controller.release(ticket)
+
+        assert exc.value.details['reason'] == 'queue_full'
+        assert exc.value.details['retry_after'] >= 1
+        assert controller.stats()['heavy']['rejected_queue_full'] == 1
+
+    def test_rejects_unreachable_deadline(self):
+        """Test requests whose estimated wait exceeds the deadline fail fast"""
+        controller = _controller(expected_seconds=10.0)
+        ticket = controller.acquire('pdf')
+        started = time.monotonic()
+        with pytest.raises(ServiceOverloadedError) as exc:
+            controller.acquire('pdf', deadline=1.0)
+        controller.release(ticket)
+
+        assert exc.value.details['reason'] == 'deadline'
+        assert time.monotonic() - started < 0.5
+
+    def test_queued_request_gets_released_slot(self):
+        """Test release hands the slot to the oldest waiter"""
+        controller = _controller()
+        ticket = controller.acquire('pdf')
+        granted = []
+
+        waiter = threading.Thread(target=lambda: granted.append(controller.acquire('pdf')))
+        waiter.start()
+        while controller.stats()['heavy']['queue_depth'] == 0:
+            time.sleep(0.01)
+
+        controller.release(ticket)
+        waiter.join(5)
+
+        assert granted and granted[0].waited > 0
+        stats = controller.stats()['heavy']
+        assert stats['active'] == 1
+        assert stats['max_queue_depth_seen'] == 1
+        controller.release(granted[0])
+        assert controller.stats()['heavy']['active'] == 0
+
+    def test_wait_timeout(self):
+        """Test a waiter that is never served is rejected after its deadline"""
+        controller = _controller(expected_seconds=0.01, max_wait=0.2)
+        ticket = controller.acquire('pdf')
+        with pytest.raises(ServiceOverloadedError) as exc:
+            controller.acquire('pdf')
+        controller.release(ticket)
+
+        assert exc.value.details['reason'] == 'wait_timeout'
+        assert controller.stats()['heavy']['queue_depth'] == 0
+
+    def test_api_convert_is_shed(self, tmp_path):
+        """Test /api/v1/convert goes through the app's admission controller"""
+        controller = _controller(max_queue=0)
+        app = Flask(__name__)
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        app.extensions['admission'] = controller
+        app.register_blueprint(api_bp)
+
+        ticket = controller.acquire('pdf')
+        response = app.test_client().post('/api/v1/convert', data={
+            'file': (io.BytesIO(b'# titulo'), 'notas.md'), 'target_format': 'pdf'
+        })
+        controller.release(ticket)
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(response.get_json()['details']['retry_after'])
+        assert controller.stats()['heavy']['rejected_queue_full'] == 1
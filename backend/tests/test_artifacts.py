@@ -0,0 +1,55 @@
+"""Tests for the converted artifact store"""
+
+import hashlib
+
+from ..core.artifacts import ArtifactStore, valid_artifact_id
+from ..core.janitor import StorageArea, StorageJanitor
+
+
+class TestArtifactStore:
+    """Test storing and looking up artifacts"""
+
+    def test_store_and_get(self, tmp_path):
+        source = tmp_path / 'out.pdf'
+        source.write_bytes(b'%PDF-1.4 converted')
+        store = ArtifactStore(tmp_path / 'artifacts')
+
+        artifact = store.store(source, 'relatorio_convertido.pdf')
+        assert valid_artifact_id(artifact.id)
+        assert artifact.etag == hashlib.sha256(b'%PDF-1.4 converted').hexdigest()
+        assert artifact.size == len(b'%PDF-1.4 converted')
+
+        loaded = store.get(artifact.id)
+        assert loaded == artifact
+        assert loaded.path.read_bytes() == b'%PDF-1.4 converted'
+
+    def test_unknown_and_malformed_ids(self, tmp_path):
+        store = ArtifactStore(tmp_path)
+        assert store.get('0' * 32) is None
+        assert store.get('../etc/passwd') is None
+        assert store.get('') is None
+
+    def test_tracked_by_janitor(self, tmp_path):
+        area = tmp_path / 'artifacts'
+        janitor = StorageJanitor([StorageArea('artifacts', area, max_age=0)])
+        source = tmp_path / 'out.txt'
+        source.write_bytes(b'abc')
+        store = ArtifactStore(area, janitor=janitor)
+        artifact = store.store(source, 'out.txt')
+
+        assert janitor.stats()['artifacts']['entries'] == 1
+        janitor.rescan_interval = float('inf')
+        janitor._last_scan = float('inf')
+        assert janitor.run_once() == 3
+        assert store.get(artifact.id) is None
+
+    def test_second_record_over_same_content(self, tmp_path):
+        source = tmp_path / 'out.txt'
+        source.write_bytes(b'abc')
+        store = ArtifactStore(tmp_path / 'artifacts')
+        first = store.store(source, 'a_convertido.txt')
+        second = store.store(first.path, 'b_convertido.txt', sha256=first.sha256)
+
+        assert second.id != first.id
+        assert (second.name, second.etag) == ('b_convertido.txt', first.etag)
+        assert store.get(first.id).name == 'a_convertido.txt'
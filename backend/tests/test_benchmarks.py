@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark harness tests
+"""
+
+import json
+from io import BytesIO
+
+import pytest
+from werkzeug.test import create_environ
+from werkzeug.wrappers import Request
+
+from ..app import ConversorUniversalMelhorado
+from ..benchmarks.corpus import build_corpus, generate_text
+from ..benchmarks.load import Sample, check_slo, encode_multipart, parse_mix, summarize
+from ..benchmarks.run import compare, percentile
+
+
+class TestCorpus:
+    """Test the synthetic corpus generator"""
+
+    def test_deterministic(self):
+        """Test the same seed and size always give the same text"""
+        assert generate_text(3, seed=7) == generate_text(3, seed=7)
+        assert generate_text(3, seed=7) != generate_text(3, seed=8)
+
+    def test_academic_structure(self):
+        """Test generated documents exercise the structure detector"""
+        conversor = ConversorUniversalMelhorado()
+        tipos = {item['tipo'] for item in conversor._detectar_estrutura_documento(generate_text(5))}
+        assert {'instituicao', 'secao_especial', 'titulo', 'subtitulo', 'paragrafo'} <= tipos
+
+    def test_build_reuses_files(self, tmp_path):
+        """Test unchanged documents are not rewritten"""
+        conversor = ConversorUniversalMelhorado()
+        entries = build_corpus(conversor, tmp_path, sizes=[1], formats=['txt', 'md'])
+        path = tmp_path / entries[0]['path']
+        mtime = path.stat().st_mtime_ns
+
+        build_corpus(conversor, tmp_path, sizes=[1], formats=['txt'])
+        assert path.stat().st_mtime_ns == mtime
+        assert len(json.loads((tmp_path / 'manifest.json').read_text())) == 2
+
+
+def test_percentile():
+    """Test interpolated percentiles"""
+    values = [4, 1, 3, 2]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4
+
+
+def test_compare_flags_regressions():
+    """Test median latency regressions above the threshold are reported"""
+    baseline = {'results': [{'case': 'read:txt:1p', 'latency_ms': {'p50': 10.0}}]}
+    report = {'results': [{'case': 'read:txt:1p', 'latency_ms': {'p50': 13.0}}]}
+    assert compare(report, baseline, 0.2)[0]['case'] == 'read:txt:1p'
+    assert compare(report, baseline, 0.5) == []
+
+
+class TestLoadHarness:
+    """Test the HTTP load generator helpers"""
+
+    def test_parse_mix(self):
+        """Test format pair weights"""
+        assert parse_mix(['txt:pdf=3', 'docx:md']) == [('txt', 'pdf', 3.0), ('docx', 'md', 1.0)]
+        with pytest.raises(ValueError):
+            parse_mix(['txt:odt'])
+
+    def test_multipart_is_parseable(self):
+        """Test encoded bodies are accepted by werkzeug's form parser"""
+        body, content_type = encode_multipart(
+            {'formato_destino': 'pdf'}, 'arquivo', 'a.txt', b'conteudo', 'text/plain'
+        )
+        request = Request(create_environ(method='POST', input_stream=BytesIO(body),
+                                         content_type=content_type, content_length=len(body)))
+        assert request.form['formato_destino'] == 'pdf'
+        assert request.files['arquivo'].read() == b'conteudo'
+
+    def test_summary_separates_throttling_from_errors(self):
+        """Test 429 and 503 are reported apart from the error rate"""
+        samples = [
+            Sample(0.0, 0.1, 200, 'converter', 'txt->pdf', 1),
+            Sample(0.1, 0.2, 429, 'converter', 'txt->pdf', 1),
+            Sample(0.2, 0.3, 503, 'converter', 'txt->pdf', 1),
+            Sample(0.3, 0.4, 500, 'converter', 'txt->pdf', 1),
+        ]
+        summary = summarize(samples, elapsed=2.0)
+        assert summary['throughput_rps'] == 2.0
+        assert summary['error_rate'] == summary['rate_429'] == summary['rate_503'] == 0.25
+        assert check_slo(summary, p95_ms=100, p99_ms=None, max_error_rate=0.5) == ['p95 385 ms > 100 ms']
+        assert check_slo(summary, p95_ms=None, p99_ms=None, max_error_rate=0.5,
+                         max_shed_rate=0.1) == ['503 (shed) rate 25.00% > 10.00%']
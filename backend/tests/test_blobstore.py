@@ -0,0 +1,102 @@
+"""Tests for the content-addressed blob store"""
+
+import hashlib
+import io
+import os
+
+import pytest
+
+from ..core.artifacts import ArtifactStore
+from ..core.blobstore import BlobStore
+from ..core.janitor import StorageArea, StorageJanitor
+
+
+class _Unreadable(io.BytesIO):
+    def read(self, size=-1):
+        raise AssertionError('stream should not be read')
+
+
+class TestBlobStore:
+    """Test storage, deduplication, references and collection"""
+
+    def setup_method(self):
+        self.data = b'conteudo de teste ' * 1000
+        self.digest = hashlib.sha256(self.data).hexdigest()
+
+    def test_sharded_path_is_a_computation(self, tmp_path):
+        store = BlobStore(tmp_path)
+        assert store.path_for(self.digest) == tmp_path / self.digest[:2] / self.digest[2:4] / self.digest
+        assert store.lookup(self.digest) is None
+        with pytest.raises(ValueError):
+            store.path_for('../../etc/passwd')
+
+    def test_put_stream_and_dedupe(self, tmp_path):
+        store = BlobStore(tmp_path)
+        digest, path = store.put_stream(io.BytesIO(self.data))
+        assert digest == self.digest
+        assert path.read_bytes() == self.data
+        assert not path.stat().st_mode & 0o222  # read-only
+
+        # Known digest of a stored blob: the stream is not even read
+        assert store.put_stream(_Unreadable(), self.digest) == (digest, path)
+        assert store.put_stream(io.BytesIO(self.data))[1] == path
+        stats = store.stats()
+        assert stats['dedup_hits'] == 2
+        assert stats['bytes_written'] == len(self.data)
+        assert list((tmp_path / 'tmp').iterdir()) == []
+
+    def test_put_file_adopts_by_link(self, tmp_path):
+        store = BlobStore(tmp_path / 'blobs')
+        source = tmp_path / 'upload.bin'
+        source.write_bytes(self.data)
+
+        digest, path = store.put_file(source)
+        assert digest == self.digest
+        assert os.path.samefile(source, path)
+        assert store.refcount(digest) == 1
+
+    def test_links_are_references(self, tmp_path):
+        store = BlobStore(tmp_path / 'blobs')
+        digest, _ = store.put_stream(io.BytesIO(self.data))
+        first = store.link(digest, tmp_path / 'relatorio.txt')
+        second = store.link(digest, tmp_path / 'copia.txt')
+        assert first.read_bytes() == self.data
+        assert store.refcount(digest) == 2
+
+        first.unlink()
+        second.unlink()
+        assert store.refcount(digest) == 0
+        with pytest.raises(FileNotFoundError):
+            store.link('0' * 64, tmp_path / 'nada.txt')
+
+    def test_collect_removes_only_unreferenced(self, tmp_path):
+        store = BlobStore(tmp_path / 'blobs')
+        kept, _ = store.put_stream(io.BytesIO(b'kept'))
+        store.link(kept, tmp_path / 'kept.txt')
+        dropped, _ = store.put_stream(io.BytesIO(b'dropped'))
+
+        assert store.collect(grace=60) == (0, 0)  # just written: within grace
+        assert store.collect(grace=-1) == (1, len(b'dropped'))
+        assert store.lookup(dropped) is None
+        assert store.lookup(kept) is not None
+
+    def test_janitor_runs_collection_on_rescan(self, tmp_path):
+        store = BlobStore(tmp_path / 'blobs')
+        digest, _ = store.put_stream(io.BytesIO(self.data))
+        janitor = StorageJanitor([StorageArea('temp', tmp_path / 'temp')])
+        janitor.add_task(lambda: store.collect(grace=-1))
+
+        janitor.run_once()
+        assert store.lookup(digest) is None
+
+    def test_identical_artifacts_share_one_blob(self, tmp_path):
+        blobs = BlobStore(tmp_path / 'blobs')
+        artifacts = ArtifactStore(tmp_path / 'artifacts', blobs=blobs)
+        for name in ('a.txt', 'b.txt'):
+            (tmp_path / name).write_bytes(self.data)
+
+        first = artifacts.store(tmp_path / 'a.txt', 'a.txt')
+        second = artifacts.store(tmp_path / 'b.txt', 'b.txt')
+        assert first.etag == second.etag == self.digest
+        assert os.path.samefile(first.path, second.path)
+        assert os.path.samefile(first.path, blobs.path_for(self.digest))
@@ -0,0 +1,77 @@
+"""Tests for the SQLite-indexed file cache"""
+
+import time
+
+from ..core.cache import FileCache
+
+
+def _index_keys(cache):
+    return {row[0] for row in cache._db.execute('SELECT key FROM entries')}
+
+
+class TestFileCache:
+    """Test the file cache and its index"""
+
+    def test_roundtrip_and_delete(self, tmp_path):
+        cache = FileCache(tmp_path)
+        assert cache.set('key', {'value': 1})
+        assert cache.get('key') == {'value': 1}
+        assert cache.delete('key')
+        assert cache.get('key') is None
+        assert not (tmp_path / 'key.cache').exists()
+
+    def test_expired_entry_is_a_miss(self, tmp_path):
+        cache = FileCache(tmp_path, max_age=0)
+        cache.set('key', 'value')
+        assert cache.get('key') is None
+        assert cache.stats()['expired'] == 1
+        assert not (tmp_path / 'key.cache').exists()
+
+    def test_cleanup_removes_only_expired(self, tmp_path):
+        cache = FileCache(tmp_path, max_age=3600)
+        cache.set('fresh', 1)
+        cache.set('stale', 2)
+        with cache._db:
+            cache._db.execute('UPDATE entries SET expires = ? WHERE key = ?', (time.time() - 1, 'stale'))
+
+        assert cache.cleanup_expired() == 1
+        assert _index_keys(cache) == {'fresh'}
+        assert not (tmp_path / 'stale.cache').exists()
+        assert (tmp_path / 'fresh.cache').exists()
+
+    def test_file_removed_behind_index_is_dropped(self, tmp_path):
+        cache = FileCache(tmp_path)
+        cache.set('key', 'value')
+        (tmp_path / 'key.cache').unlink()
+        assert cache.get('key') is None
+        assert _index_keys(cache) == set()
+
+    def test_index_rebuilt_from_directory(self, tmp_path):
+        cache = FileCache(tmp_path)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.close()
+        for path in tmp_path.glob(FileCache.INDEX_NAME + '*'):
+            path.unlink()
+
+        reopened = FileCache(tmp_path)
+        assert _index_keys(reopened) == {'a', 'b'}
+        assert reopened.get('b') == 2
+
+    def test_corrupt_index_rebuilt(self, tmp_path):
+        cache = FileCache(tmp_path)
+        cache.set('a', 1)
+        cache.close()
+        for path in tmp_path.glob(FileCache.INDEX_NAME + '-*'):
+            path.unlink()
+        (tmp_path / FileCache.INDEX_NAME).write_bytes(b'not a database' * 100)
+
+        reopened = FileCache(tmp_path)
+        assert reopened.get('a') == 1
+
+    def test_clear(self, tmp_path):
+        cache = FileCache(tmp_path)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.clear() == 2
+        assert list(tmp_path.glob('*.cache')) == []
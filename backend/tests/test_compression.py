@@ -0,0 +1,58 @@
+"""Tests for text output compression"""
+
+import gzip
+import zlib
+
+import pytest
+
+from ..core.compression import VariantStore, available_encodings, compress_chunks, is_compressible
+
+
+class TestCompression:
+    """Test incremental compression and cached variants"""
+
+    def test_gzip_chunks_roundtrip(self):
+        chunks = [b'<p>linha %d</p>\n' % i for i in range(5000)]
+        compressed = b''.join(compress_chunks(iter(chunks), 'gzip'))
+        assert gzip.decompress(compressed) == b''.join(chunks)
+        assert len(compressed) < len(b''.join(chunks)) / 5
+
+    def test_unavailable_encoding_rejected(self):
+        with pytest.raises(ValueError):
+            list(compress_chunks([b'x'], 'lzma'))
+
+    def test_gzip_always_available(self):
+        assert available_encodings()[-1] == 'gzip'
+
+    def test_variant_streamed_while_written(self, tmp_path):
+        content = tmp_path / 'content'
+        content.write_bytes(b'texto ' * 10000)
+        store = VariantStore(tmp_path / 'variants')
+        digest = 'ab' * 32
+        assert store.lookup(digest, 'gzip') is None
+
+        streamed = b''.join(store.stream(content, digest, 'gzip'))
+        assert zlib.decompress(streamed, 16 + zlib.MAX_WBITS) == content.read_bytes()
+        variant = store.lookup(digest, 'gzip')
+        assert variant.name == digest + '.gz'
+        assert variant.read_bytes() == streamed
+        assert store.stats()['builds'] == 1
+
+    def test_abandoned_stream_leaves_no_variant(self, tmp_path):
+        content = tmp_path / 'content'
+        content.write_bytes(b'texto ' * 100000)
+        store = VariantStore(tmp_path / 'variants')
+        digest = 'cd' * 32
+
+        chunks = store.stream(content, digest, 'gzip')
+        next(chunks)
+        chunks.close()  # client went away
+        assert store.lookup(digest, 'gzip') is None
+        assert list((tmp_path / 'variants').iterdir()) == []
+        assert store.stats()['builds_aborted'] == 1
+
+    def test_text_outputs_only(self):
+        assert is_compressible('relatorio_convertido.html')
+        assert is_compressible('notas.MD')
+        assert not is_compressible('relatorio_convertido.pdf')
+        assert not is_compressible('relatorio_convertido.docx')
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Container structure inspection tests
+"""
+
+import io
+import zipfile
+
+from werkzeug.datastructures import FileStorage
+
+from ..core import container_inspection
+from ..core.container_inspection import ContainerBudget, ContainerInspector
+from ..core.security import FileSecurityValidator
+
+
+def _zip(entries, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as arquivo:
+        for nome, dados in entries:
+            arquivo.writestr(nome, dados)
+    buffer.seek(0)
+    return buffer
+
+
+def _pdf(objetos, trailer=True):
+    corpo = b'%PDF-1.4\n' + b''.join(b'%d 0 obj\n<< >>\nendobj\n' % n for n in range(1, objetos + 1))
+    if trailer:
+        corpo += b'xref\n0 %d\ntrailer\n<< /Size %d >>\nstartxref\n9\n%%%%EOF\n' % (objetos + 1, objetos + 1)
+    return io.BytesIO(corpo)
+
+
+class TestZipInspection:
+    """Test ZIP central directory checks"""
+
+    def setup_method(self):
+        self.inspector = ContainerInspector()
+
+    def test_normal_document(self):
+        """Test an ordinary DOCX-like archive is within budget"""
+        relatorio = self.inspector.inspect(_zip([('word/document.xml', b'<w:p/>' * 1000)]), '.docx')
+        assert relatorio.within_budget
+        assert relatorio.stats['entries'] == 1
+        assert relatorio.stats['uncompressed_bytes'] == 6000
+
+    def test_compression_bomb(self):
+        """Test highly compressed large entries are rejected without decompressing"""
+        relatorio = self.inspector.inspect(_zip([('word/document.xml', b'\0' * (8 * 1024 * 1024))]), '.docx')
+        assert not relatorio.within_budget
+        assert 'compression ratio' in relatorio.violations[0]
+
+    def test_entry_count_and_total(self):
+        """Test entry count and uncompressed total budgets"""
+        inspector = ContainerInspector(ContainerBudget(max_zip_entries=10, max_zip_uncompressed_bytes=100))
+        assert 'entries' in inspector.inspect(_zip([(f'f{n}', b'') for n in range(11)]), '.docx').violations[0]
+        assert 'uncompressed' in inspector.inspect(_zip([('a', b'x' * 101)]), '.docx').violations[0]
+
+    def test_malformed_and_stream_position(self):
+        """Test non-ZIP data is reported and the stream position is kept"""
+        stream = io.BytesIO(b'not a zip at all')
+        stream.seek(3)
+        relatorio = self.inspector.inspect(stream, '.docx')
+        assert relatorio.violations == ['malformed zip: end of central directory not found']
+        assert stream.tell() == 3
+
+
+class TestPdfInspection:
+    """Test PDF object counts"""
+
+    def test_trailer_size(self):
+        """Test the object count comes from the trailer"""
+        relatorio = ContainerInspector(ContainerBudget(max_pdf_objects=10)).inspect(_pdf(20), '.pdf')
+        assert relatorio.stats['objects'] == 21
+        assert not relatorio.within_budget
+
+    def test_scan_without_trailer(self, monkeypatch):
+        """Test object headers are counted across chunk boundaries when there is no trailer"""
+        monkeypatch.setattr(container_inspection, '_PDF_SCAN_CHUNK', 100)
+        relatorio = ContainerInspector().inspect(_pdf(500, trailer=False), '.pdf')
+        assert relatorio.stats['objects'] == 500
+        assert relatorio.within_budget
+
+    def test_other_formats_skipped(self):
+        """Test formats that are not containers are not inspected"""
+        assert ContainerInspector().inspect(io.BytesIO(b'texto'), '.txt') is None
+
+
+def test_upload_validation_rejects_bomb():
+    """Test validate_upload applies the structure budget"""
+    arquivo = FileStorage(stream=_zip([('word/document.xml', b'\0' * (8 * 1024 * 1024))]), filename='bomba.docx')
+    resultado = FileSecurityValidator().validate_upload(arquivo)
+    assert not resultado.is_valid
+    assert resultado.details['container'] == 'zip'
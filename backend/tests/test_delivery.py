@@ -0,0 +1,132 @@
+"""Tests for artifact delivery (send_file and X-Accel-Redirect)"""
+
+import gzip
+
+from flask import Flask
+from werkzeug.test import Client
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Response
+
+from ..core.artifacts import ArtifactStore
+from ..core.compression import VariantStore
+from ..core.delivery import send_artifact
+
+PREFIX = '/_protected/artifacts'
+
+
+class StubNginx:
+    """
+    Stand-in for the internal nginx location in docker/nginx.conf: follows
+    X-Accel-Redirect under PREFIX by serving the file from the artifacts
+    directory, keeping the app's ETag.
+    """
+
+    def __init__(self, app, directory):
+        self.app = app
+        self.directory = directory
+        self.redirects = []
+
+    def __call__(self, environ, start_response):
+        response = Response.from_app(self.app, environ)
+        target = response.headers.get('X-Accel-Redirect')
+        if target is None:
+            return response(environ, start_response)
+
+        self.redirects.append(target)
+        assert target.startswith(PREFIX + '/')
+        path = self.directory / target[len(PREFIX) + 1:]
+        etag, _ = response.get_etag()
+        served = send_file(str(path), environ, mimetype=response.mimetype, etag=etag)
+        for header in ('Content-Disposition', 'Content-Encoding', 'Vary'):
+            if header in response.headers:
+                served.headers[header] = response.headers[header]
+        return served(environ, start_response)
+
+
+class TestDelivery:
+    """Test both delivery modes against the same artifact"""
+
+    def setup_method(self):
+        self.body = b'<html>' + b'x' * 5000 + b'</html>'
+
+    def _client(self, tmp_path, mode, encodings=()):
+        source = tmp_path / 'out.html'
+        source.write_bytes(self.body)
+        directory = tmp_path / 'artifacts'
+        store = ArtifactStore(directory)
+        self.variants = VariantStore(directory / 'variants')
+        self.artifact = store.store(source, 'relatorio_convertido.html')
+
+        app = Flask(__name__)
+
+        @app.route('/download/<artifact_id>')
+        def download(artifact_id):
+            return send_artifact(store.get(artifact_id), mode, PREFIX, encodings=encodings,
+                                 variants=self.variants)
+
+        self.nginx = StubNginx(app.wsgi_app, directory)
+        return Client(self.nginx)
+
+    def test_x_accel_hands_off_to_nginx(self, tmp_path):
+        client = self._client(tmp_path, 'x-accel')
+        response = client.get(f'/download/{self.artifact.id}')
+        assert response.status_code == 200
+        assert response.get_data() == self.body
+        assert self.nginx.redirects == [f'{PREFIX}/{self.artifact.id}/content']
+        assert response.headers['ETag'] == f'"{self.artifact.etag}"'
+        assert 'relatorio_convertido.html' in response.headers['Content-Disposition']
+
+    def test_x_accel_not_modified_skips_redirect(self, tmp_path):
+        client = self._client(tmp_path, 'x-accel')
+        response = client.get(f'/download/{self.artifact.id}',
+                              headers={'If-None-Match': f'"{self.artifact.etag}"'})
+        assert response.status_code == 304
+        assert self.nginx.redirects == []
+
+    def test_x_accel_range_served_by_nginx(self, tmp_path):
+        client = self._client(tmp_path, 'x-accel')
+        response = client.get(f'/download/{self.artifact.id}', headers={'Range': 'bytes=0-5'})
+        assert response.status_code == 206
+        assert response.get_data() == b'<html>'
+
+    def test_send_file_mode(self, tmp_path):
+        client = self._client(tmp_path, 'send_file')
+        response = client.get(f'/download/{self.artifact.id}', headers={'Range': 'bytes=0-5'})
+        assert response.status_code == 206
+        assert response.get_data() == b'<html>'
+        assert self.nginx.redirects == []
+
+    def test_gzip_variant_negotiated(self, tmp_path):
+        client = self._client(tmp_path, 'send_file', encodings=('br', 'gzip'))
+        response = client.get(f'/download/{self.artifact.id}', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'] == f'"{self.artifact.etag}-gzip"'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.get_data()) == self.body
+        assert self.variants.lookup(self.artifact.sha256, 'gzip') is not None
+
+        identity = client.get(f'/download/{self.artifact.id}')
+        assert 'Content-Encoding' not in identity.headers
+        assert identity.get_data() == self.body
+
+    def test_x_accel_streams_then_redirects_to_variant(self, tmp_path):
+        client = self._client(tmp_path, 'x-accel', encodings=('gzip',))
+        # First download: compressed on the fly by the worker, no redirect
+        first = client.get(f'/download/{self.artifact.id}', headers={'Accept-Encoding': 'gzip, br'})
+        assert self.nginx.redirects == []
+        assert first.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(first.get_data()) == self.body
+
+        response = client.get(f'/download/{self.artifact.id}', headers={'Accept-Encoding': 'gzip, br'})
+        assert self.nginx.redirects == [f'{PREFIX}/variants/{self.artifact.sha256}.gz']
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.get_data()) == self.body
+
+    def test_variant_shared_by_same_content(self, tmp_path):
+        client = self._client(tmp_path, 'send_file', encodings=('gzip',))
+        again = ArtifactStore(tmp_path / 'artifacts').store(self.artifact.path, 'copia.html',
+                                                           sha256=self.artifact.sha256)
+        for artifact in (self.artifact, again):
+            response = client.get(f'/download/{artifact.id}', headers={'Accept-Encoding': 'gzip'})
+            assert gzip.decompress(response.get_data()) == self.body
+        assert self.variants.stats()['builds'] == 1
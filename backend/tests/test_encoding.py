@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Encoding detection tests
+"""
+
+import codecs
+
+from ..core.encoding import TextChunkReader, decode_bytes, read_text
+
+
+class TestDecodeBytes:
+    """Test the decoding fallback chain"""
+
+    def test_utf8(self):
+        """Test plain UTF-8 is decoded as-is"""
+        result = decode_bytes('Introdução'.encode('utf-8'))
+        assert result.text == 'Introdução'
+        assert result.encoding == 'utf-8'
+        assert not result.mixed
+
+    def test_cp1252_fallback(self):
+        """Test legacy Windows text falls back to cp1252"""
+        result = decode_bytes('“Citação” – página'.encode('cp1252'))
+        assert result.text == '“Citação” – página'
+        assert result.encoding == 'cp1252'
+
+    def test_bom_wins(self):
+        """Test byte order marks select the encoding and are stripped"""
+        result = decode_bytes(codecs.BOM_UTF16_LE + 'Resumo'.encode('utf-16-le'))
+        assert result.text == 'Resumo'
+        assert result.encoding == 'utf-16-le'
+        assert result.bom
+
+    def test_mixed_utf8_and_cp1252(self):
+        """Test stray cp1252 bytes inside UTF-8 text are recovered"""
+        data = 'Conclusão: '.encode('utf-8') + b'caf\xe9 \x93ok\x94'
+        result = decode_bytes(data)
+        assert result.text == 'Conclusão: café “ok”'
+        assert result.encoding == 'utf-8'
+        assert result.mixed
+
+    def test_html_meta_charset(self):
+        """Test <meta charset> is honoured for HTML only"""
+        data = b'<html><head><meta charset="iso-8859-1"></head><p>caf\xe9</p></html>'
+        result = decode_bytes(data, html=True)
+        assert result.declared == 'cp1252'
+        assert 'café' in result.text
+
+
+def test_read_text_memory_mapped(tmp_path):
+    """Test large files go through mmap and decode identically"""
+    path = tmp_path / 'grande.txt'
+    content = 'Seção ' * 50000
+    path.write_bytes(content.encode('cp1252'))
+
+    result = read_text(path, mmap_threshold=1024)
+    assert result.text == content
+    assert result.encoding == 'cp1252'
+
+
+def test_read_text_empty_file(tmp_path):
+    """Test empty files decode to an empty string"""
+    path = tmp_path / 'vazio.txt'
+    path.write_bytes(b'')
+    assert read_text(path).text == ''
+
+
+class TestTextChunkReader:
+    """Test chunked decoding of memory-mapped files"""
+
+    def test_chunks_are_line_aligned_and_complete(self, tmp_path):
+        """Test chunks end on line boundaries and rebuild the full text"""
+        path = tmp_path / 'linhas.txt'
+        content = ''.join(f'Linha {i} com acentuação\n' for i in range(2000))
+        path.write_text(content, encoding='utf-8')
+
+        reader = TextChunkReader(path, chunk_size=1000)
+        chunks = list(reader)
+
+        assert len(chunks) > 1
+        assert all(chunk.endswith('\n') for chunk in chunks)
+        assert ''.join(chunks) == content
+        assert reader.encoding == 'utf-8'
+
+    def test_matches_whole_file_decoding(self, tmp_path):
+        """Test chunked decoding agrees with read_text on mixed input"""
+        path = tmp_path / 'misto.txt'
+        path.write_bytes(('Seção\n' * 500).encode('utf-8') + b'caf\xe9\n' * 500)
+
+        reader = TextChunkReader(path, chunk_size=333)
+        assert ''.join(reader) == read_text(path).text
+        assert reader.mixed
+
+    def test_cp1252_only(self, tmp_path):
+        """Test a pure cp1252 file is reported as such"""
+        path = tmp_path / 'legado.txt'
+        path.write_bytes('Conclusão “final”\n'.encode('cp1252') * 100)
+
+        reader = TextChunkReader(path, chunk_size=64)
+        assert ''.join(reader) == 'Conclusão “final”\n' * 100
+        assert reader.encoding == 'cp1252'
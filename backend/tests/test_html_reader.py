@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming HTML reader tests
+"""
+
+import pytest
+
+from ..core import html_reader
+from ..core.html_reader import iter_html_blocks, read_html_blocks
+
+
+BACKENDS = [
+    pytest.param(True, id='lxml', marks=pytest.mark.skipif(html_reader.etree is None, reason='lxml not installed')),
+    pytest.param(False, id='html.parser'),
+]
+
+
+@pytest.mark.parametrize('use_lxml', BACKENDS)
+class TestIterHtmlBlocks:
+    """Test block extraction on both parser backends"""
+
+    def test_nested_divs_emitted_once_in_order(self, use_lxml):
+        """Test nested blocks are not duplicated by their ancestors"""
+        html = '<div>Intro<div>Inner<p>Deep</p>tail</div>Outro</div>'
+        blocks = list(iter_html_blocks([html], use_lxml=use_lxml))
+        assert blocks == ['Intro', 'Inner', 'Deep', 'tail', 'Outro']
+
+    def test_script_and_style_skipped(self, use_lxml):
+        """Test script/style subtrees never reach the output"""
+        html = (
+            '<html><head><title>T</title><style>p { color: red }</style></head>'
+            '<body><p>Text</p><script>var secret = 1;</script></body></html>'
+        )
+        assert list(iter_html_blocks([html], use_lxml=use_lxml)) == ['Text']
+
+    def test_chunk_boundaries_do_not_matter(self, use_lxml):
+        """Test output is independent of how input is split"""
+        html = '<h1>Título</h1><p>Parágrafo &amp; mais <b>texto</b></p><ul><li>a</li><li>b<br>c</li></ul>'
+        whole = list(iter_html_blocks([html], use_lxml=use_lxml))
+        pieces = list(iter_html_blocks([html[i:i + 7] for i in range(0, len(html), 7)], use_lxml=use_lxml))
+        assert whole == pieces == ['Título', 'Parágrafo & mais texto', 'a', 'b', 'c']
+
+    def test_preformatted_keeps_lines(self, use_lxml):
+        """Test line breaks inside <pre> are preserved"""
+        html = '<pre>linha 1\n  linha 2</pre>'
+        assert list(iter_html_blocks([html], use_lxml=use_lxml)) == ['linha 1', '  linha 2']
+
+    def test_empty_input(self, use_lxml):
+        """Test empty input yields nothing"""
+        assert list(iter_html_blocks([], use_lxml=use_lxml)) == []
+
+
+def test_read_html_blocks_from_file(tmp_path):
+    """Test reading blocks straight from disk"""
+    path = tmp_path / 'page.html'
+    path.write_text('<body>' + '<div><p>item</p></div>' * 1000 + '</body>', encoding='utf-8')
+
+    blocks = list(read_html_blocks(path, chunk_size=100))
+    assert blocks == ['item'] * 1000
@@ -0,0 +1,114 @@
+"""Tests for the storage janitor"""
+
+import os
+import time
+
+from ..core.cache import FileCache
+from ..core.janitor import StorageArea, StorageJanitor
+from ..core.workspace import Workspace
+
+
+def _write(path, size, age=0.0):
+    path.write_bytes(b'x' * size)
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+class TestStorageJanitor:
+    """Test age and quota enforcement"""
+
+    def test_expires_entries_older_than_max_age(self, tmp_path):
+        old = _write(tmp_path / 'old.bin', 100, age=7200)
+        new = _write(tmp_path / 'new.bin', 100)
+        janitor = StorageJanitor([StorageArea('temp', tmp_path, max_age=3600)])
+
+        assert janitor.run_once() == 100
+        assert not old.exists()
+        assert new.exists()
+        stats = janitor.stats()['temp']
+        assert stats['removed_total'] == 1
+        assert stats['reclaimed_bytes_total'] == 100
+        assert stats['entries'] == 1
+
+    def test_evicts_oldest_over_quota_respecting_grace(self, tmp_path):
+        oldest = _write(tmp_path / 'a.bin', 400, age=3000)
+        older = _write(tmp_path / 'b.bin', 400, age=2000)
+        fresh = _write(tmp_path / 'c.bin', 400, age=10)
+        janitor = StorageJanitor([StorageArea('cache', tmp_path, max_bytes=500)], grace=60)
+
+        janitor.run_once()
+        assert not oldest.exists()
+        assert not older.exists()
+        # Still over quota, but too young to evict
+        assert fresh.exists()
+        assert janitor.stats()['cache']['bytes'] == 400
+
+    def test_tracked_entries_are_reaped_without_rescan(self, tmp_path):
+        janitor = StorageJanitor([StorageArea('uploads', tmp_path, max_age=60)], rescan_interval=3600)
+        janitor.run_once()
+
+        workspace = Workspace(tmp_path, janitor=janitor).open()
+        workspace.file('in.txt').write_bytes(b'abc')
+        stamp = time.time() - 120
+        os.utime(workspace.path, (stamp, stamp))
+        janitor.track(workspace.path, created=stamp)
+
+        assert janitor.run_once() == 3
+        assert not workspace.path.exists()
+
+    def test_recently_modified_entries_survive(self, tmp_path):
+        """Test activity seen in the mtime (e.g. from another process) defers removal"""
+        janitor = StorageJanitor([StorageArea('temp', tmp_path, max_age=60, max_bytes=10)], grace=30)
+        busy = tmp_path / 'upload-busy'
+        busy.mkdir()
+        _write(busy / 'data', 100)
+        janitor.track(busy, size=100, created=time.time() - 120)
+
+        assert janitor.run_once() == 0
+        assert busy.exists()
+
+        stamp = time.time() - 120
+        os.utime(busy, (stamp, stamp))
+        janitor.track(busy, size=100, created=stamp)
+        assert janitor.run_once() == 100
+        assert not busy.exists()
+
+    def test_workspace_close_forgets_entry(self, tmp_path):
+        janitor = StorageJanitor([StorageArea('uploads', tmp_path)])
+        with Workspace(tmp_path, janitor=janitor):
+            assert janitor.stats()['uploads']['entries'] == 1
+        assert janitor.stats()['uploads']['entries'] == 0
+
+    def test_file_cache_tracks_sizes(self, tmp_path):
+        janitor = StorageJanitor([StorageArea('cache', tmp_path)])
+        cache = FileCache(tmp_path, janitor=janitor)
+        cache.set('key', 'value')
+        assert janitor.stats()['cache']['entries'] == 1
+        cache.delete('key')
+        assert janitor.stats()['cache']['entries'] == 0
+
+    def test_nested_area_is_not_reaped(self, tmp_path):
+        uploads = tmp_path / 'uploads'
+        uploads.mkdir()
+        stamp = time.time() - 7200
+        os.utime(uploads, (stamp, stamp))
+        janitor = StorageJanitor([
+            StorageArea('temp', tmp_path, max_age=60),
+            StorageArea('uploads', uploads, max_age=60),
+        ])
+        janitor.run_once()
+        assert uploads.exists()
+
+    def test_background_thread(self, tmp_path):
+        old = _write(tmp_path / 'old.bin', 10, age=7200)
+        janitor = StorageJanitor([StorageArea('temp', tmp_path, max_age=60)], interval=0.05)
+        janitor.ensure_started()
+        try:
+            deadline = time.time() + 5
+            while old.exists() and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            janitor.stop()
+        assert not old.exists()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Logging pipeline tests
+"""
+
+import json
+import logging
+import time
+
+import pytest
+
+from ..core.logging_config import (
+    BatchedRotatingFileHandler, BoundedQueueHandler, JSONFormatter, SecurityFilter,
+    get_logging_stats, setup_logging, stop_logging
+)
+
+
+def _logger(nome, handler):
+    logger = logging.getLogger(nome)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+class TestBoundedQueueHandler:
+    """Test the bounded queue in front of the log handlers"""
+
+    def test_drop_policy_counts(self):
+        """Test records beyond capacity are dropped and counted, not raised"""
+        handler = BoundedQueueHandler(maxsize=2, policy='drop')
+        logger = _logger('teste.fila.drop', handler)
+        for numero in range(5):
+            logger.info('registro %d', numero)
+        assert handler.stats() == {'enqueued': 2, 'dropped': 3, 'queue_depth': 2, 'queue_capacity': 2}
+
+    def test_block_policy_times_out(self):
+        """Test 'block' waits for room, then drops"""
+        handler = BoundedQueueHandler(maxsize=1, policy='block', block_timeout=0.01)
+        logger = _logger('teste.fila.block', handler)
+        logger.info('primeiro')
+        logger.info('segundo')
+        assert handler.stats()['dropped'] == 1
+
+    def test_prepare_merges_args(self):
+        """Test arguments are rendered before the caller can mutate them"""
+        handler = BoundedQueueHandler(maxsize=1)
+        logger = _logger('teste.fila.args', handler)
+        valores = [1]
+        logger.info('valores %s', valores)
+        valores.append(2)
+        assert handler.queue.get_nowait().getMessage() == 'valores [1]'
+
+    def test_unknown_policy(self):
+        """Test an unknown policy is rejected"""
+        with pytest.raises(ValueError):
+            BoundedQueueHandler(policy='wait')
+
+
+def test_setup_logging_writes_in_background(tmp_path):
+    """Test records reach the files through the listener, tracebacks included"""
+    logger = setup_logging(log_dir=tmp_path, app_name='teste_async', enable_console=False)
+    assert isinstance(logger.handlers[0], BoundedQueueHandler)
+    try:
+        raise RuntimeError('falha de teste')
+    except RuntimeError:
+        logger.exception('conversão falhou')
+    assert get_logging_stats()['teste_async']['dropped'] == 0
+    stop_logging()
+
+    erros = (tmp_path / 'teste_async_error.log').read_text()
+    assert 'conversão falhou' in erros
+    assert 'RuntimeError: falha de teste' in erros
+    logger.handlers.clear()
+
+
+class TestSecurityFilter:
+    """Test redaction of sensitive log messages"""
+
+    def _record(self, msg, *args):
+        return logging.LogRecord('teste', logging.INFO, __file__, 1, msg, args, None)
+
+    def test_whole_message_redaction(self):
+        """Test the default replaces any message mentioning a pattern"""
+        record = self._record('Login com TOKEN %s', 'abc')
+        SecurityFilter().filter(record)
+        assert record.getMessage() == SecurityFilter.REDACTED_MESSAGE
+
+    def test_clean_message_untouched(self):
+        """Test ordinary messages keep their arguments"""
+        record = self._record('Conversão %s -> %s', 'a.docx', 'pdf')
+        SecurityFilter().filter(record)
+        assert record.args == ('a.docx', 'pdf')
+
+    def test_span_redaction(self):
+        """Test only assigned values are redacted"""
+        filtro = SecurityFilter(redact_span=True)
+        assert filtro.redact('user=ana token=abc123 ok') == 'user=ana token=[REDACTED] ok'
+        assert filtro.redact('Authorization: Bearer xyz') == 'Authorization: [REDACTED]'
+        assert filtro.redact('{"api_key": "a b", "n": 1}') == '{"api_key": [REDACTED], "n": 1}'
+        assert filtro.redact('Invalid token provided') is None
+
+    def test_runs_once_per_record(self):
+        """Test a record shared by several handlers is scanned only once"""
+        filtro = SecurityFilter(redact_span=True)
+        chamadas = []
+        original = filtro.redact
+        filtro.redact = lambda mensagem: chamadas.append(mensagem) or original(mensagem)
+        record = self._record('password=%s', 'hunter2')
+        for _ in range(3):
+            filtro.filter(record)
+        assert len(chamadas) == 1
+        assert record.getMessage() == 'password=[REDACTED]'
+
+
+class TestJSONFormatter:
+    """Test structured log lines"""
+
+    def test_fields(self):
+        """Test static fields, extras and values the encoder doesn't know"""
+        record = logging.LogRecord('conversor.requests', logging.INFO, __file__, 7, 'Request %s', ('ok',), None)
+        record.request_id = 'abc'
+        record.formatos = {'pdf'}
+        entrada = json.loads(JSONFormatter('conversor').format(record))
+        assert entrada['message'] == 'Request ok'
+        assert entrada['app'] == 'conversor'
+        assert entrada['pid'] == record.process
+        assert entrada['request_id'] == 'abc'
+        assert entrada['formatos'] == "{'pdf'}"
+        assert 'msg' not in entrada and 'args' not in entrada
+        assert entrada['timestamp'].startswith(time.strftime('%Y-%m-%dT', time.localtime(record.created)))
+
+    def test_custom_encoder(self):
+        """Test the encoder is pluggable"""
+        record = logging.LogRecord('teste', logging.INFO, __file__, 1, 'oi', (), None)
+        formatter = JSONFormatter(encoder=lambda entrada: 'custom:' + entrada['message'])
+        assert formatter.format(record) == 'custom:oi'
+
+
+class TestBatchedRotatingFileHandler:
+    """Test batched log file writes"""
+
+    def _logger(self, handler):
+        handler.setFormatter(JSONFormatter())
+        return _logger('teste.lote', handler)
+
+    def test_flushes_on_size(self, tmp_path):
+        """Test nothing is written until the batch fills"""
+        caminho = tmp_path / 'app.log'
+        handler = BatchedRotatingFileHandler(caminho, max_batch_bytes=400, flush_interval=60)
+        logger = self._logger(handler)
+        logger.info('primeiro')
+        assert caminho.read_text() == ''
+        for numero in range(5):
+            logger.info('registro %d', numero)
+        linhas = caminho.read_text().splitlines()
+        assert linhas and json.loads(linhas[0])['message'] == 'primeiro'
+        handler.close()
+        assert len(caminho.read_text().splitlines()) == 6
+
+    def test_flushes_on_time(self, tmp_path):
+        """Test a pending batch is written after the interval without new records"""
+        caminho = tmp_path / 'app.log'
+        handler = BatchedRotatingFileHandler(caminho, flush_interval=0.05)
+        self._logger(handler).info('sozinho')
+        time.sleep(0.3)
+        assert json.loads(caminho.read_text())['message'] == 'sozinho'
+        handler.close()
+
+    def test_rollover_per_batch(self, tmp_path):
+        """Test the size limit still rotates the file"""
+        caminho = tmp_path / 'app.log'
+        handler = BatchedRotatingFileHandler(caminho, max_bytes=300, backup_count=2, max_batch_bytes=1)
+        logger = self._logger(handler)
+        for numero in range(10):
+            logger.info('registro %d', numero)
+        handler.close()
+        assert (tmp_path / 'app.log.1').exists()
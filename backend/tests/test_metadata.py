@@ -0,0 +1,118 @@
+"""Tests for fast document metadata inspection"""
+
+import io
+import zipfile
+
+import pytest
+
+from ..core.converter import DocumentFormat
+from ..core.metadata import MetadataError, PDFDocument, inspect_document
+
+
+def _pdf(objects, trailer_extra=b'', xref_offset=None):
+    """A PDF with a classic cross-reference table; `objects` are bodies of objects 1..n"""
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    start = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root 1 0 R %s>>\n' % (len(objects) + 1, trailer_extra)
+    out += b'startxref\n%d\n%%%%EOF\n' % (start if xref_offset is None else xref_offset)
+    return bytes(out)
+
+
+_CATALOG = b'<< /Type /Catalog /Pages 2 0 R >>'
+_PAGES = b'<< /Type /Pages /Kids [3 0 R 4 0 R 5 0 R] /Count 3 >>'
+_PAGE = b'<< /Type /Page /Parent 2 0 R >>'
+
+
+def _docx(core=None, app=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('word/document.xml', '<w:document/>')
+        if core is not None:
+            archive.writestr('docProps/core.xml', core)
+        if app is not None:
+            archive.writestr('docProps/app.xml', app)
+    buffer.seek(0)
+    return buffer
+
+
+class TestPdfMetadata:
+    """Test trailer, Info dictionary and page tree reading"""
+
+    def test_info_and_page_count(self):
+        info = b'<< /Title (Relat\\363rio \\(final\\)) /Author <FEFF004A006F00E3006F> >>'
+        data = _pdf([_CATALOG, _PAGES, _PAGE, _PAGE, _PAGE, info], b'/Info 6 0 R ')
+        metadata = inspect_document(io.BytesIO(data), '.pdf')
+        assert metadata.format == DocumentFormat.PDF
+        assert metadata.page_count == 3
+        assert metadata.title == 'Relatório (final)'
+        assert metadata.author == 'João'
+
+    def test_indirect_strings_and_no_info(self):
+        info = b'<< /Title 7 0 R >>'
+        data = _pdf([_CATALOG, _PAGES, _PAGE, _PAGE, _PAGE, info, b'(Tese)'], b'/Info 6 0 R ')
+        assert inspect_document(io.BytesIO(data), '.pdf').title == 'Tese'
+
+        metadata = inspect_document(io.BytesIO(_pdf([_CATALOG, _PAGES, _PAGE, _PAGE, _PAGE])), '.pdf')
+        assert metadata.page_count == 3
+        assert metadata.title is None
+
+    def test_encrypted_strings_are_not_reported(self):
+        info = b'<< /Title (\\377\\001garbage) >>'
+        data = _pdf([_CATALOG, _PAGES, _PAGE, _PAGE, _PAGE, info], b'/Info 6 0 R /Encrypt 9 0 R ')
+        metadata = inspect_document(io.BytesIO(data), '.pdf')
+        assert metadata.page_count == 3
+        assert metadata.title is None
+
+    @pytest.mark.skipif(PDFDocument is None, reason='pdfminer not installed')
+    def test_broken_xref_falls_back_to_pdfminer(self):
+        data = _pdf([_CATALOG, _PAGES, _PAGE, _PAGE, _PAGE], xref_offset=3)
+        assert inspect_document(io.BytesIO(data), '.pdf').page_count == 3
+
+    def test_stream_position_is_restored(self, tmp_path):
+        stream = io.BytesIO(_pdf([_CATALOG, _PAGES, _PAGE, _PAGE, _PAGE]))
+        stream.seek(5)
+        inspect_document(stream, '.pdf')
+        assert stream.tell() == 5
+
+        path = tmp_path / 'doc.pdf'
+        path.write_bytes(stream.getvalue())
+        assert inspect_document(path, '.PDF').page_count == 3
+
+
+class TestOtherFormats:
+    """Test DOCX properties, HTML head and Markdown heading"""
+
+    def test_docx_properties(self):
+        core = ('<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/'
+                'core-properties" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+                '<dc:title>Plano anual</dc:title><dc:creator>Maria</dc:creator></cp:coreProperties>')
+        app = ('<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+               '<Pages>12</Pages><Words>3456</Words></Properties>')
+        metadata = inspect_document(_docx(core, app), '.docx')
+        assert (metadata.title, metadata.author, metadata.page_count, metadata.word_count) == \
+            ('Plano anual', 'Maria', 12, 3456)
+
+        assert inspect_document(_docx(), '.docx').page_count is None
+        with pytest.raises(MetadataError):
+            inspect_document(io.BytesIO(b'not a zip'), '.docx')
+
+    def test_html_title_and_author(self):
+        page = ('<html><head><meta charset="windows-1252"><meta content="Ana" name="Author">'
+                '<title>\n Caf\xe9 &amp; cia </title></head><body>' + 'x' * 100000 + '</body></html>')
+        metadata = inspect_document(io.BytesIO(page.encode('cp1252')), '.html')
+        assert metadata.title == 'Café & cia'
+        assert metadata.author == 'Ana'
+
+    def test_markdown_and_text(self):
+        metadata = inspect_document(io.BytesIO('texto solto\n\n## Capítulo 1 ##\n'.encode()), '.md')
+        assert metadata.title == 'Capítulo 1'
+        assert inspect_document(io.BytesIO(b'# nada'), '.txt').title is None
+        with pytest.raises(ValueError):
+            inspect_document(io.BytesIO(b''), '.exe')
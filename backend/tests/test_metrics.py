@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metrics tests
+"""
+
+import time
+
+import pytest
+
+from ..core.cache import FileCache
+from ..core.metrics import MetricsRegistry, StageTimer, stage_timer, timed_stage
+
+
+class TestMetricsRegistry:
+    """Test Prometheus text exposition"""
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        """Test counters render one sample per label set"""
+        counter = self.registry.counter('conversions_total', 'Conversions', ('status',))
+        counter.inc(status='ok')
+        counter.inc(2, status='ok')
+        counter.inc(status='error')
+
+        text = self.registry.render()
+        assert '# TYPE conversions_total counter' in text
+        assert 'conversions_total{status="ok"} 3' in text
+        assert 'conversions_total{status="error"} 1' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, sum and count"""
+        histogram = self.registry.histogram('stage_seconds', 'Stages', ('stage',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, stage='read')
+
+        text = self.registry.render()
+        assert 'stage_seconds_bucket{stage="read",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="read",le="1.0"} 2' in text
+        assert 'stage_seconds_bucket{stage="read",le="+Inf"} 3' in text
+        assert 'stage_seconds_count{stage="read"} 3' in text
+        assert histogram.snapshot(stage='read')['sum'] == pytest.approx(5.55)
+
+    def test_labels_must_match(self):
+        """Test observing with the wrong labels fails loudly"""
+        histogram = self.registry.histogram('stage_seconds', 'Stages', ('stage',))
+        with pytest.raises(ValueError):
+            histogram.observe(1.0, fase='read')
+
+    def test_stats_collectors(self):
+        """Test component stats are exported, flat and labelled"""
+        self.registry.register_stats('pool', lambda: {'jobs': 4, 'name': 'skip'})
+        self.registry.register_stats(
+            'admission', lambda: {'heavy': {'queue_depth': 2}}, label='format_class'
+        )
+
+        text = self.registry.render()
+        assert 'pool_jobs 4' in text
+        assert 'pool_name' not in text
+        assert 'admission_queue_depth{format_class="heavy"} 2' in text
+
+
+class TestStageTimer:
+    """Test per-stage timing"""
+
+    def test_nested_stages_report_self_time(self):
+        """Test time in a nested stage is not also charged to its parent"""
+        timer = StageTimer()
+        with timer.stage('read'):
+            with timer.stage('normalize'):
+                time.sleep(0.05)
+
+        assert timer.durations['normalize'] >= 0.05
+        assert timer.durations['read'] < 0.05
+
+    def test_timed_stage_uses_context_timer(self):
+        """Test timed_stage records on the bound timer and is a no-op otherwise"""
+        with timed_stage('orphan'):
+            pass
+
+        with stage_timer() as timer:
+            with timed_stage('classify'):
+                pass
+            with timed_stage('classify'):
+                pass
+
+        assert set(timer.durations) == {'classify'}
+
+    def test_record_merges_external_durations(self):
+        """Test durations measured in another process are accumulated"""
+        timer = StageTimer()
+        timer.update({'read': 0.5, 'write': 0.25})
+        timer.record('read', 0.5)
+        assert timer.durations == {'read': 1.0, 'write': 0.25}
+        assert timer.total == 1.25
+
+
+def test_file_cache_stats(tmp_path):
+    """Test FileCache counts hits and misses"""
+    cache = FileCache(tmp_path)
+    assert cache.get('missing') is None
+    cache.set('key', {'value': 1})
+    assert cache.get('key') == {'value': 1}
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['sets'] == 1
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversion profiler tests
+"""
+
+import pstats
+import time
+
+import pytest
+
+from ..core.profiling import ProfileResult, ProfileStore, profile_call, valid_request_id
+
+
+def _ocupado(segundos):
+    fim = time.perf_counter() + segundos
+    total = 0
+    while time.perf_counter() < fim:
+        total += 1
+    return total
+
+
+class TestProfileCall:
+    """Test running a call under the profiler"""
+
+    def test_sampling_captures_stacks(self):
+        """Test the sampler sees the busy function and returns its result"""
+        resultado, perfil = profile_call(_ocupado, 0.1, mode='sampling', interval=0.002)
+        assert resultado > 0
+        assert perfil.samples > 0
+        assert '_ocupado' in perfil.collapsed
+        assert perfil.pstats_data is None
+
+    def test_cprofile_output_loads(self, tmp_path):
+        """Test cProfile data is a valid pstats file"""
+        _, perfil = profile_call(_ocupado, 0.05, mode='cprofile')
+        caminho = tmp_path / 'perfil.pstats'
+        caminho.write_bytes(perfil.pstats_data)
+        estatisticas = pstats.Stats(str(caminho))
+        assert any(funcao[2] == '_ocupado' for funcao in estatisticas.stats)
+        assert '_ocupado' in perfil.report
+
+    def test_unknown_mode(self):
+        """Test an unknown mode is rejected before running"""
+        with pytest.raises(ValueError):
+            profile_call(_ocupado, 0, mode='perf')
+
+
+class TestProfileStore:
+    """Test stored profiles"""
+
+    def _perfil(self):
+        return ProfileResult('sampling', 0.1, 3, 'main;converter 3\n')
+
+    def test_request_ids(self):
+        """Test only file-name-safe request ids are accepted"""
+        assert valid_request_id('a1B2-c_3')
+        assert not valid_request_id('../app')
+        assert not valid_request_id('')
+
+    def test_save_and_download(self, tmp_path):
+        """Test files are listed by request id"""
+        armazem = ProfileStore(tmp_path)
+        info = armazem.save('req1', self._perfil(), details={'formato_destino': 'pdf'})
+        assert info.files == ['collapsed']
+        assert armazem.get('req1').details == {'formato_destino': 'pdf'}
+        assert armazem.file_path('req1', 'collapsed').read_text() == 'main;converter 3\n'
+        assert armazem.file_path('req1', 'pstats') is None
+        assert armazem.file_path('../req1', 'collapsed') is None
+
+    def test_prune_keeps_most_recent(self, tmp_path):
+        """Test only the newest max_profiles profiles survive"""
+        armazem = ProfileStore(tmp_path, max_profiles=2)
+        for numero in range(4):
+            armazem.save(f'req{numero}', self._perfil())
+            time.sleep(0.01)
+        assert [info.request_id for info in armazem.list()] == ['req3', 'req2']
+        assert not (tmp_path / 'req0.collapsed').exists()
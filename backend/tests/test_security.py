@@ -10,7 +10,7 @@ from pathlib import Path
 from werkzeug.datastructures import FileStorage
 from io import BytesIO
 
-from ..core.security import FileSecurityValidator, InputSanitizer, SecurityValidationResult
+from ..core.security import FileSecurityValidator, InputSanitizer, SecurityValidationResult, SignatureTrie
 
 
 class TestFileSecurityValidator:
@@ -72,6 +72,49 @@ class TestFileSecurityValidator:
         result = self.validator.validate_upload(file_storage)
         assert result.is_valid
     
+    def test_validate_upload_keeps_stream_position(self):
+        """Test validation reads the header in place and leaves the stream usable"""
+        file_storage = FileStorage(stream=BytesIO(b'%PDF-1.4\n' + b'x' * 20000), filename='test.pdf')
+        assert self.validator.validate_upload(file_storage).is_valid
+        assert file_storage.stream.tell() == 0
+        assert len(file_storage.read()) == 20009
+    
+    def test_dangerous_signature_in_file(self, tmp_path):
+        """Test a disguised executable is caught from the single header read"""
+        tmp_path = tmp_path / 'relatorio.txt'
+        tmp_path.write_bytes(b'\x7fELF\x02\x01\x01' + b'\x00' * 64)
+        result = self.validator.validate_file_content(tmp_path)
+        assert not result.is_valid
+        assert result.risk_level == "critical"
+        assert result.details == {"signature": "7f454c46"}
+    
+    def test_plans_from_config(self, tmp_path):
+        """Test per-deployment extensions and size caps are compiled into plans"""
+        validator = FileSecurityValidator(allowed_extensions={'txt', 'pdf'}, max_file_sizes={'txt': 10})
+        assert sorted(validator.plans) == ['.pdf', '.txt']
+        assert validator.plan_for('.txt').max_size == 10
+        assert validator.plan_for('.pdf').container == 'pdf'
+        assert not validator.validate_filename('a.docx').is_valid
+        
+        arquivo = tmp_path / 'grande.txt'
+        arquivo.write_text('x' * 11)
+        assert 'too large' in validator.validate_file_content(arquivo).message.lower()
+    
+    def test_required_signature(self):
+        """Test binary formats must start with their own magic bytes"""
+        file_storage = FileStorage(stream=BytesIO(b'texto qualquer'), filename='falso.docx')
+        result = self.validator.validate_upload(file_storage)
+        assert not result.is_valid
+        assert result.risk_level == "high"
+    
+    def test_signature_trie(self):
+        """Test prefix lookups over the signature set"""
+        trie = SignatureTrie([b'MZ', b'\xfe\xed\xfa', b'\xfe\xed\xfa\xce'])
+        assert trie.match(b'MZ\x90\x00') == b'MZ'
+        assert trie.match(b'\xfe\xed\xfa\xce\x00') == b'\xfe\xed\xfa'
+        assert trie.match(b'M') is None
+        assert trie.match(b'%PDF') is None
+    
     def test_sanitize_filename(self):
         """Test filename sanitization"""
         dangerous_name = "../../../etc/passwd<script>alert('xss')</script>"
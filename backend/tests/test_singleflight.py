@@ -0,0 +1,113 @@
+"""Tests for single-flight coalescing"""
+
+import threading
+import time
+
+import pytest
+
+from ..core.singleflight import SingleFlight
+
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def runner(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=runner, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestSingleFlight:
+    """Test leader/follower coalescing"""
+
+    def setup_method(self):
+        self.flights = SingleFlight()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def _work(self):
+        self.calls += 1
+        self.release.wait(5)
+        return 'result'
+
+    def _start_and_release(self, count, target):
+        # Lets every thread join before the leader finishes
+        timer = threading.Timer(0.2, self.release.set)
+        timer.start()
+        try:
+            return _run_concurrently(count, target)
+        finally:
+            timer.cancel()
+
+    def test_concurrent_duplicates_share_one_execution(self):
+        cleaned = []
+
+        def call():
+            flight = self.flights.do('key', self._work, timeout=5, cleanup=cleaned.append)
+            value = flight.value
+            flight.release()
+            return value
+
+        results, errors = self._start_and_release(8, call)
+        assert results == ['result'] * 8
+        assert errors == [None] * 8
+        assert self.calls == 1
+        assert cleaned == ['result']
+        stats = self.flights.stats()
+        assert stats['leaders'] == 1
+        assert stats['followers'] == 7
+        assert stats['in_flight'] == 0
+
+    def test_cleanup_waits_for_last_release(self):
+        cleaned = []
+        self.release.set()
+        flight = self.flights.do('key', self._work, cleanup=cleaned.append)
+        assert cleaned == []
+        flight.release()
+        assert cleaned == ['result']
+
+    def test_sequential_calls_do_not_coalesce(self):
+        self.release.set()
+        for _ in range(3):
+            self.flights.do('key', self._work).release()
+        assert self.calls == 3
+
+    def test_none_key_disables_coalescing(self):
+        def call():
+            flight = self.flights.do(None, self._work, timeout=5)
+            flight.release()
+
+        self._start_and_release(4, call)
+        assert self.calls == 4
+
+    def test_leader_error_reaches_followers(self):
+        def failing():
+            self.release.wait(5)
+            raise ValueError('broken')
+
+        def call():
+            self.flights.do('key', failing, timeout=5)
+
+        _, errors = self._start_and_release(4, call)
+        assert all(isinstance(e, ValueError) for e in errors)
+        assert self.flights.stats()['failures'] == 1
+
+    def test_follower_timeout(self):
+        leader = threading.Thread(target=lambda: self.flights.do('key', self._work).release())
+        leader.start()
+        while self.flights.stats()['in_flight'] == 0:
+            time.sleep(0.01)
+        with pytest.raises(TimeoutError):
+            self.flights.do('key', self._work, timeout=0.05)
+        self.release.set()
+        leader.join()
+        assert self.flights.stats()['timeouts'] == 1
@@ -0,0 +1,137 @@
+"""Tests for resumable chunked uploads"""
+
+import hashlib
+import io
+import os
+import shutil
+import threading
+
+import pytest
+
+from ..core.exceptions import FileTooLargeError, ValidationError
+from ..core.uploads import ChunkedUploadStore, SessionNotFoundError, merge_ranges
+
+
+class _Dropping(io.BytesIO):
+    """Stream that fails after `limit` bytes, like a dropped connection"""
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        if self.tell() >= self.limit:
+            raise ConnectionError('connection dropped')
+        return super().read(min(size, self.limit - self.tell()))
+
+
+class TestChunkedUploadStore:
+    """Test sessions, chunk assembly and incremental hashing"""
+
+    def setup_method(self):
+        self.data = os.urandom(3 * 1024 * 1024 + 123)
+        self.digest = hashlib.sha256(self.data).hexdigest()
+
+    def _chunks(self, size):
+        return [(offset, self.data[offset:offset + size]) for offset in range(0, len(self.data), size)]
+
+    def test_in_order_upload_hashed_inline(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        session = store.create('tese.pdf', len(self.data))
+        for offset, chunk in self._chunks(1024 * 1024):
+            store.write_chunk(session, offset, io.BytesIO(chunk))
+
+        completed = store.finalize(session)
+        assert completed.sha256 == self.digest
+        assert completed.path.read_bytes() == self.data
+        stats = store.stats()
+        assert stats['bytes_hashed_inline'] == len(self.data)
+        assert stats['bytes_hashed_from_disk'] == 0
+
+    def test_parallel_out_of_order_chunks(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        session = store.create('tese.pdf', len(self.data))
+        chunks = list(reversed(self._chunks(256 * 1024)))
+        threads = [threading.Thread(target=store.write_chunk, args=(session, offset, io.BytesIO(chunk)))
+                   for offset, chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.status(session)['complete']
+        assert store.finalize(session).sha256 == self.digest
+
+    def test_resume_after_dropped_connection(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        session = store.create('tese.pdf', len(self.data))
+        with pytest.raises(ConnectionError):
+            store.write_chunk(session, 0, _Dropping(self.data, 1000000))
+
+        status = store.status(session)
+        resume = status['missing'][0][0]
+        assert 0 < resume <= 1000000
+        assert not status['complete']
+        with pytest.raises(ValidationError):
+            store.finalize(session)
+
+        store.write_chunk(session, resume, io.BytesIO(self.data[resume:]))
+        assert store.finalize(session).sha256 == self.digest
+
+    def test_finalize_in_another_process_hashes_from_disk(self, tmp_path):
+        writer = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        session = writer.create('tese.pdf', len(self.data))
+        writer.write_chunk(session, 0, io.BytesIO(self.data))
+
+        other = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        assert other.finalize(other.get(session.id)).sha256 == self.digest
+
+    def test_finalized_session_rejects_chunks(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        session = store.create('tese.pdf', len(self.data))
+        store.write_chunk(session, 0, io.BytesIO(self.data))
+        store.finalize(session)
+
+        assert store.is_finalized(session)
+        with pytest.raises(ValidationError):
+            store.write_chunk(session, 0, io.BytesIO(b'XXXX'))
+        assert session.data_path.read_bytes() == self.data
+        # Retrying finalize (e.g. after a failed conversion) still works
+        assert store.finalize(session).sha256 == self.digest
+
+    def test_limits(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=1000)
+        with pytest.raises(FileTooLargeError):
+            store.create('tese.pdf', 1001)
+        with pytest.raises(FileTooLargeError):
+            store.create('tese.pdf', 500, max_size=100)
+        session = store.create('tese.pdf', 100)
+        with pytest.raises(ValidationError):
+            store.write_chunk(session, 50, io.BytesIO(b'x' * 51))
+        with pytest.raises(ValidationError):
+            store.write_chunk(session, 100, io.BytesIO(b'x'))
+
+    def test_get_and_discard(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=1000)
+        session = store.create('tese.pdf', 10)
+        assert store.get(session.id) == session
+        assert store.get('../../etc') is None
+        store.discard(session)
+        assert store.get(session.id) is None
+
+    def test_session_removed_while_uploading(self, tmp_path):
+        store = ChunkedUploadStore(tmp_path, max_size=10 * 1024 * 1024)
+        session = store.create('tese.pdf', len(self.data))
+        store.write_chunk(session, 0, io.BytesIO(self.data[:1000]))
+        assert store.stats()['sessions_in_process'] == 1
+
+        # e.g. expired and reaped by the storage janitor
+        shutil.rmtree(session.directory)
+        with pytest.raises(SessionNotFoundError):
+            store.write_chunk(session, 1000, io.BytesIO(self.data[1000:2000]))
+        with pytest.raises(SessionNotFoundError):
+            store.finalize(session)
+        assert store.stats()['sessions_in_process'] == 0
+
+    def test_merge_ranges(self):
+        assert merge_ranges([(10, 20), (0, 5), (5, 10), (30, 40), (35, 50)]) == [(0, 20), (30, 50)]
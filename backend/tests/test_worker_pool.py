@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worker pool tests
+"""
+
+import os
+import time
+
+import pytest
+
+from ..core.exceptions import ProcessingTimeoutError
+from ..core import worker_pool
+from ..core.worker_pool import ConversionWorkerPool, WorkerLimits, resource
+
+
+class TestConversionWorkerPool:
+    """Test sandboxed job execution"""
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.pool = ConversionWorkerPool(size=1, timeout=10, max_jobs_per_worker=2, max_rss_mb=None)
+
+    def teardown_method(self):
+        """Stop workers"""
+        self.pool.shutdown()
+
+    def test_runs_in_separate_process(self):
+        """Test jobs execute in a worker, not in the caller"""
+        assert self.pool.run(pow, 2, 10) == 1024
+        assert self.pool.run(os.getpid) != os.getpid()
+
+    def test_exceptions_are_reraised(self):
+        """Test job exceptions propagate to the caller"""
+        with pytest.raises(ValueError):
+            self.pool.run(int, 'not a number')
+
+    def test_timeout_kills_worker_and_pool_recovers(self):
+        """Test a stuck job raises ProcessingTimeoutError and is replaced"""
+        with pytest.raises(ProcessingTimeoutError):
+            self.pool.run(time.sleep, 5, timeout=0.5)
+
+        assert self.pool.run(pow, 3, 2) == 9
+        assert self.pool.stats()['timeouts'] == 1
+
+    def test_recycles_after_max_jobs(self):
+        """Test workers are replaced after max_jobs_per_worker"""
+        first = self.pool.run(os.getpid)
+        assert self.pool.run(os.getpid) == first
+        assert self.pool.run(os.getpid) != first
+        assert self.pool.stats()['recycled'] == 1
+
+    def test_failed_respawn_does_not_block_callers(self, monkeypatch):
+        """Test a replacement that never starts shrinks the pool and callers time out"""
+        self.pool.start()
+
+        def _broken(*args, **kwargs):
+            raise OSError('cannot fork')
+
+        monkeypatch.setattr(worker_pool, '_Worker', _broken)
+        monkeypatch.setattr(worker_pool, 'RESPAWN_ATTEMPTS', 2)
+        monkeypatch.setattr(worker_pool, 'RESPAWN_BACKOFF', 0.01)
+        with pytest.raises(ProcessingTimeoutError):
+            self.pool.run(time.sleep, 5, timeout=0.5)
+
+        started = time.monotonic()
+        with pytest.raises(ProcessingTimeoutError):
+            self.pool.run(pow, 3, 2, timeout=0.5)
+        assert time.monotonic() - started < 2
+        stats = self.pool.stats()
+        assert stats['respawn_failures'] == 2
+        assert stats['size'] == 0
+
+
+@pytest.mark.skipif(resource is None, reason='resource limits not supported')
+def test_memory_limit_enforced():
+    """Test RLIMIT_AS turns runaway allocations into MemoryError"""
+    pool = ConversionWorkerPool(size=1, timeout=30, limits=WorkerLimits(memory_mb=512))
+    try:
+        with pytest.raises(MemoryError):
+            pool.run(bytearray, 1024 * 1024 * 1024)
+        assert pool.run(len, 'ok') == 2
+    finally:
+        pool.shutdown()
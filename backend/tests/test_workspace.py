@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-request workspace tests
+"""
+
+import pytest
+from flask import Flask, send_file
+
+from ..core.workspace import Workspace
+
+
+class TestWorkspace:
+    """Test per-request directories"""
+
+    def test_unique_and_removed(self, tmp_path):
+        """Test two workspaces never share files and are removed on exit"""
+        with Workspace(tmp_path) as primeiro, Workspace(tmp_path) as segundo:
+            primeiro.file('tese.pdf').write_bytes(b'1')
+            segundo.file('tese.pdf').write_bytes(b'2')
+            assert primeiro.file('tese.pdf').read_bytes() == b'1'
+            caminhos = [primeiro.path, segundo.path]
+        assert not any(caminho.exists() for caminho in caminhos)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_removed_on_error(self, tmp_path):
+        """Test cleanup also happens when the request fails"""
+        with pytest.raises(RuntimeError):
+            with Workspace(tmp_path) as espaco:
+                espaco.file('a.txt').write_text('x')
+                raise RuntimeError('falha')
+        assert list(tmp_path.iterdir()) == []
+
+    def test_file_names_stay_inside(self, tmp_path):
+        """Test names are reduced to a bare, safe file name"""
+        with Workspace(tmp_path) as espaco:
+            assert espaco.file('../../etc/passwd').parent == espaco.path
+            with pytest.raises(ValueError):
+                espaco.file('..')
+
+    def test_response_takes_ownership(self, tmp_path):
+        """Test a streamed file outlives the view and is removed when the body closes"""
+        app = Flask(__name__)
+        with app.test_request_context():
+            with Workspace(tmp_path) as espaco:
+                saida = espaco.file('saida.txt')
+                saida.write_text('conteudo')
+                resposta = espaco.bind_to_response(send_file(str(saida)))
+            assert saida.exists()
+            assert b''.join(resposta.response) == b'conteudo'
+            resposta.close()
+        assert not saida.exists()
+        assert list(tmp_path.iterdir()) == []